@@ -0,0 +1,35 @@
+"""unique meetups subscriptions
+
+Revision ID: 8c1f4d2a9e57
+Revises: 33b9c0a03feb
+Create Date: 2026-10-19 10:12:41.318204
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8c1f4d2a9e57'
+down_revision = '33b9c0a03feb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Duplicated subscriptions could be created by concurrent requests
+    op.execute("""
+        DELETE FROM meetups_users duplicate
+        USING meetups_users original
+        WHERE duplicate.id > original.id
+          AND duplicate.user_id = original.user_id
+          AND duplicate.meetup_id = original.meetup_id
+    """)
+    op.create_unique_constraint(
+        'uq_meetups_users_user_id_meetup_id', 'meetups_users',
+        ['user_id', 'meetup_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        'uq_meetups_users_user_id_meetup_id', 'meetups_users', type_='unique'
+    )
@@ -0,0 +1,69 @@
+"""meetups full-text search and places geo index
+
+Revision ID: b5d8e2f4a613
+Revises: e3a7b5c90d14
+Create Date: 2026-10-19 16:05:27.614093
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'b5d8e2f4a613'
+down_revision = 'e3a7b5c90d14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Weights follow the Elasticsearch boosts of the searched fields
+    op.add_column('meetups', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(
+        "setweight(to_tsvector('simple', coalesce(meetup_name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'D')",
+        persisted=True
+    ), nullable=True))
+    op.add_column('themes', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(
+        "setweight(to_tsvector('simple', coalesce(theme, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(tags, '')), 'C')",
+        persisted=True
+    ), nullable=True))
+    op.add_column('places', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(
+        "setweight(to_tsvector('simple', coalesce(place_name, '')), 'C')",
+        persisted=True
+    ), nullable=True))
+    op.create_index('ix_meetups_search_vector', 'meetups', ['search_vector'],
+                    postgresql_using='gin')
+    op.create_index('ix_themes_search_vector', 'themes', ['search_vector'],
+                    postgresql_using='gin')
+    op.create_index('ix_places_search_vector', 'places', ['search_vector'],
+                    postgresql_using='gin')
+
+    # Places locations are 'lat, lon' strings, malformed ones are not indexed
+    op.execute("CREATE EXTENSION IF NOT EXISTS cube")
+    op.execute("CREATE EXTENSION IF NOT EXISTS earthdistance")
+    op.execute(r"""
+        CREATE FUNCTION location_to_earth(location text) RETURNS earth
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT CASE
+                WHEN location ~ '^\s*-?\d+(\.\d+)?\s*,\s*-?\d+(\.\d+)?\s*$'
+                THEN ll_to_earth(split_part(location, ',', 1)::float8,
+                                 split_part(location, ',', 2)::float8)
+            END
+        $$
+    """)
+    op.execute("""
+        CREATE INDEX ix_places_location_earth
+        ON places USING gist (location_to_earth(location))
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_places_location_earth', table_name='places')
+    op.execute("DROP FUNCTION location_to_earth(text)")
+    op.drop_index('ix_places_search_vector', table_name='places')
+    op.drop_index('ix_themes_search_vector', table_name='themes')
+    op.drop_index('ix_meetups_search_vector', table_name='meetups')
+    op.drop_column('places', 'search_vector')
+    op.drop_column('themes', 'search_vector')
+    op.drop_column('meetups', 'search_vector')
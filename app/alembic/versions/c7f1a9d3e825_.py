@@ -0,0 +1,66 @@
+"""places numeric coordinates
+
+Revision ID: c7f1a9d3e825
+Revises: b5d8e2f4a613
+Create Date: 2026-10-19 17:21:48.305219
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c7f1a9d3e825'
+down_revision = 'b5d8e2f4a613'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('places', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('places', sa.Column('longitude', sa.Float(), nullable=True))
+    # Malformed and out of range locations are left without coordinates
+    op.execute(r"""
+        UPDATE places
+        SET latitude = split_part(location, ',', 1)::float8,
+            longitude = split_part(location, ',', 2)::float8
+        WHERE location ~ '^\s*-?\d+(\.\d+)?\s*,\s*-?\d+(\.\d+)?\s*$'
+    """)
+    op.execute("""
+        UPDATE places
+        SET latitude = NULL, longitude = NULL
+        WHERE latitude NOT BETWEEN -90 AND 90
+           OR longitude NOT BETWEEN -180 AND 180
+    """)
+    op.create_check_constraint(
+        'ck_places_latitude', 'places', 'latitude BETWEEN -90 AND 90'
+    )
+    op.create_check_constraint(
+        'ck_places_longitude', 'places', 'longitude BETWEEN -180 AND 180'
+    )
+    op.drop_index('ix_places_location_earth', table_name='places')
+    op.execute("DROP FUNCTION location_to_earth(text)")
+    op.create_index('ix_places_earth', 'places',
+                    [sa.text('ll_to_earth(latitude, longitude)')],
+                    postgresql_using='gist')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_places_earth', table_name='places')
+    op.execute(r"""
+        CREATE FUNCTION location_to_earth(location text) RETURNS earth
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT CASE
+                WHEN location ~ '^\s*-?\d+(\.\d+)?\s*,\s*-?\d+(\.\d+)?\s*$'
+                THEN ll_to_earth(split_part(location, ',', 1)::float8,
+                                 split_part(location, ',', 2)::float8)
+            END
+        $$
+    """)
+    op.execute("""
+        CREATE INDEX ix_places_location_earth
+        ON places USING gist (location_to_earth(location))
+    """)
+    op.drop_constraint('ck_places_longitude', 'places', type_='check')
+    op.drop_constraint('ck_places_latitude', 'places', type_='check')
+    op.drop_column('places', 'longitude')
+    op.drop_column('places', 'latitude')
@@ -0,0 +1,29 @@
+"""users calendar token
+
+Revision ID: d4b8e6a2f917
+Revises: c7f1a9d3e825
+Create Date: 2026-10-19 18:42:10.517384
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'd4b8e6a2f917'
+down_revision = 'c7f1a9d3e825'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('calendar_token',
+                                     postgresql.UUID(as_uuid=False),
+                                     nullable=True))
+    op.create_index(op.f('ix_users_calendar_token'), 'users',
+                    ['calendar_token'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_calendar_token'), table_name='users')
+    op.drop_column('users', 'calendar_token')
@@ -0,0 +1,41 @@
+"""meetups subscribers count and capacity
+
+Revision ID: e3a7b5c90d14
+Revises: 8c1f4d2a9e57
+Create Date: 2026-10-19 11:40:03.551872
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e3a7b5c90d14'
+down_revision = '8c1f4d2a9e57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('meetups', sa.Column('subscribers_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('meetups', sa.Column('capacity', sa.Integer(), nullable=True))
+    op.create_check_constraint(
+        'ck_meetups_subscribers_count', 'meetups', 'subscribers_count >= 0'
+    )
+    op.execute("""
+        UPDATE meetups
+        SET subscribers_count = subscriptions.count
+        FROM (
+            SELECT meetup_id, count(*) AS count
+            FROM meetups_users
+            GROUP BY meetup_id
+        ) AS subscriptions
+        WHERE meetups.id = subscriptions.meetup_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        'ck_meetups_subscribers_count', 'meetups', type_='check'
+    )
+    op.drop_column('meetups', 'capacity')
+    op.drop_column('meetups', 'subscribers_count')
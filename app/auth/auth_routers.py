@@ -1,12 +1,18 @@
+import asyncio
+import os
+
 from auth.schemas import (SimpleMessage, TokenBase, User, UserCreate,
                           UserProfile, UserUpdate)
 from auth.utils import auth_utils
 from auth.utils.crud import (create_user, create_user_token, delete_user_by_id,
                              get_user_by_username, update_user_profile)
+from auth.utils.images import AVATAR_SNIFF_SIZE, is_decodable_image
 from auth.utils.security import (check_strong_password, decode_jwt_token,
                                  validate_password)
+from config.settings import settings
 from dependencies import get_current_user
-from fastapi import APIRouter, Depends, File, HTTPException, Request
+from fastapi import (APIRouter, Depends, File, HTTPException, Request,
+                     UploadFile)
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import JWTError
 from meetups_logging import logger
@@ -111,19 +117,32 @@ async def sign_up(user: UserCreate, request: Request):
 @router.post("/upload_avatar", response_model=SimpleMessage)
 async def upload_avatar(
         current_user: User = Depends(get_current_user),
-        avatar_image: bytes = File(
+        avatar_image: UploadFile = File(
             title='avatar image'
         )
 ):
     """ The API endpoint for uploading users avatars """
-    is_image = auth_utils.verify_avatar_image(avatar_image)
+    avatar_image.file.seek(0, os.SEEK_END)
+    if avatar_image.file.tell() > settings.AVATAR_MAX_SIZE:
+        msg = {"success": False,
+               "message": f"File size exceeds the limit of "
+                          f"{settings.AVATAR_MAX_SIZE} bytes"}
+        logger.warning(msg)
+        raise HTTPException(status_code=413, detail=msg)
+
+    await avatar_image.seek(0)
+    file_head = await avatar_image.read(AVATAR_SNIFF_SIZE)
+    await avatar_image.seek(0)
+    is_image = auth_utils.verify_avatar_image(file_head) and \
+        await asyncio.to_thread(is_decodable_image, avatar_image.file)
     if not is_image:
         msg = {"success": False, "message": "Incorrect file type"}
         logger.warning(msg)
         raise HTTPException(status_code=400, detail=msg)
 
+    await avatar_image.seek(0)
     result = await auth_utils.save_avatar_image(
-        avatar_image, current_user.id
+        avatar_image.file, current_user.id
     )
     if not result.get('success'):
         raise HTTPException(status_code=500, detail=result)
@@ -17,6 +17,8 @@ class Users(Base):
     is_active = Column(Boolean(), server_default=sql.expression.false())
     avatar_url = Column(String(256))
     is_super = Column(Boolean(), server_default=sql.expression.false())
+    # Secret of the iCalendar feed URL, calendar clients can not send headers
+    calendar_token = Column(UUID(as_uuid=False), unique=True, index=True)
 
 
 class Tokens(Base):
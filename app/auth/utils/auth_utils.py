@@ -1,12 +1,18 @@
-import os
+import asyncio
+import uuid
 from dataclasses import dataclass
 from datetime import datetime
+from typing import BinaryIO
 
 import filetype
 from auth.models import Tokens, Users
+from auth.utils.images import (AVATAR_URL_SIZE, get_avatar_key,
+                               write_avatar_original)
 from auth.utils.security import hash_password
+from celery_tasks.tasks import process_avatar_image_celery
 from config.database import database
 from config.settings import settings
+from files.utils.storage import get_storage_url
 from meetups_logging import logger
 from sqlalchemy import and_, insert, join, or_, select, update
 
@@ -95,10 +101,60 @@ async def get_user_by_token(token: str) -> database:
     return await database.fetch_one(query)
 
 
+async def get_user_by_calendar_token(token: str) -> database:
+    """
+    Function to get the active User object by the calendar feed token
+    :param token: calendar feed token in string format
+    :return: database object, None for unknown tokens and inactive users
+    """
+    try:
+        uuid.UUID(token)
+    except ValueError:
+        return None
+
+    query = (
+        select(Users)
+        .where(and_(Users.calendar_token == token,
+                    Users.is_active, Users.confirmed))
+    )
+    return await database.fetch_one(query)
+
+
+async def create_calendar_token(user_id: int) -> str:
+    """
+    Function for issuing a new calendar feed token of the user. The previous
+    token stops working
+    :param user_id: user's ID in integer format
+    :return: calendar feed token in string format
+    """
+    token = str(uuid.uuid4())
+    query = (
+        update(Users)
+        .where(Users.id == user_id)
+        .values(calendar_token=token)
+    )
+    await database.execute(query)
+    return token
+
+
+async def revoke_calendar_token(user_id: int) -> None:
+    """
+    Function for revoking the calendar feed token of the user
+    :param user_id: user's ID in integer format
+    """
+    query = (
+        update(Users)
+        .where(Users.id == user_id)
+        .values(calendar_token=None)
+    )
+    await database.execute(query)
+
+
 def verify_avatar_image(file: bytes) -> bool:
     """
-    Function for upload file type validation
-    :param file: file content in bytes format
+    Function for upload file type validation. The type is sniffed from the
+    file signature, so the first AVATAR_SNIFF_SIZE bytes are enough
+    :param file: file content or its beginning in bytes format
     :return: boolean statement. True if file content is image False in
              another case
     """
@@ -121,20 +177,19 @@ async def update_avatar_url_in_db(url: str, user_id: int) -> None:
     await database.fetch_one(query)
 
 
-async def save_avatar_image(file_content: bytes, user_id: int) -> dict:
+async def save_avatar_image(file: BinaryIO, user_id: int) -> dict:
     """
-    Function for dumping user avatar image on a hard disk surface
-    :param file_content: content of file in bytes format
+    Function for dumping user avatar image to the storage. Resizing is
+    delegated to the Celery 'images' queue, which also updates the avatar URL
+    once the resized images are stored
+    :param file: uploaded file object
     :param user_id: user's ID in integer format
-    :return: Path to a user avatar image
+    :return: result response message in JSON format
     """
-    base_path = f"storage/{user_id}/images"
-    file_path = f"{base_path}/avatar.jpg"
-
     try:
-        os.makedirs(base_path, exist_ok=True)
-        with open(file_path, 'wb') as file:
-            file.write(file_content)
+        digest, original_path = await asyncio.to_thread(
+            write_avatar_original, file
+        )
     except Exception as e:
         logger.error(str(e))
         return {
@@ -143,15 +198,19 @@ async def save_avatar_image(file_content: bytes, user_id: int) -> dict:
                        f"'{str(e)}'"
         }
 
-    try:
-        await update_avatar_url_in_db(url=file_path, user_id=user_id)
-    except Exception as e:
-        logger.error(str(e))
-        return {
-            "success": False,
-            "message": f"Updating a record in the database failed. Exception:"
-                       f" '{str(e)}'"
-        }
+    if original_path:
+        process_avatar_image_celery.apply_async(args=[digest, user_id])
+    else:
+        file_path = get_storage_url(get_avatar_key(digest, AVATAR_URL_SIZE))
+        try:
+            await update_avatar_url_in_db(url=file_path, user_id=user_id)
+        except Exception as e:
+            logger.error(str(e))
+            return {
+                "success": False,
+                "message": f"Updating a record in the database failed. "
+                           f"Exception: '{str(e)}'"
+            }
 
     return {
         "success": True,
@@ -3,10 +3,11 @@ from uuid import uuid4
 
 from auth import schemas as user_schema
 from auth.models import Tokens, Users
-from auth.utils.mail import generate_html_message
 from auth.utils.security import hash_password
 from celery_tasks.tasks import send_verification_email_celery
 from config.database import database
+from meetups.models import MeetupsUsers
+from meetups.utils.meetups_utils import get_subscriptions_removal_query
 from meetups_logging import logger
 from sqlalchemy import delete, insert, select, update
 
@@ -33,21 +34,30 @@ async def get_user_by_username(username: str) -> database:
 
 async def delete_user_by_id(user_id: int) -> dict:
     """
-    Function for removal existing user and user's access tokens
+    Function for removal existing user, user's access tokens and meetups
+    subscriptions
     :param user_id: User id in integer format
     """
+    subscriptions_query = get_subscriptions_removal_query(
+        MeetupsUsers.user_id == user_id
+    )
     query = delete(Users).where(
         Users.id == user_id
     )
+    transaction = await database.transaction()
     try:
+        # Subscribers counters are not updated by the cascade removal
+        await database.fetch_all(subscriptions_query)
         await database.fetch_one(query)
     except Exception as e:
+        await transaction.rollback()
         logger.error(str(e))
         return {
             "success": False,
             "message": f"User removal failed (user_id={user_id}). Exception: "
                        f"'{str(e)}'"
         }
+    await transaction.commit()
     return {
         "success": True,
         "Message": f"User (user_id={user_id} has been deleted)"
@@ -93,11 +103,9 @@ async def update_user_profile(
         try:
             await database.fetch_one(query=query, values=values)
             if values.get('email'):
-                message = generate_html_message(
-                    username=current_user.username, base_url=base_url
-                )
                 send_verification_email_celery.apply_async(
-                    args=[updated_data["email"], message]
+                    args=[updated_data["email"], current_user.username,
+                          base_url]
                 )
         except Exception as e:
             logger.error(str(e))
@@ -134,11 +142,8 @@ async def create_user(
     try:
         user = await database.fetch_one(query)
         await create_user_token(user.id)
-        message = generate_html_message(
-            username=user.username, base_url=base_url
-        )
         send_verification_email_celery.apply_async(
-            args=[user.email, message]
+            args=[user.email, user.username, base_url]
         )
     except Exception as e:
         logger.error(str(e))
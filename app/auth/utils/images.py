@@ -0,0 +1,142 @@
+import hashlib
+import io
+from contextlib import closing
+from typing import BinaryIO
+
+from auth.models import Users
+from config.database import database
+from files.utils.storage import get_storage_url, storage
+from meetups_logging import logger
+from PIL import Image, ImageOps
+from sqlalchemy import update
+
+AVATAR_SIZES = (512, 256, 64)
+AVATAR_URL_SIZE = 256
+AVATAR_SNIFF_SIZE = 8 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+def get_avatar_key(digest: str, size: int | str) -> str:
+    """
+    Function for composing the storage key of an avatar image. Images are
+    stored under the SHA-256 digest of the uploaded content, so identical
+    uploads share the files and a key never changes its content
+    :param digest: SHA-256 digest of the uploaded image in hex format
+    :param size: side of the square image in pixels or 'original'
+    :return: storage key of the avatar image
+    """
+    extension = "" if size == "original" else ".jpg"
+    return f"avatars/{digest[:2]}/{digest}/{size}{extension}"
+
+
+def write_avatar_original(file: BinaryIO) -> tuple[str, str | None]:
+    """
+    Function for streaming the uploaded avatar image to the storage before
+    processing
+    :param file: uploaded file object
+    :return: SHA-256 digest of the file content and storage key of the
+             uploaded image, None instead of the key if the avatar has already
+             been processed
+    """
+    sha256 = hashlib.sha256()
+    while chunk := file.read(CHUNK_SIZE):
+        sha256.update(chunk)
+    digest = sha256.hexdigest()
+
+    if all(storage.exists(get_avatar_key(digest, size))
+           for size in AVATAR_SIZES):
+        return digest, None
+
+    file.seek(0)
+    key = get_avatar_key(digest, "original")
+    storage.put(key, file)
+    return digest, key
+
+
+def is_decodable_image(file: BinaryIO) -> bool:
+    """
+    Function for checking that the uploaded image can be read by Pillow. The
+    file signature is not enough, as formats like HEIC or AVIF are recognized
+    by it but can not be resized
+    :param file: uploaded file object
+    :return: True if the image is readable, False otherwise
+    """
+    try:
+        with Image.open(file) as image:
+            image.verify()
+    except Exception:
+        return False
+    finally:
+        file.seek(0)
+    return True
+
+
+def process_avatar_image(digest: str) -> dict:
+    """
+    Function for resizing the uploaded avatar image to the square JPEG images
+    of AVATAR_SIZES. Runs in the Celery 'images' queue. Storage errors are
+    raised, so the task is retried, an image which can not be decoded is
+    removed
+    :param digest: SHA-256 digest of the uploaded image in hex format
+    :return: result response message in JSON format
+    """
+    original_key = get_avatar_key(digest, "original")
+    processed = {
+        "success": True,
+        "message": f"Avatar image has been processed (digest={digest})"
+    }
+
+    # The same image may have been processed by a task of another upload
+    if not storage.exists(original_key) and \
+            all(storage.exists(get_avatar_key(digest, size))
+                for size in AVATAR_SIZES):
+        return processed
+
+    with closing(storage.open(original_key)) as file:
+        content = io.BytesIO(file.read())
+
+    try:
+        with Image.open(content) as original:
+            original.draft("RGB", (max(AVATAR_SIZES), max(AVATAR_SIZES)))
+            image = ImageOps.exif_transpose(original).convert("RGB")
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.error(str(e))
+        storage.delete(original_key)
+        return {
+            "success": False,
+            "message": f"Avatar image processing failed. Exception: "
+                       f"'{str(e)}'"
+        }
+
+    for size in sorted(AVATAR_SIZES, reverse=True):
+        image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=85, optimize=True,
+                   progressive=True)
+        buffer.seek(0)
+        storage.put(get_avatar_key(digest, size), buffer,
+                    content_type="image/jpeg")
+    storage.delete(original_key)
+
+    return processed
+
+
+async def update_avatar_url(user_id: int, digest: str) -> None:
+    """
+    Function for pointing the user avatar to the processed images. Runs in
+    the event loop of the worker process, which opens its own database
+    connection
+    :param user_id: user's ID in integer format
+    :param digest: SHA-256 digest of the uploaded image in hex format
+    """
+    if not database.is_connected:
+        await database.connect()
+
+    query = (
+        update(Users)
+        .where(Users.id == user_id)
+        .values(avatar_url=get_storage_url(
+            get_avatar_key(digest, AVATAR_URL_SIZE)
+        ))
+    )
+    await database.execute(query)
@@ -1,6 +1,21 @@
+import asyncio
+import os
+from dataclasses import dataclass
+from email.message import EmailMessage
+
+import aiosmtplib
 from auth.utils.security import encode_jwt_token
 from config.settings import settings
-from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
+from fastapi_mail import ConnectionConfig
+from jinja2 import Environment, FileSystemLoader, Template
+from meetups_logging import logger
+
+TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "templates"
+)
+DEFAULT_LOCALE = "en"
+# Subject of the verification emails queued with the rendered HTML
+LEGACY_SUBJECT = "Registration confirmation"
 
 conf = ConnectionConfig(
     MAIL_USERNAME=settings.MAIL_USERNAME,
@@ -16,31 +31,257 @@ conf = ConnectionConfig(
 )
 
 
-def generate_html_message(username: str, base_url: str) -> str:
+class SMTPConnection:
+    """
+    SMTP session kept alive between messages, so a worker process sends all of
+    its emails over one connection instead of a new STARTTLS handshake per
+    message. The session is bound to the event loop it has been opened in.
     """
-    Function for HTML verification mail content generation
+
+    def __init__(self, config: ConnectionConfig):
+        self.config = config
+        self.session: aiosmtplib.SMTP | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def sender(self) -> str:
+        if self.config.MAIL_FROM_NAME:
+            return f"{self.config.MAIL_FROM_NAME} <{self.config.MAIL_FROM}>"
+        return self.config.MAIL_FROM
+
+    @property
+    def is_connected(self) -> bool:
+        return (self.session is not None and self.session.is_connected
+                and self.loop is asyncio.get_running_loop())
+
+    async def connect(self) -> aiosmtplib.SMTP:
+        """
+        Function for opening a new SMTP session
+        :return: logged in SMTP session
+        """
+        self.close()
+        session = aiosmtplib.SMTP(
+            hostname=self.config.MAIL_SERVER,
+            port=self.config.MAIL_PORT,
+            use_tls=self.config.MAIL_SSL_TLS,
+            validate_certs=self.config.VALIDATE_CERTS,
+        )
+        await session.connect()
+        if self.config.MAIL_STARTTLS:
+            await session.starttls()
+        if self.config.USE_CREDENTIALS:
+            await session.login(self.config.MAIL_USERNAME,
+                                self.config.MAIL_PASSWORD)
+
+        self.session = session
+        self.loop = asyncio.get_running_loop()
+        return session
+
+    async def send_message(self, message: EmailMessage) -> None:
+        """
+        Function for sending a message over the kept-alive session. The server
+        may drop an idle session, so the message is resent once over a new one
+        :param message: message for sending
+        """
+        if "From" not in message:
+            message["From"] = self.sender
+        if self.config.SUPPRESS_SEND:
+            return
+
+        if self.is_connected:
+            try:
+                await self.session.send_message(message)
+                return
+            except aiosmtplib.SMTPServerDisconnected:
+                logger.info("SMTP session has been closed by the server")
+
+        session = await self.connect()
+        await session.send_message(message)
+
+    async def quit(self) -> None:
+        """
+        Function for closing the SMTP session gracefully
+        """
+        if self.is_connected:
+            try:
+                await self.session.quit()
+            except aiosmtplib.SMTPException:
+                pass
+        self.close()
+
+    def close(self) -> None:
+        """
+        Function for dropping the SMTP session without the QUIT command
+        """
+        if self.session is not None and self.session.is_connected:
+            self.session.close()
+        self.session = None
+        self.loop = None
+
+
+smtp_connection = SMTPConnection(conf)
+
+
+@dataclass
+class RenderedEmail:
+    subject: str
+    text: str
+    html: str
+
+
+class EmailTemplates:
+    """
+    Registry of the email templates. Every template is compiled once when the
+    registry is created and defines 'subject', 'text' and 'html' blocks.
+    Templates are stored as '{locale}/{name}.jinja2', a missing locale falls
+    back to the default one.
+    """
+
+    def __init__(self, path: str, default_locale: str = DEFAULT_LOCALE):
+        self.default_locale = default_locale
+        self.environment = Environment(
+            loader=FileSystemLoader(path), auto_reload=False,
+            trim_blocks=True, lstrip_blocks=True
+        )
+        self.environment.globals.update(app_name=settings.app_name)
+        self.templates = {
+            name: self.environment.get_template(name)
+            for name in self.environment.list_templates(
+                extensions=["jinja2"]
+            )
+        }
+
+    def get_template(self, name: str, locale: str = None) -> Template:
+        """
+        Function for getting a compiled template
+        :param name: template name
+        :param locale: language code of the template
+        :return: compiled template
+        """
+        template = self.templates.get(f"{locale}/{name}.jinja2")
+        if template is None:
+            template = self.templates[f"{self.default_locale}/{name}.jinja2"]
+        return template
+
+    def render(self, template_name: str, locale: str = None,
+               **context) -> RenderedEmail:
+        """
+        Function for rendering the blocks of an email template
+        :param template_name: template name
+        :param locale: language code of the template
+        :param context: template variables
+        :return: rendered subject, plain text and HTML parts
+        """
+        template = self.get_template(template_name, locale)
+        template_context = template.new_context(context)
+        blocks = {
+            block: "".join(template.blocks[block](template_context)).strip()
+            for block in ("subject", "text", "html")
+        }
+        return RenderedEmail(**blocks)
+
+
+email_templates = EmailTemplates(TEMPLATES_DIR)
+
+
+def create_message(email: str, rendered: RenderedEmail) -> EmailMessage:
+    """
+    Function for composing a multipart (text and HTML) message
+    :param email: target email address
+    :param rendered: rendered email template
+    :return: message for sending
+    """
+    message = EmailMessage()
+    message["To"] = email
+    message["Subject"] = rendered.subject
+    message.set_content(rendered.text)
+    message.add_alternative(rendered.html, subtype="html")
+    return message
+
+
+def render_verification_email(username: str, base_url: str,
+                              locale: str = None) -> RenderedEmail:
+    """
+    Function for verification mail content generation
     :param username: User nickname in string format
     :param base_url: Parent URL for composing a confirmation letter
-    :return: HTML content in string format
+    :param locale: language code of the mail
+    :return: rendered verification mail
     """
-    token = encode_jwt_token(username)
-    return f"""<p>Hi {username}, this is email address confirmation.
-    To continue using the meetup service, follow the link:<br>
-    "{base_url}users/activate_user/{token}"</br>.
-    <br>Thanks for using Meetups</br></p> """
+    return email_templates.render(
+        "verification", locale, username=username, base_url=base_url,
+        token=encode_jwt_token(username)
+    )
 
 
-async def send_verification_email(email: str, html: str) -> None:
+async def send_verification_email(email: str, username: str, base_url: str,
+                                  locale: str = None) -> None:
     """
     Function for sending email
     :param email: target email address
+    :param username: User nickname in string format
+    :param base_url: Parent URL for composing a confirmation letter
+    :param locale: language code of the mail
+    """
+    rendered = render_verification_email(username, base_url, locale)
+    await smtp_connection.send_message(create_message(email, rendered))
+
+
+async def send_legacy_verification_email(email: str, html: str) -> None:
+    """
+    Function for sending an email queued in the legacy (email, html) task
+    arguments layout, with the HTML rendered by the API
+    :param email: target email address
     :param html: HTML message for sending
     """
-    message = MessageSchema(
-        subject="Registration confirmation",
-        recipients=[email],
-        body=html,
-        subtype=MessageType.html)
+    message = EmailMessage()
+    message["To"] = email
+    message["Subject"] = LEGACY_SUBJECT
+    message.set_content(html, subtype="html")
+    await smtp_connection.send_message(message)
+
+
+async def send_verification_emails(
+        messages: list[tuple]
+) -> dict[str, Exception]:
+    """
+    Function for sending several emails over one SMTP session. A failed
+    message, whether by rendering or by sending, does not stop sending of the
+    others
+    :param messages: arguments of send_verification_email for every message,
+    or the legacy (email, html) pairs
+    :return: exceptions of the messages that have not been sent by email
+    """
+    failures = {}
+    for email, *args in messages:
+        try:
+            if len(args) == 1:
+                await send_legacy_verification_email(email, *args)
+            else:
+                await send_verification_email(email, *args)
+        except Exception as e:
+            logger.error(f"Email sending to {email} failed. Exception: {e}")
+            failures[email] = e
+    return failures
+
 
-    fm = FastMail(conf)
-    await fm.send_message(message)
+def is_permanent_failure(exception: Exception) -> bool:
+    """
+    Function for checking if a message has been rejected with a permanent
+    (5xx) SMTP reply, so sending it again makes no sense
+    :param exception: exception raised during the message sending
+    :return: True if the failure is permanent, False otherwise
+    """
+    if isinstance(exception, aiosmtplib.SMTPRecipientsRefused):
+        return all(recipient.code >= 500
+                   for recipient in exception.recipients)
+    if isinstance(exception, aiosmtplib.SMTPResponseException):
+        return exception.code >= 500
+    return False
+
+
+async def close_email_connection() -> None:
+    """
+    Function for closing the kept-alive SMTP session
+    """
+    await smtp_connection.quit()
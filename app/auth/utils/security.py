@@ -70,3 +70,26 @@ def decode_jwt_token(token: str) -> str:
     key = settings.SECRET_KEY
     data_dict = jwt.decode(token, key, algorithms="HS256")
     return data_dict.get('data')
+
+
+def encode_service_token(service: str) -> str:
+    """
+    Function for token generation for internal services
+    :param service: service name in string format
+    :return: encrypted short-lived token in string format
+    """
+    key = settings.SECRET_KEY
+    expire = datetime.utcnow() + timedelta(minutes=5)
+    to_encode = {"service": service, "exp": expire}
+    return jwt.encode(to_encode, key, algorithm="HS256")
+
+
+def decode_service_token(token: str) -> str | None:
+    """
+    Function for service token decryption
+    :param token: encrypted string
+    :return: service name in string format or None for other tokens
+    """
+    key = settings.SECRET_KEY
+    data_dict = jwt.decode(token, key, algorithms="HS256")
+    return data_dict.get('service')
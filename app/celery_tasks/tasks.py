@@ -1,27 +1,149 @@
 import asyncio
+import math
+import os
+import threading
+from typing import Any, Coroutine
 
-from auth.utils.mail import send_verification_email
+from auth.utils.images import process_avatar_image, update_avatar_url
+from auth.utils.mail import (close_email_connection, is_permanent_failure,
+                             send_verification_emails)
 from celery import shared_task
-from meetups.utils.meetups_utils import create_report_csv, create_report_pdf
+from celery.signals import (worker_init, worker_process_shutdown,
+                            worker_shutdown)
+from celery_batches import Batches, SimpleRequest
+from config.database import database
+from config.settings import settings
+from meetups.utils.meetups_utils import cleanup_reports, create_report
+from meetups_logging import logger
 
+EMAIL_MAX_RETRIES = 5
 
-@shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True,
-             retry_kwargs={"max_retries": 5},
+# The event loop of the worker process and the lock serializing its use by
+# the pool greenlets (threading is patched by gevent in the worker)
+worker_loop: dict[str, Any] = {"pid": None, "loop": None}
+worker_loop_lock = threading.Lock()
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """
+    Function for getting the event loop of the current worker process. The
+    loop is created once per process, a forked process gets its own loop
+    :return: event loop
+    """
+    if worker_loop["pid"] != os.getpid() or worker_loop["loop"].is_closed():
+        worker_loop["loop"] = asyncio.new_event_loop()
+        worker_loop["pid"] = os.getpid()
+    return worker_loop["loop"]
+
+
+def run_in_worker_loop(coroutine: Coroutine) -> Any:
+    """
+    Function for running a coroutine in the event loop of the worker process
+    :param coroutine: coroutine for running
+    :return: coroutine result
+    """
+    with worker_loop_lock:
+        return get_worker_loop().run_until_complete(coroutine)
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def close_worker_loop(**kwargs) -> None:
+    """
+    Function for closing the SMTP session, the database connection and the
+    event loop of the worker process on shutdown
+    """
+    with worker_loop_lock:
+        loop = worker_loop["loop"]
+        if worker_loop["pid"] != os.getpid() or loop.is_closed():
+            return
+        loop.run_until_complete(close_email_connection())
+        if database.is_connected:
+            loop.run_until_complete(database.disconnect())
+        loop.close()
+
+
+@worker_init.connect
+def fit_prefetch_to_mail_batch(sender, **kwargs) -> None:
+    """
+    Function for widening the worker prefetch window to MAIL_BATCH_SIZE
+    messages. Batches are filled with prefetched messages only, so with a
+    smaller window every batch is flushed by MAIL_BATCH_TIMEOUT. Workers not
+    consuming the emails queue keep their window
+    """
+    if "emails" not in sender.app.amqp.queues.consume_from:
+        return
+    sender.prefetch_multiplier = max(
+        sender.prefetch_multiplier,
+        math.ceil(settings.MAIL_BATCH_SIZE / sender.concurrency)
+    )
+
+
+@shared_task(base=Batches, bind=True, flush_every=settings.MAIL_BATCH_SIZE,
+             flush_interval=settings.MAIL_BATCH_TIMEOUT / 1000,
              name='emails:send_verification_email_celery')
-def send_verification_email_celery(self, *args, **kwargs):
-    loop = asyncio.new_event_loop()
-    return loop.run_until_complete(send_verification_email(*args, **kwargs))
+def send_verification_email_celery(self, requests: list[SimpleRequest]):
+    """
+    Batch task for sending verification emails over one SMTP session. The
+    worker collects up to MAIL_BATCH_SIZE messages or waits MAIL_BATCH_TIMEOUT
+    ms. Messages are rendered from the email templates in the worker. Messages
+    to the same address are coalesced to the latest one, failed messages are
+    retried one by one with exponential backoff.
+    """
+    messages, retries = {}, {}
+    for request in requests:
+        email = request.args[0]
+        messages[email] = request.args
+        retries[email] = request.kwargs.get("retries", 0)
+
+    try:
+        failures = run_in_worker_loop(
+            send_verification_emails(list(messages.values()))
+        )
+    except Exception as e:
+        # The whole batch is retried rather than lost with the task
+        logger.error(f"Verification emails batch failed. Exception: {e}")
+        failures = {email: e for email in messages}
+
+    for email, exception in failures.items():
+        if is_permanent_failure(exception) or \
+                retries[email] >= EMAIL_MAX_RETRIES:
+            logger.error(f"Verification email to {email} has been dropped")
+            continue
+        self.apply_async(args=list(messages[email]),
+                         kwargs={"retries": retries[email] + 1},
+                         countdown=2 ** retries[email])
 
 
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True,
              retry_kwargs={"max_retries": 5},
-             name='reports:create_csv_report_celery')
-def create_csv_report_celery(self, *args, **kwargs):
-    return create_report_csv(*args, **kwargs)
+             name='reports:create_report_celery')
+def create_report_celery(self, *args, **kwargs):
+    return create_report(*args, **kwargs)
+
+
+@shared_task(bind=True, name='reports:cleanup_reports_celery')
+def cleanup_reports_celery(self):
+    """
+    Periodic task for the reports retention. Expired reports are removed in
+    batches of REPORTS_CLEANUP_BATCH, the task is queued again until none
+    of them remain
+    """
+    result = cleanup_reports(settings.REPORTS_CLEANUP_BATCH)
+    if result.get("remaining"):
+        self.apply_async()
+    return result
 
 
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True,
              retry_kwargs={"max_retries": 5},
-             name='reports:create_pdf_report_celery')
-def create_pdf_report_celery(self, *args, **kwargs):
-    return create_report_pdf(*args, **kwargs)
+             name='images:process_avatar_image_celery')
+def process_avatar_image_celery(self, digest: str, user_id: int = None):
+    """
+    Task for resizing an uploaded avatar image. The user's avatar URL is
+    updated only when all the images are stored
+    """
+    result = process_avatar_image(digest)
+    if result["success"] and user_id is not None:
+        run_in_worker_loop(update_avatar_url(user_id, digest))
+    return result
@@ -32,10 +32,33 @@ class Settings(BaseSettings):
     MAIL_SERVER:        str = os.getenv('MAIL_SERVER')
     MAIL_USERNAME: EmailStr = os.getenv('MAIL_USERNAME')
     MAIL_PASSWORD:      str = os.getenv('MAIL_PASSWORD')
+    MAIL_BATCH_SIZE:    int = os.getenv('MAIL_BATCH_SIZE', 10)
+    MAIL_BATCH_TIMEOUT: int = os.getenv('MAIL_BATCH_TIMEOUT', 500)
+
+    # Files settings
+    AVATAR_MAX_SIZE: int = os.getenv('AVATAR_MAX_SIZE', 5 * 1024 * 1024)
+    STORAGE_BACKEND: str = os.getenv('STORAGE_BACKEND', 'local')
+    STORAGE_PATH:    str = os.getenv('STORAGE_PATH', 'storage')
+    S3_BUCKET:       str = os.getenv('S3_BUCKET')
+    S3_REGION:       str = os.getenv('S3_REGION')
+    S3_ENDPOINT_URL: str = os.getenv('S3_ENDPOINT_URL')
+    S3_ACCESS_KEY:   str = os.getenv('S3_ACCESS_KEY')
+    S3_SECRET_KEY:   str = os.getenv('S3_SECRET_KEY')
+
+    # Reports retention settings
+    REPORTS_MAX_AGE_DAYS:     int = os.getenv('REPORTS_MAX_AGE_DAYS', 7)
+    REPORTS_MAX_PER_USER:     int = os.getenv('REPORTS_MAX_PER_USER', 20)
+    REPORTS_MAX_TOTAL:        int = os.getenv('REPORTS_MAX_TOTAL', 10000)
+    REPORTS_CLEANUP_BATCH:    int = os.getenv('REPORTS_CLEANUP_BATCH', 500)
+    REPORTS_CLEANUP_INTERVAL: int = os.getenv('REPORTS_CLEANUP_INTERVAL', 3600)
+
+    # Calendar feeds settings
+    ICS_CACHE_SIZE: int = os.getenv('ICS_CACHE_SIZE', 1000)
 
     # Celery settings
     CELERY_TASK_ROUTES:  tuple = (route_task,)
-    CELERY_TASK_QUEUES:  tuple = (Queue('emails'), Queue('reports'))
+    CELERY_TASK_QUEUES:  tuple = (Queue('emails'), Queue('images'),
+                                  Queue('reports'))
     CELERY_BROKER_URL:     str = os.getenv("CELERY_BROKER_URL")
     CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND")
 
@@ -43,5 +66,41 @@ class Settings(BaseSettings):
     ELASTIC_HOST: str = os.getenv('ELASTICSEARCH_HOST')
     ELASTIC_PORT: int = os.getenv('ELASTICSEARCH_PORT')
 
+    # Prometheus metrics settings, 0 disables the metrics server. The
+    # multiprocess directory is read by prometheus_client on import
+    METRICS_PORT:             int = os.getenv('METRICS_PORT', 9100)
+    PROMETHEUS_MULTIPROC_DIR: str = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+    # Search cache settings
+    SEARCH_CACHE_SIZE:    int = os.getenv('SEARCH_CACHE_SIZE', 1000)
+    SEARCH_CACHE_TTL:   float = os.getenv('SEARCH_CACHE_TTL', 30)
+    SEARCH_GEO_PRECISION: int = os.getenv('SEARCH_GEO_PRECISION', 2)
+    SEARCH_CACHE_CHANNEL: str = os.getenv('SEARCH_CACHE_CHANNEL',
+                                          os.getenv('PG_NAME'))
+
+    # Search fallback settings
+    SEARCH_ES_TIMEOUT:       float = os.getenv('SEARCH_ES_TIMEOUT', 1)
+    SEARCH_ES_RETRY:         float = os.getenv('SEARCH_ES_RETRY', 30)
+    SEARCH_FALLBACK_TIMEOUT: float = os.getenv('SEARCH_FALLBACK_TIMEOUT', 2)
+
+    # Search ranking settings
+    RANK_DISTANCE_SCALE: float = os.getenv('RANK_DISTANCE_SCALE', 50)
+    RANK_RECENCY_SCALE:  float = os.getenv('RANK_RECENCY_SCALE', 7)
+
+    # Suggestions settings
+    SUGGEST_MAX_SIZE:     int = os.getenv('SUGGEST_MAX_SIZE', 10)
+    SUGGEST_ES_TIMEOUT: float = os.getenv('SUGGEST_ES_TIMEOUT', 0.1)
+    SUGGEST_ES_RETRY:   float = os.getenv('SUGGEST_ES_RETRY', 30)
+    SUGGEST_TRIE_TTL:   float = os.getenv('SUGGEST_TRIE_TTL', 300)
+
+    # Nearby meetups settings
+    GEO_INDEX_CELL:  float = os.getenv('GEO_INDEX_CELL', 1)
+    GEO_INDEX_TTL:   float = os.getenv('GEO_INDEX_TTL', 300)
+    NEARBY_MAX_SIZE:   int = os.getenv('NEARBY_MAX_SIZE', 50)
+
+    # Socketio settings
+    SIO_CHANNEL:       str = os.getenv('SIO_CHANNEL', 'socketio')
+    SIO_MESSAGE_QUEUE: str = os.getenv('SIO_MESSAGE_QUEUE')
+
 
 settings = Settings()
@@ -0,0 +1,35 @@
+from auth.schemas import User
+from dependencies import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Request
+from files.utils.files_utils import (create_file_response, get_storage_key,
+                                     is_content_addressed, is_file_allowed)
+from files.utils.storage import storage
+from meetups_logging import logger
+from starlette.responses import RedirectResponse
+
+router = APIRouter()
+
+
+@router.api_route("/{file_path:path}", methods=["GET", "HEAD"],
+                  include_in_schema=False)
+async def get_file(request: Request, file_path: str,
+                   current_user: User = Depends(get_current_user)):
+    """ The API endpoint for downloading avatars and reports. The paths
+        returned by the other endpoints ('storage/...') are its URLs. Files
+        of a remote storage are redirected to a presigned URL """
+    key = get_storage_key(file_path)
+    if key is None or \
+            not is_file_allowed(file_path, current_user.id,
+                                current_user.is_super):
+        msg = {"success": False, "message": "File not found"}
+        logger.warning(msg)
+        raise HTTPException(status_code=404, detail=msg)
+
+    url = storage.get_url(key)
+    if url is not None:
+        return RedirectResponse(url, status_code=307)
+
+    return await create_file_response(
+        storage.get_path(key), request.headers, request.method,
+        immutable=is_content_addressed(key)
+    )
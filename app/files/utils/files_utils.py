@@ -0,0 +1,199 @@
+import hashlib
+import os
+import stat
+from email.utils import formatdate
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+# Content-addressed files available to all the users
+SHARED_PREFIXES = ("avatars", "reports")
+
+
+class RangeFileResponse(FileResponse):
+    """
+    File response serving a byte range of the file. The file is handed to the
+    server with the 'http.response.zerocopysend' ASGI extension when the
+    server supports it, otherwise it is read in chunks off the event loop.
+    """
+
+    def __init__(self, path: str, stat_result: os.stat_result,
+                 content_range: tuple[int, int] | None = None, **kwargs):
+        super().__init__(path, stat_result=stat_result, **kwargs)
+        self.headers["accept-ranges"] = "bytes"
+
+        size = stat_result.st_size
+        self.start, self.end = content_range or (0, size - 1)
+        if content_range is not None:
+            self.status_code = 206
+            self.headers["content-range"] = \
+                f"bytes {self.start}-{self.end}/{size}"
+        self.headers["content-length"] = str(self.end - self.start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive,
+                       send: Send) -> None:
+        await send({"type": "http.response.start",
+                    "status": self.status_code,
+                    "headers": self.raw_headers})
+        if self.send_header_only or self.end < self.start:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        count = self.end - self.start + 1
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({"type": "http.response.zerocopysend",
+                            "file": file.fileno(), "offset": self.start,
+                            "count": count})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while count > 0:
+                chunk = await file.read(min(self.chunk_size, count))
+                count -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk,
+                            "more_body": count > 0 and bool(chunk)})
+                if not chunk:
+                    break
+
+
+def get_storage_key(file_path: str) -> str | None:
+    """
+    Function for resolving a requested path to a storage key
+    :param file_path: path relative to the storage root
+    :return: storage key, None if the path leaves the storage root
+    """
+    file_path = os.path.normpath(file_path)
+    if os.path.isabs(file_path) or file_path.split(os.sep)[0] in ("..", "."):
+        return None
+    return file_path.replace(os.sep, "/")
+
+
+def is_file_allowed(file_path: str, user_id: int, is_super: bool) -> bool:
+    """
+    Function for checking access to a storage file. Avatars and shared
+    reports are available to all the users, the other files - to their
+    owners and superusers
+    :param file_path: path relative to the storage root
+    :param user_id: ID of the current user
+    :param is_super: superuser status of the current user
+    :return: True if the user can get the file, False otherwise
+    """
+    owner = os.path.normpath(file_path).split(os.sep)[0]
+    return owner in SHARED_PREFIXES or owner == str(user_id) or is_super
+
+
+def is_content_addressed(file_path: str) -> bool:
+    """
+    Function for checking if a storage path is named after the file content,
+    so the file behind it never changes
+    :param file_path: path relative to the storage root
+    :return: True for the content-addressed files, False otherwise
+    """
+    return os.path.normpath(file_path).split(os.sep)[0] in SHARED_PREFIXES
+
+
+def get_etag(file_path: str, stat_result: os.stat_result,
+             immutable: bool) -> str:
+    """
+    Function for composing the entity tag of a file
+    :param file_path: path to the file
+    :param stat_result: file status
+    :param immutable: True if the path is named after the file content
+    :return: strong entity tag
+    """
+    etag_base = file_path if immutable else \
+        f"{stat_result.st_mtime}-{stat_result.st_size}"
+    return f'"{hashlib.md5(etag_base.encode()).hexdigest()}"'
+
+
+def is_etag_matched(etag: str, header: str | None) -> bool:
+    """
+    Function for checking the entity tag against an If-None-Match header
+    :param etag: entity tag of the file
+    :param header: If-None-Match header value
+    :return: True if the client already has the file, False otherwise
+    """
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Function for parsing a single byte range of a Range header. Several
+    ranges are not supported, the whole file is sent for them
+    :param header: Range header value
+    :param size: file size in bytes
+    :return: first and last positions of the range, None for the whole file
+    :raise ValueError: if the range cannot be satisfied
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+
+    start, _, end = header.removeprefix("bytes=").strip().partition("-")
+    if not (start or end) or not (start or "0").isdigit() \
+            or not (end or "0").isdigit():
+        return None
+
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+
+    if start > end or start >= size:
+        raise ValueError(f"Range {header} is not satisfiable")
+    return start, end
+
+
+async def create_file_response(path: str, headers: Headers, method: str,
+                               immutable: bool) -> Response:
+    """
+    Function for creating a response with a storage file. Supports
+    conditional (If-None-Match) and single range (Range, If-Range) requests
+    :param path: path to the file
+    :param headers: request headers
+    :param method: request method
+    :param immutable: True if the path is named after the file content
+    :return: file response, 304, 404 or 416 response
+    """
+    try:
+        stat_result = await anyio.to_thread.run_sync(os.stat, path)
+    except OSError:
+        stat_result = None
+    if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+        return Response(status_code=404)
+
+    etag = get_etag(path, stat_result, immutable)
+    response_headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "cache-control": IMMUTABLE_CACHE_CONTROL if immutable
+        else PRIVATE_CACHE_CONTROL,
+    }
+
+    if is_etag_matched(etag, headers.get("if-none-match")):
+        return Response(status_code=304, headers=response_headers)
+
+    range_header = headers.get("range")
+    if headers.get("if-range", etag) != etag:
+        range_header = None
+    try:
+        content_range = parse_range(range_header, stat_result.st_size)
+    except ValueError:
+        return Response(
+            status_code=416,
+            headers={"content-range": f"bytes */{stat_result.st_size}"}
+        )
+
+    return RangeFileResponse(path, stat_result=stat_result,
+                             content_range=content_range,
+                             headers=response_headers, method=method,
+                             filename=os.path.basename(path),
+                             content_disposition_type="inline")
@@ -0,0 +1,267 @@
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import BinaryIO, Iterator
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from config.settings import settings
+
+STORAGE_URL_PREFIX = "storage"
+CHUNK_SIZE = 64 * 1024
+S3_DELETE_BATCH_SIZE = 1000
+
+
+@dataclass
+class StorageObject:
+    key: str
+    size: int
+    modified: datetime
+
+
+class Storage(ABC):
+    """
+    Storage of the avatars and reports. Files are addressed by keys relative
+    to the storage root, e.g. '1/reports/csv/report.csv'
+    """
+
+    @abstractmethod
+    def put(self, key: str, file: BinaryIO,
+            content_type: str = None) -> None:
+        """
+        Function for streaming a file object to the storage
+        :param key: file key
+        :param file: file object opened for reading in binary mode
+        :param content_type: MIME type of the file
+        """
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """
+        Function for opening a stored file for streaming reads
+        :param key: file key
+        :return: file object
+        :raise FileNotFoundError: if the file does not exist
+        """
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """
+        Function for checking if a file exists
+        :param key: file key
+        :return: True if the file exists, False otherwise
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """
+        Function for removing a file, a missing file is ignored
+        :param key: file key
+        """
+
+    def delete_many(self, keys: list[str]) -> None:
+        """
+        Function for removing several files
+        :param keys: file keys
+        """
+        for key in keys:
+            self.delete(key)
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> Iterator[StorageObject]:
+        """
+        Function for iterating over the files under a key prefix
+        :param prefix: key prefix
+        :return: iterator of the stored files
+        """
+
+    @abstractmethod
+    def list_folders(self, prefix: str = "") -> Iterator[str]:
+        """
+        Function for iterating over the folders right under a folder, without
+        listing their files
+        :param prefix: folder key prefix ending with '/', '' for the root
+        :return: iterator of the folder key prefixes ending with '/'
+        """
+
+    def get_url(self, key: str, expires: int = 3600) -> str | None:
+        """
+        Function for creating a presigned download URL
+        :param key: file key
+        :param expires: URL lifetime in seconds
+        :return: URL, None if the storage cannot serve files by itself
+        """
+        return None
+
+
+class LocalStorage(Storage):
+    """
+    Storage in a directory of the local filesystem. The directory must be
+    shared by the application and Celery containers
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def put(self, key: str, file: BinaryIO,
+            content_type: str = None) -> None:
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path),
+                                         delete=False) as tmp:
+            shutil.copyfileobj(file, tmp, CHUNK_SIZE)
+        os.replace(tmp.name, path)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.get_path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.get_path(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.get_path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix: str = "") -> Iterator[StorageObject]:
+        # Only the folder of the prefix is walked
+        base = os.path.join(self.root, *prefix.split("/")[:-1])
+        for directory, _, files in os.walk(base):
+            for name in sorted(files):
+                path = os.path.join(directory, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if not key.startswith(prefix):
+                    continue
+                try:
+                    stat_result = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield StorageObject(
+                    key=key, size=stat_result.st_size,
+                    modified=datetime.fromtimestamp(stat_result.st_mtime,
+                                                    timezone.utc)
+                )
+
+    def list_folders(self, prefix: str = "") -> Iterator[str]:
+        try:
+            entries = sorted(os.scandir(self.get_path(prefix)),
+                             key=lambda entry: entry.name)
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.is_dir():
+                yield f"{prefix}{entry.name}/"
+
+
+class S3Storage(Storage):
+    """
+    Storage in a bucket of an S3-compatible service (AWS S3, MinIO). Files
+    over the multipart threshold are uploaded in parts
+    """
+
+    def __init__(self, bucket: str, endpoint_url: str = None,
+                 access_key: str = None, secret_key: str = None,
+                 region: str = None,
+                 multipart_threshold: int = 8 * 1024 * 1024):
+        self.bucket = bucket
+        self.client = boto3.client(
+            "s3", endpoint_url=endpoint_url, region_name=region,
+            aws_access_key_id=access_key, aws_secret_access_key=secret_key
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_threshold
+        )
+
+    def put(self, key: str, file: BinaryIO,
+            content_type: str = None) -> None:
+        extra_args = {"ContentType": content_type} if content_type else None
+        self.client.upload_fileobj(file, self.bucket, key,
+                                   ExtraArgs=extra_args,
+                                   Config=self.transfer_config)
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key)
+        return response["Body"]
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return False
+            raise
+        return True
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def delete_many(self, keys: list[str]) -> None:
+        for index in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+            objects = [{"Key": key}
+                       for key in keys[index:index + S3_DELETE_BATCH_SIZE]]
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": objects, "Quiet": True}
+            )
+
+    def list(self, prefix: str = "") -> Iterator[StorageObject]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                yield StorageObject(key=item["Key"], size=item["Size"],
+                                    modified=item["LastModified"])
+
+    def list_folders(self, prefix: str = "") -> Iterator[str]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix,
+                                       Delimiter="/"):
+            for item in page.get("CommonPrefixes", []):
+                yield item["Prefix"]
+
+    def get_url(self, key: str, expires: int = 3600) -> str | None:
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expires
+        )
+
+
+def create_storage() -> Storage:
+    """
+    Function for creating the storage backend set by STORAGE_BACKEND
+    :return: storage backend
+    """
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(settings.STORAGE_PATH)
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=settings.S3_BUCKET, endpoint_url=settings.S3_ENDPOINT_URL,
+            access_key=settings.S3_ACCESS_KEY,
+            secret_key=settings.S3_SECRET_KEY, region=settings.S3_REGION
+        )
+    raise ValueError(
+        f"Unsupported storage backend: {settings.STORAGE_BACKEND}"
+    )
+
+
+def get_storage_url(key: str) -> str:
+    """
+    Function for composing the API path of a stored file
+    :param key: file key
+    :return: path served by the files router
+    """
+    return f"{STORAGE_URL_PREFIX}/{key}"
+
+
+storage = create_storage()
@@ -1,17 +1,29 @@
+import os
+
 import socketio
 from auth import auth_routers
 from auth.utils.auth_utils import create_superuser
 from config.database import database
 from config.settings import settings
 from fastapi import FastAPI
+from files import files_routers
 from meetups import meetups_routers
+from meetups.utils.geo_index import geo_index
+from meetups.utils.search_cache import (listen_catalog_changes,
+                                        on_catalog_change)
 from meetups_logging import logger
 from middlewares.auth_middleware import AuthMiddleware
+from middlewares.body_size_middleware import BodySizeLimitMiddleware
 from middlewares.request_middleware import RequestContextMiddleware
+from prometheus_client import (REGISTRY, CollectorRegistry, multiprocess,
+                               start_http_server)
 from sio_server import sio
 from starlette.middleware.authentication import AuthenticationMiddleware
 from worker.celery import create_celery
 
+# Room for the multipart boundaries and headers around an uploaded file
+MULTIPART_OVERHEAD = 64 * 1024
+
 # Create FastAPI app
 fastapi = FastAPI(title=settings.app_name)
 
@@ -29,6 +41,28 @@ fastapi.include_router(meetups_routers.router, prefix="/meetups",
                        tags=["Meetups"])
 fastapi.include_router(meetups_routers.router_admin, prefix="/meetups/admin",
                        tags=["Admin meetups"])
+fastapi.include_router(files_routers.router, prefix="/storage",
+                       tags=["Files"])
+
+
+def start_metrics_server() -> None:
+    """
+    Function for serving the Prometheus metrics on METRICS_PORT. The port is
+    reachable by the Datadog agent in the services network only and is not
+    published like the API port. With PROMETHEUS_MULTIPROC_DIR the metrics of
+    all the workers are collected from that directory, and they are served by
+    the worker which binds the port first
+    """
+    if not settings.METRICS_PORT:
+        return
+    registry = REGISTRY
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    try:
+        start_http_server(settings.METRICS_PORT, registry=registry)
+    except OSError as e:
+        logger.info(f"Metrics are served by another worker. Exception: {e}")
 
 
 @fastapi.on_event("startup")
@@ -36,11 +70,22 @@ async def startup():
     logger.info("Python meetups has been started")
     fastapi.add_middleware(AuthenticationMiddleware, backend=AuthMiddleware())
     fastapi.add_middleware(RequestContextMiddleware)
+    fastapi.add_middleware(BodySizeLimitMiddleware, limits={
+        "/users/upload_avatar": settings.AVATAR_MAX_SIZE + MULTIPART_OVERHEAD
+    })
+    start_metrics_server()
     await database.connect()
     await create_superuser()
+    fastapi.catalog_listener = await listen_catalog_changes(
+        str(database.url), (on_catalog_change, geo_index.on_catalog_change)
+    )
 
 
 @fastapi.on_event("shutdown")
 async def shutdown():
     logger.info("Python meetups stopped")
     await database.disconnect()
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+    if fastapi.catalog_listener is not None:
+        await fastapi.catalog_listener.close()
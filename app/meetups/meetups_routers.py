@@ -1,16 +1,25 @@
-from typing import List, Union
+from typing import List, Optional, Union
 
 from auth.schemas import SimpleMessage
+from auth.utils.auth_utils import (create_calendar_token,
+                                   get_user_by_calendar_token,
+                                   revoke_calendar_token)
+from config.settings import settings
 from dependencies import get_current_user, superuser_required
-from fastapi import APIRouter, Depends, HTTPException, Request
-from meetups.schemas import (Meetups, MeetupsBase, MeetupsReportCSV,
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from meetups.schemas import (Meetups, MeetupsBase, MeetupsCalendarUrl,
+                             MeetupsNearby, MeetupsReportCSV,
+                             MeetupsSearchResult, MeetupsSuggestions,
                              MeetupsUpdate)
+from meetups.utils.crud import get_all_user_meetups
 from meetups.utils.elastic import query_builder
-from meetups.utils.meetups_utils import get_token
+from meetups.utils.geo_index import MAX_DISTANCE
+from meetups.utils.ics import create_ics_response
+from meetups.utils.meetups_utils import (get_coordinates_by_ip, get_ip,
+                                         parse_coordinates)
 from meetups_logging import logger
-from sio_client import sio
-from socketio.exceptions import ConnectionError
-from starlette.responses import JSONResponse
+from sio_client import connect_sio_client, sio
+from starlette.responses import JSONResponse, Response
 
 router = APIRouter()
 router_admin = APIRouter()
@@ -22,12 +31,7 @@ router_admin = APIRouter()
 )
 async def view_all_meetups(request: Request):
     """ The API endpoint for getting all meetups """
-    token = get_token(request.headers.get("authorization"))
-
-    try:
-        await sio.connect("http://localhost:8000/", auth={"token": token})
-    except ConnectionError:
-        pass
+    await connect_sio_client()
 
     try:
         message = await sio.call(event="view_all_meetups")
@@ -52,13 +56,9 @@ async def create_meetup(request: Request, new_meetup: MeetupsBase):
     """
     The API endpoint for new meetup create. Superuser permissions required
     """
-    token = get_token(request.headers.get("authorization"))
     new_meetup = {**dict(new_meetup), "date": str(dict(new_meetup)["date"])}
 
-    try:
-        await sio.connect("http://localhost:8000/", auth={"token": token})
-    except ConnectionError:
-        pass
+    await connect_sio_client()
 
     try:
         message = await sio.call(event="create_meetup", data=new_meetup)
@@ -84,13 +84,9 @@ async def update_meetup(
         request: Request, meetup_id: int, meetup_data: MeetupsUpdate
 ):
     """ The API endpoint for meetup data updating """
-    token = get_token(request.headers.get("authorization"))
     meetup_data = dict(meetup_data)
 
-    try:
-        await sio.connect("http://localhost:8000/", auth={"token": token})
-    except ConnectionError:
-        pass
+    await connect_sio_client()
 
     try:
         message = await sio.call(event="update_meetup",
@@ -117,12 +113,7 @@ async def update_meetup(
 )
 async def delete_meetup(request: Request, meetup_id: int):
     """ The API endpoint for meetup removal """
-    token = get_token(request.headers.get("authorization"))
-
-    try:
-        await sio.connect("http://localhost:8000/", auth={"token": token})
-    except ConnectionError:
-        pass
+    await connect_sio_client()
 
     try:
         message = await sio.call(event="delete_meetup",
@@ -147,12 +138,8 @@ async def delete_meetup(request: Request, meetup_id: int):
 async def follow_meetup(meetup_id: int, request: Request):
     """ The API endpoint for meetup subscription creation """
     user_id = request.user.id
-    token = get_token(request.headers.get("authorization"))
 
-    try:
-        await sio.connect("http://localhost:8000/", auth={"token": token})
-    except ConnectionError:
-        pass
+    await connect_sio_client()
 
     try:
         message = await sio.call(event="follow_meetup",
@@ -179,12 +166,8 @@ async def follow_meetup(meetup_id: int, request: Request):
 async def unfollow_meetup(meetup_id: int, request: Request):
     """ The API endpoint for meetup subscription removal """
     user_id = request.user.id
-    token = get_token(request.headers.get("authorization"))
 
-    try:
-        await sio.connect("http://localhost:8000/", auth={"token": token})
-    except ConnectionError:
-        pass
+    await connect_sio_client()
 
     try:
         message = await sio.call(event="unfollow_meetup",
@@ -213,12 +196,8 @@ async def unfollow_meetup(meetup_id: int, request: Request):
 async def browse_user_meetups(request: Request):
     """ The API endpoint for browsing all user's subscribed meetups """
     user_id = request.user.id
-    token = get_token(request.headers.get("authorization"))
 
-    try:
-        await sio.connect("http://localhost:8000/", auth={"token": token})
-    except ConnectionError:
-        pass
+    await connect_sio_client()
 
     try:
         message = await sio.call(event="browse_user_meetups",
@@ -238,6 +217,61 @@ async def browse_user_meetups(request: Request):
         )
 
 
+@router.post("/calendar/token", response_model=MeetupsCalendarUrl,
+             dependencies=[Depends(get_current_user)])
+async def create_user_calendar_url(request: Request):
+    """ The API endpoint for issuing the URL of the user's iCalendar feed.
+        The previously issued URL stops working """
+    try:
+        token = await create_calendar_token(request.user.id)
+    except Exception as e:
+        logger.error(str(e))
+        raise HTTPException(
+            status_code=500, detail={
+                "success": False,
+                "message": f"Smth went wrong with the calendar URL."
+                           f" Exception: '{str(e)}'"
+            }
+        )
+
+    url = request.url_for("get_user_calendar", token=token)
+    return JSONResponse(status_code=201, content={"url": str(url)})
+
+
+@router.delete("/calendar/token", response_model=SimpleMessage,
+               dependencies=[Depends(get_current_user)])
+async def revoke_user_calendar_url(request: Request):
+    """ The API endpoint for revoking the URL of the user's iCalendar feed """
+    await revoke_calendar_token(request.user.id)
+    return {"success": True, "message": "Calendar URL has been revoked"}
+
+
+@router.get("/calendar/{token}.ics", response_class=Response)
+async def get_user_calendar(request: Request, token: str):
+    """ The API endpoint for the iCalendar feed of user's meetups. Calendar
+        clients can not send the access token, so the feed is authenticated
+        by the secret token of its URL """
+    user = await get_user_by_calendar_token(token)
+    if not user:
+        msg = {"success": False, "message": "Calendar not found"}
+        logger.warning(msg)
+        raise HTTPException(status_code=404, detail=msg)
+
+    try:
+        meetups = await get_all_user_meetups(user.id)
+    except Exception as e:
+        logger.error(str(e))
+        raise HTTPException(
+            status_code=500, detail={
+                "success": False,
+                "message": f"Smth went wrong with the user calendar."
+                           f" Exception: '{str(e)}'"
+            }
+        )
+
+    return create_ics_response(user.id, meetups, request.headers)
+
+
 @router.get(
     "/report/{mode}", response_model=Union[SimpleMessage, MeetupsReportCSV],
     dependencies=[Depends(get_current_user)]
@@ -245,12 +279,8 @@ async def browse_user_meetups(request: Request):
 async def get_meetups_report(request: Request, mode: str):
     """ The API endpoint for meetups report generating """
     user_id = request.user.id
-    token = get_token(request.headers.get("authorization"))
 
-    try:
-        await sio.connect("http://localhost:8000/", auth={"token": token})
-    except ConnectionError:
-        pass
+    await connect_sio_client()
 
     try:
         message = await sio.call(event="get_meetups_report",
@@ -274,19 +304,20 @@ async def get_meetups_report(request: Request, mode: str):
 
 @router.get("/search",
             dependencies=[Depends(get_current_user)],
-            response_model=Union[List[Meetups], SimpleMessage])
+            response_model=Union[List[MeetupsSearchResult], SimpleMessage])
 async def search(
-        request: Request, query_body: dict = Depends(query_builder.build())
+        request: Request, query_body: dict = Depends(query_builder.build()),
+        composite_rank: bool = Query(False)
 ):
-    """ The API endpoint for searching meetups using ElasticSearch client"""
-    token = get_token(request.headers.get("authorization"))
-    try:
-        await sio.connect("http://localhost:8000/", auth={"token": token})
-    except ConnectionError:
-        pass
+    """ The API endpoint for searching meetups using ElasticSearch client.
+    Results have the distance from the client point, the composite rank
+    orders them by the text score, distance and date together """
+    await connect_sio_client()
 
     try:
-        response = await sio.call(event="search", data=query_body)
+        response = await sio.call(event="search", data={
+            "query_body": query_body, "composite_rank": composite_rank
+        })
 
         if type(response) == dict and not response.get("success"):
             return JSONResponse(status_code=500, content=response)
@@ -301,3 +332,65 @@ async def search(
                            f" Exception: '{str(e)}'"
             }
         )
+
+
+@router.get("/nearby",
+            dependencies=[Depends(get_current_user)],
+            response_model=Union[List[MeetupsNearby], SimpleMessage])
+async def nearby(
+        client_point: Optional[str] = Query(None),
+        radius: Optional[float] = Query(None, gt=0, le=MAX_DISTANCE),
+        size: int = Query(10, ge=1, le=settings.NEARBY_MAX_SIZE)
+):
+    """ The API endpoint for the nearest actual meetups, within the radius
+    (km) if it is set """
+    coordinates = parse_coordinates(client_point) if client_point else None
+    if coordinates is None:
+        point = get_coordinates_by_ip(get_ip())
+        coordinates = (float(point["lat"]), float(point["lon"]))
+
+    await connect_sio_client()
+
+    try:
+        response = await sio.call(event="nearby", data={
+            "lat": coordinates[0], "lon": coordinates[1],
+            "radius": radius, "size": size
+        })
+        return JSONResponse(status_code=200, content=response)
+
+    except Exception as e:
+        logger.error(str(e))
+        raise HTTPException(
+            status_code=500, detail={
+                "success": False,
+                "message": f"Smth went wrong with nearby meetups."
+                           f" Exception: '{str(e)}'"
+            }
+        )
+
+
+@router.get("/suggest",
+            dependencies=[Depends(get_current_user)],
+            response_model=Union[MeetupsSuggestions, SimpleMessage])
+async def suggest(
+        prefix: str = Query(..., min_length=1, max_length=64),
+        size: int = Query(5, ge=1, le=settings.SUGGEST_MAX_SIZE)
+):
+    """ The API endpoint for type-ahead suggestions of meetups, themes and
+    places names """
+    await connect_sio_client()
+
+    try:
+        response = await sio.call(event="suggest",
+                                  data={"prefix": prefix, "size": size})
+        return JSONResponse(status_code=200, content=response)
+
+    except Exception as e:
+        logger.error(str(e))
+        raise HTTPException(
+            status_code=500, detail={
+                "success": False,
+                "message": f"Smth went wrong with meetups suggestions."
+                           f" Exception: '{str(e)}'"
+            }
+        )
@@ -1,25 +1,59 @@
 from config.database import Base
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import (CheckConstraint, Column, Computed, DateTime, Float,
+                        ForeignKey, Index, Integer, String, Text,
+                        UniqueConstraint, text)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 
 
 class Places(Base):
     __tablename__ = "places"
+    __table_args__ = (
+        Index("ix_places_search_vector", "search_vector",
+              postgresql_using="gin"),
+        Index("ix_places_earth", text("ll_to_earth(latitude, longitude)"),
+              postgresql_using="gist"),
+        CheckConstraint("latitude BETWEEN -90 AND 90",
+                        name="ck_places_latitude"),
+        CheckConstraint("longitude BETWEEN -180 AND 180",
+                        name="ck_places_longitude"),
+    )
 
     place_name = Column(String(128))
     id = Column(Integer, primary_key=True)
     location = Column(String(128))
+    latitude = Column(Float)
+    longitude = Column(Float)
+    search_vector = Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', coalesce(place_name, '')), 'C')",
+        persisted=True
+    ))
 
 
 class Themes(Base):
     __tablename__ = "themes"
+    __table_args__ = (
+        Index("ix_themes_search_vector", "search_vector",
+              postgresql_using="gin"),
+    )
 
     id = Column(Integer, primary_key=True)
     tags = Column(String(128))
     theme = Column(String(128))
+    search_vector = Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', coalesce(theme, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(tags, '')), 'C')",
+        persisted=True
+    ))
 
 
 class Meetups(Base):
     __tablename__ = "meetups"
+    __table_args__ = (
+        CheckConstraint("subscribers_count >= 0",
+                        name="ck_meetups_subscribers_count"),
+        Index("ix_meetups_search_vector", "search_vector",
+              postgresql_using="gin"),
+    )
 
     meetup_name = Column(String(128))
     theme_id = Column(ForeignKey("themes.id"))
@@ -27,10 +61,21 @@ class Meetups(Base):
     id = Column(Integer, primary_key=True)
     description = Column(Text())
     date = Column(DateTime())
+    subscribers_count = Column(Integer, nullable=False, server_default="0")
+    capacity = Column(Integer)
+    search_vector = Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', coalesce(meetup_name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'D')",
+        persisted=True
+    ))
 
 
 class MeetupsUsers(Base):
     __tablename__ = "meetups_users"
+    __table_args__ = (
+        UniqueConstraint("user_id", "meetup_id",
+                         name="uq_meetups_users_user_id_meetup_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(ForeignKey("users.id", ondelete='CASCADE'))
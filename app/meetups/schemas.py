@@ -1,6 +1,7 @@
 from datetime import datetime
 
-from pydantic import BaseModel, StrictInt, StrictStr
+from pydantic import (BaseModel, StrictBool, StrictInt, StrictStr, conint,
+                      conlist, validator)
 
 
 class MeetupsBase(BaseModel):
@@ -11,10 +12,12 @@ class MeetupsBase(BaseModel):
     place_name: StrictStr
     meetup_name: StrictStr
     description: StrictStr
+    capacity: conint(strict=True, gt=0) = None
 
 
 class Meetups(MeetupsBase):
     id: StrictInt
+    subscribers_count: StrictInt = 0
 
 
 class MeetupsUpdate(BaseModel):
@@ -25,7 +28,55 @@ class MeetupsUpdate(BaseModel):
     place_name: StrictStr = None
     meetup_name: StrictStr = None
     description: StrictStr = None
+    capacity: conint(strict=True, gt=0) = None
+    remove_capacity: StrictBool = None
+
+    @validator("remove_capacity")
+    def check_remove_capacity(cls, value, values):
+        if value and values.get("capacity") is not None:
+            raise ValueError("capacity can not be set and removed at once")
+        return value
 
 
 class MeetupsReportCSV(BaseModel):
     path: StrictStr
+
+
+class MeetupsCalendarUrl(BaseModel):
+    url: StrictStr
+
+
+class MeetupsNearby(BaseModel):
+    id: StrictInt
+    meetup_name: StrictStr
+    date: datetime
+    description: StrictStr
+    theme: StrictStr
+    tags: StrictStr
+    place_name: StrictStr
+    location: StrictStr
+    distance: float
+
+
+class MeetupsSearchResult(BaseModel):
+    id: StrictInt
+    meetup_name: StrictStr
+    date: datetime
+    description: StrictStr
+    theme: StrictStr
+    tags: StrictStr
+    place_name: StrictStr
+    location: StrictStr
+    score: float = None
+    distance: float = None
+    rank: float = None
+
+
+class MeetupsSuggestions(BaseModel):
+    meetups: list[StrictStr]
+    themes: list[StrictStr]
+    places: list[StrictStr]
+
+
+class MeetupsIds(BaseModel):
+    meetup_ids: conlist(StrictInt, min_items=1, max_items=1000)
@@ -8,13 +8,15 @@ from meetups.utils.meetups_utils import (create_new_place, create_new_theme,
                                          delete_theme_by_id,
                                          get_meetup_by_date_name_place,
                                          get_meetup_by_id,
-                                         get_meetup_users_by_userid_meetup_id,
                                          get_meetups_by_place_id,
                                          get_meetups_by_theme_id,
                                          get_place_by_name_location,
+                                         get_subscriptions_removal_query,
                                          get_theme_by_name_tags,
-                                         is_valid_coordinates)
-from sqlalchemy import and_, delete, insert, select, update
+                                         parse_coordinates, take_meetups_seats)
+from sqlalchemy import (ARRAY, Integer, and_, any_, cast, delete, insert,
+                        literal, select, update)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 
 async def get_all_meetups() -> database:
@@ -23,7 +25,7 @@ async def get_all_meetups() -> database:
         select(
             Meetups.id, Meetups.meetup_name, Meetups.date,
             Meetups.description, Themes.theme, Themes.tags, Places.place_name,
-            Places.location
+            Places.location, Meetups.subscribers_count, Meetups.capacity
         )
         .join(Places, Meetups.place_id == Places.id)
         .join(Themes, Meetups.theme_id == Themes.id)
@@ -33,7 +35,10 @@ async def get_all_meetups() -> database:
 
 
 async def get_all_actual_meetups() -> database:
-    """ Function for getting all actual meetups """
+    """
+    Function for getting all actual meetups. The rows are ordered, so the
+    catalog version does not change when an update moves a row
+    """
     query = (
         select(
             Meetups.id, Meetups.meetup_name, Meetups.date,
@@ -43,11 +48,55 @@ async def get_all_actual_meetups() -> database:
         .join(Places, Meetups.place_id == Places.id)
         .join(Themes, Meetups.theme_id == Themes.id)
         .where(Meetups.date >= datetime.utcnow())
+        .order_by(Meetups.id)
     )
 
     return await database.fetch_all(query)
 
 
+async def get_geo_meetups(place_ids: list[int] | None = None) -> database:
+    """
+    Function for getting actual meetups with their place coordinates
+    :param place_ids: list of place IDs, all places if None
+    :return: list of database objects
+    """
+    query = (
+        select(
+            Meetups.id, Meetups.meetup_name, Meetups.date,
+            Meetups.description, Themes.theme, Themes.tags, Places.place_name,
+            Places.location, Meetups.place_id, Places.latitude,
+            Places.longitude
+        )
+        .join(Places, Meetups.place_id == Places.id)
+        .join(Themes, Meetups.theme_id == Themes.id)
+        .where(and_(Meetups.date >= datetime.utcnow(),
+                    Places.latitude.is_not(None),
+                    Places.longitude.is_not(None)))
+    )
+    if place_ids is not None:
+        query = query.where(Meetups.place_id.in_(place_ids))
+
+    return await database.fetch_all(query)
+
+
+async def get_suggestions_names() -> dict[str, list[str]]:
+    """
+    Function for getting names of actual meetups and of all themes and places
+    :return: dict with lists of names by the suggestions category
+    """
+    meetups = await database.fetch_all(
+        select(Meetups.meetup_name).where(Meetups.date >= datetime.utcnow())
+    )
+    themes = await database.fetch_all(select(Themes.theme).distinct())
+    places = await database.fetch_all(select(Places.place_name).distinct())
+
+    return {
+        "meetups": [record.meetup_name for record in meetups],
+        "themes": [record.theme for record in themes],
+        "places": [record.place_name for record in places],
+    }
+
+
 async def create_new_meetup(meetup: MeetupsBase) -> dict:
     """
      Function for new meetup creation
@@ -60,7 +109,8 @@ async def create_new_meetup(meetup: MeetupsBase) -> dict:
             "success": False,
             "message": "You can not create meetups with an irrelevant date"
         }
-    if not is_valid_coordinates(meetup.location):
+    coordinates = parse_coordinates(meetup.location)
+    if coordinates is None:
         return {"success": False, "message": "Not a valid coordinates"}
 
     # Theme processing
@@ -73,7 +123,9 @@ async def create_new_meetup(meetup: MeetupsBase) -> dict:
         meetup.place_name, meetup.location
     )
     if not place_id:
-        place_id = await create_new_place(meetup.place_name, meetup.location)
+        place_id = await create_new_place(
+            meetup.place_name, meetup.location, *coordinates
+        )
 
     # Check existing meetup
     meetup_db = await get_meetup_by_date_name_place(
@@ -88,6 +140,7 @@ async def create_new_meetup(meetup: MeetupsBase) -> dict:
         .values(date=meetup.date,
                 theme_id=theme_id,
                 place_id=place_id,
+                capacity=meetup.capacity,
                 meetup_name=meetup.meetup_name,
                 description=meetup.description)
         .returning(Meetups.id)
@@ -140,7 +193,8 @@ async def update_meetup_data(
     :return: response with result in JSON format
     """
     meetup_query = (
-        select(Meetups.id, Meetups.theme_id, Meetups.place_id)
+        select(Meetups.id, Meetups.theme_id, Meetups.place_id,
+               Meetups.subscribers_count)
         .where(Meetups.id == meetup_id)
     )
     meetup = await database.fetch_one(meetup_query)
@@ -178,6 +232,17 @@ async def update_meetup_data(
     if meetup_data.description:
         meetup_values["description"] = meetup_data.description
 
+    if meetup_data.capacity:
+        meetup_values["capacity"] = meetup_data.capacity
+        # Checked by the update itself, so a concurrent subscription can
+        # not take a seat above the new capacity
+        meetup_update_query = meetup_update_query.where(
+            Meetups.subscribers_count <= meetup_data.capacity
+        )
+
+    if meetup_data.remove_capacity:
+        meetup_values["capacity"] = None
+
     if meetup_data.theme:
         themes_values["theme"] = meetup_data.theme
 
@@ -188,14 +253,20 @@ async def update_meetup_data(
         places_values["place_name"] = meetup_data.place_name
 
     if meetup_data.location:
-        if not is_valid_coordinates(meetup_data.location):
+        coordinates = parse_coordinates(meetup_data.location)
+        if coordinates is None:
             return {"success": False, "message": "Not a valid coordinates"}
         places_values["location"] = meetup_data.location
+        places_values["latitude"], places_values["longitude"] = coordinates
 
     if meetup_values:
-        await database.fetch_one(
+        updated_meetup = await database.fetch_one(
             query=meetup_update_query, values=meetup_values
         )
+        if not updated_meetup:
+            return {"success": False,
+                    "message": f"Capacity can not be less than the number of "
+                               f"subscribers ({meetup.subscribers_count})"}
     if themes_values:
         await database.fetch_one(
             query=themes_update_query, values=themes_values
@@ -211,53 +282,60 @@ async def update_meetup_data(
 
 async def create_meetup_subscription(user_id: int, meetup_id: int) -> dict:
     """
-    Function for creating a user subscription to a meetup
+    Function for creating a user subscription to a meetup. The idempotent
+    insert and the meetup seat are committed in one transaction
     :param user_id: user ID in integer format
     :param meetup_id: meetup ID in integer format
     :return: result message in JSON format
     """
-    user_meetup_db = await get_meetup_users_by_userid_meetup_id(
-        user_id, meetup_id
-    )
-    if user_meetup_db:
-        return {"success": False,
-                "message": "The user is already subscribed to this meetup"}
-
     query = (
-        insert(MeetupsUsers)
+        pg_insert(MeetupsUsers)
         .values(user_id=user_id,
                 meetup_id=meetup_id)
+        .on_conflict_do_nothing(index_elements=["user_id", "meetup_id"])
+        .returning(MeetupsUsers.id)
     )
-    await database.fetch_one(query)
+
+    transaction = await database.transaction()
+    try:
+        user_meetup_db = await database.fetch_one(query)
+        if not user_meetup_db:
+            await transaction.rollback()
+            return {"success": False,
+                    "message": "The user is already subscribed to this meetup"}
+
+        if not await take_meetups_seats([meetup_id]):
+            await transaction.rollback()
+            return {"success": False,
+                    "message": f"Meetup (meetup_id={meetup_id}) is full"}
+    except Exception:
+        await transaction.rollback()
+        raise
+    await transaction.commit()
+
     return {"success": True,
             "message": "Subscription was successfully completed"}
 
 
 async def remove_meetup_subscription(user_id: int, meetup_id: int) -> dict:
     """
-    Function for meetup subscription removal
+    Function for meetup subscription removal by a single query
     :param user_id: user ID in integer format
     :param meetup_id: meetup ID in integer format
     :return: result message in JSON format
     """
-    user_meetup_db = await get_meetup_users_by_userid_meetup_id(
-        user_id=user_id, meetup_id=meetup_id
+    query = get_subscriptions_removal_query(
+        and_(MeetupsUsers.meetup_id == meetup_id,
+             MeetupsUsers.user_id == user_id)
     )
-    if not user_meetup_db:
+    meetup_db = await database.fetch_one(query)
+    if not meetup_db:
         return {
             "success": False,
             "message": f"Meetup subscription does not exist (uid={user_id}, "
                        f"mid={meetup_id})"
         }
 
-    query = (
-        delete(MeetupsUsers)
-        .where(and_(MeetupsUsers.meetup_id == meetup_id,
-                    MeetupsUsers.user_id == user_id))
-    )
-
-    await database.fetch_one(query)
-
     return {
         "success": True,
         "message": f"Meetup subscription has been deleted (uid={user_id}, "
@@ -265,6 +343,120 @@ async def remove_meetup_subscription(user_id: int, meetup_id: int) -> dict:
     }
 
 
+async def create_meetup_subscriptions(
+        user_id: int, meetups_ids: list[int]
+) -> list[dict]:
+    """
+    Function for creating user subscriptions to several meetups by set-based
+    queries in one transaction. Existing subscriptions, unknown and full
+    meetups are skipped
+    :param user_id: user ID in integer format
+    :param meetups_ids: list of meetups IDs in integer format
+    :return: list of result messages for every meetup in JSON format
+    """
+    meetups_ids = list(dict.fromkeys(meetups_ids))
+    targets = (
+        select(Meetups.id)
+        .where(Meetups.id == any_(literal(meetups_ids, ARRAY(Integer))))
+        .cte("targets")
+    )
+    inserted = (
+        pg_insert(MeetupsUsers)
+        .from_select(["user_id", "meetup_id"],
+                     select(cast(literal(user_id), Integer), targets.c.id))
+        .on_conflict_do_nothing(index_elements=["user_id", "meetup_id"])
+        .returning(MeetupsUsers.meetup_id)
+        .cte("inserted")
+    )
+    query = (
+        select(targets.c.id, inserted.c.meetup_id.isnot(None).label("created"))
+        .outerjoin(inserted, inserted.c.meetup_id == targets.c.id)
+    )
+
+    transaction = await database.transaction()
+    try:
+        records = await database.fetch_all(query)
+        created = {record.id: record.created for record in records}
+        new_ids = [meetup_id for meetup_id in created if created[meetup_id]]
+
+        seated = await take_meetups_seats(new_ids) if new_ids else set()
+        full_ids = [meetup_id for meetup_id in new_ids
+                    if meetup_id not in seated]
+        if full_ids:
+            full_query = (
+                delete(MeetupsUsers)
+                .where(and_(
+                    MeetupsUsers.user_id == user_id,
+                    MeetupsUsers.meetup_id == any_(
+                        literal(full_ids, ARRAY(Integer))
+                    )
+                ))
+            )
+            await database.execute(full_query)
+    except Exception:
+        await transaction.rollback()
+        raise
+    await transaction.commit()
+
+    results = []
+    for meetup_id in meetups_ids:
+        if meetup_id in seated:
+            result = {"success": True,
+                      "message": "Subscription was successfully completed"}
+        elif meetup_id in full_ids:
+            result = {"success": False,
+                      "message": f"Meetup (meetup_id={meetup_id}) is full"}
+        elif meetup_id in created:
+            result = {"success": False,
+                      "message": "The user is already subscribed to this "
+                                 "meetup"}
+        else:
+            result = {"success": False,
+                      "message": f"Meetup (meetup_id={meetup_id}) not found"}
+        results.append({"meetup_id": meetup_id, **result})
+
+    return results
+
+
+async def remove_meetup_subscriptions(
+        user_id: int, meetups_ids: list[int]
+) -> list[dict]:
+    """
+    Function for removal of several user's meetup subscriptions by a single
+    query
+    :param user_id: user ID in integer format
+    :param meetups_ids: list of meetups IDs in integer format
+    :return: list of result messages for every meetup in JSON format
+    """
+    meetups_ids = list(dict.fromkeys(meetups_ids))
+    query = get_subscriptions_removal_query(
+        and_(MeetupsUsers.user_id == user_id,
+             MeetupsUsers.meetup_id == any_(
+                 literal(meetups_ids, ARRAY(Integer))
+             ))
+    )
+    records = await database.fetch_all(query)
+    deleted = {record.id for record in records}
+
+    results = []
+    for meetup_id in meetups_ids:
+        if meetup_id in deleted:
+            result = {
+                "success": True,
+                "message": f"Meetup subscription has been deleted "
+                           f"(uid={user_id}, mid={meetup_id})"
+            }
+        else:
+            result = {
+                "success": False,
+                "message": f"Meetup subscription does not exist "
+                           f"(uid={user_id}, mid={meetup_id})"
+            }
+        results.append({"meetup_id": meetup_id, **result})
+
+    return results
+
+
 async def get_all_user_meetups(user_id: int) -> database:
     """
     A function to get all the meetups the user is subscribed to
@@ -275,13 +467,14 @@ async def get_all_user_meetups(user_id: int) -> database:
         select(
             Meetups.id, Meetups.meetup_name, Meetups.date,
             Meetups.description, Themes.theme, Themes.tags, Places.place_name,
-            Places.location
+            Places.location, Meetups.subscribers_count, Meetups.capacity
         )
         .join(Places, Meetups.place_id == Places.id)
         .join(Themes, Meetups.theme_id == Themes.id)
         .join(MeetupsUsers, and_(MeetupsUsers.user_id == user_id,
                                  MeetupsUsers.meetup_id == Meetups.id))
         .where(Meetups.date >= datetime.utcnow())
+        .order_by(Meetups.id)
     )
 
     return await database.fetch_all(query)
@@ -6,6 +6,9 @@ from meetups.utils.meetups_utils import (get_coordinates_by_ip, get_ip,
                                          is_valid_coordinates)
 
 query_builder = ElasticsearchAPIQueryBuilder()
+# Fields searched by keywords with their boosts, IDs and dates are not matched
+SEARCH_FIELDS = ["meetup_name^4", "themes.theme^3", "themes.tags^2",
+                 "places.place_name^2", "description"]
 
 
 @query_builder.filter()
@@ -39,6 +42,12 @@ def filter_date():
     }
 
 
+@query_builder.sorter()
+def sort_by_score(search_string: Optional[str] = Query(None)):
+    """ Function for sorting keywords search result by relevance first """
+    return "_score" if search_string is not None else None
+
+
 @query_builder.sorter()
 def sort_by():
     """ Function for sorting result values by date """
@@ -54,6 +63,7 @@ def match_fields(search_string: Optional[str] = Query(None)):
         "multi_match": {
             "query": search_string,
             "fuzziness": "AUTO",
-            "fields": ["*"]
+            "prefix_length": 1,
+            "fields": SEARCH_FIELDS
         }
     } if search_string is not None else None
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import math
+import time
+from datetime import datetime
+from itertools import product
+from typing import Iterable
+
+import asyncpg
+import numpy as np
+from config.settings import settings
+from meetups.utils.crud import get_geo_meetups
+from meetups.utils.search_cache import CATALOG_TABLES
+
+# Mean Earth radius in kilometers
+EARTH_RADIUS = 6371.0088
+# Half of the Earth circumference, no point is farther
+MAX_DISTANCE = math.pi * EARTH_RADIUS
+
+
+def haversine_distances(lat: float, lon: float, lats: np.ndarray,
+                        lons: np.ndarray) -> np.ndarray:
+    """
+    Function for computing the great-circle distances from a point to an
+    array of points in one vectorized pass
+    :param lat: point latitude in degrees
+    :param lon: point longitude in degrees
+    :param lats: array of latitudes in degrees
+    :param lons: array of longitudes in degrees
+    :return: array of distances in kilometers
+    """
+    lat, lon = math.radians(lat), math.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = (np.sin((lats - lat) / 2) ** 2
+         + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class GeoIndex:
+    """
+    In-memory spatial index of the actual meetups. Places are bucketed by the
+    grid cells of cell_size degrees and every cell keeps NumPy arrays of its
+    places coordinates, so a query computes the distances to the places of
+    the overlapped cells only. Places are reloaded one by one on the catalog
+    changes, the whole index every GEO_INDEX_TTL seconds
+    """
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.lon_cells = math.ceil(360 / cell_size)
+        self.places: dict[int, tuple[int, int]] = {}
+        self.meetups: dict[int, list[dict]] = {}
+        self.cells: dict[tuple[int, int], dict[int, tuple[float, float]]] = {}
+        self.arrays: dict[tuple[int, int], tuple[np.ndarray, ...]] = {}
+        self.stale_places: set[int] = set()
+        self.rebuild_required = True
+        self.built_at = None
+        self.lock = asyncio.Lock()
+
+    def get_cell(self, lat: float, lon: float) -> tuple[int, int]:
+        """
+        Method for getting the grid cell of a point
+        :param lat: point latitude
+        :param lon: point longitude
+        :return: latitude and longitude indexes of the cell
+        """
+        return (math.floor((lat + 90) / self.cell_size),
+                math.floor((lon + 180) / self.cell_size) % self.lon_cells)
+
+    def update_cell(self, cell: tuple[int, int]) -> None:
+        """
+        Method for rebuilding the coordinates arrays of a cell
+        :param cell: grid cell
+        """
+        places = self.cells.get(cell)
+        if not places:
+            self.cells.pop(cell, None)
+            self.arrays.pop(cell, None)
+            return
+
+        coordinates = np.array(list(places.values()), dtype=np.float64)
+        self.arrays[cell] = (
+            np.fromiter(places, dtype=np.int64, count=len(places)),
+            coordinates[:, 0],
+            coordinates[:, 1],
+        )
+
+    def load(self, records: Iterable, place_ids: list[int] | None = None
+             ) -> None:
+        """
+        Method for replacing places of the index by the database records
+        :param records: actual meetups with their place coordinates
+        :param place_ids: list of reloaded place IDs, all places if None
+        """
+        changed = set()
+        if place_ids is None:
+            self.places, self.meetups, self.cells, self.arrays = {}, {}, {}, {}
+        else:
+            for place_id in place_ids:
+                cell = self.places.pop(place_id, None)
+                self.meetups.pop(place_id, None)
+                if cell is not None:
+                    del self.cells[cell][place_id]
+                    changed.add(cell)
+
+        for record in records:
+            meetup = dict(record)
+            place_id = meetup.pop("place_id")
+            lat, lon = meetup.pop("latitude"), meetup.pop("longitude")
+            if place_id not in self.places:
+                cell = self.get_cell(lat, lon)
+                self.places[place_id] = cell
+                self.cells.setdefault(cell, {})[place_id] = (lat, lon)
+                changed.add(cell)
+            self.meetups.setdefault(place_id, []).append(meetup)
+
+        for meetups in self.meetups.values():
+            meetups.sort(key=lambda item: item["date"])
+        for cell in changed:
+            self.update_cell(cell)
+
+    def get_candidate_cells(self, lat: float, lon: float, radius: float
+                            ) -> list[tuple[int, int]]:
+        """
+        Method for getting the cells overlapped by the bounding box of a
+        circle
+        :param lat: circle center latitude
+        :param lon: circle center longitude
+        :param radius: circle radius in kilometers
+        :return: list of non-empty cells
+        """
+        delta = radius / EARTH_RADIUS
+        lat_rad = math.radians(lat)
+        min_lat = math.degrees(max(lat_rad - delta, -math.pi / 2))
+        max_lat = math.degrees(min(lat_rad + delta, math.pi / 2))
+        lat_cells = range(self.get_cell(min_lat, lon)[0],
+                          self.get_cell(max_lat, lon)[0] + 1)
+
+        if -90 < min_lat and max_lat < 90:
+            lon_span = math.degrees(math.asin(math.sin(delta)
+                                              / math.cos(lat_rad)))
+            first = math.floor((lon - lon_span + 180) / self.cell_size)
+            last = math.floor((lon + lon_span + 180) / self.cell_size)
+            lon_cells = {index % self.lon_cells
+                         for index in range(first, last + 1)}
+        else:
+            lon_cells = range(self.lon_cells)
+
+        if len(lat_cells) * len(lon_cells) > len(self.arrays):
+            return [cell for cell in self.arrays
+                    if cell[0] in lat_cells and cell[1] in lon_cells]
+        return [cell for cell in product(lat_cells, lon_cells)
+                if cell in self.arrays]
+
+    def within(self, lat: float, lon: float, radius: float
+               ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Method for getting the places within a radius, the nearest first
+        :param lat: point latitude
+        :param lon: point longitude
+        :param radius: radius in kilometers
+        :return: arrays of place IDs and their distances in kilometers
+        """
+        cells = self.get_candidate_cells(lat, lon, radius)
+        if not cells:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        place_ids, lats, lons = (
+            np.concatenate(arrays) for arrays in zip(
+                *(self.arrays[cell] for cell in cells)
+            )
+        )
+        distances = haversine_distances(lat, lon, lats, lons)
+        mask = distances <= radius
+        place_ids, distances = place_ids[mask], distances[mask]
+        order = np.argsort(distances, kind="stable")
+        return place_ids[order], distances[order]
+
+    def collect(self, place_ids: np.ndarray, distances: np.ndarray,
+                size: int) -> list[dict]:
+        """
+        Method for getting the actual meetups of the places
+        :param place_ids: array of place IDs, the nearest first
+        :param distances: array of the places distances in kilometers
+        :param size: maximum number of meetups
+        :return: list of meetups with the distance, the nearest first
+        """
+        now = datetime.utcnow()
+        result = []
+        for place_id, distance in zip(place_ids.tolist(), distances.tolist()):
+            for meetup in self.meetups[place_id]:
+                if meetup["date"] < now:
+                    continue
+                result.append({**meetup, "date": str(meetup["date"]),
+                               "distance": round(distance, 3)})
+                if len(result) == size:
+                    return result
+        return result
+
+    def search(self, lat: float, lon: float, size: int,
+               radius: float | None = None) -> list[dict]:
+        """
+        Method for getting the nearest actual meetups. Without a radius the
+        searched circle grows from one cell until enough meetups are found
+        :param lat: point latitude
+        :param lon: point longitude
+        :param size: maximum number of meetups
+        :param radius: maximum distance in kilometers
+        :return: list of meetups with the distance, the nearest first
+        """
+        if radius is not None:
+            return self.collect(*self.within(lat, lon, radius), size)
+
+        radius = math.radians(self.cell_size) * EARTH_RADIUS
+        while True:
+            result = self.collect(*self.within(lat, lon, radius), size)
+            if len(result) == size or radius >= MAX_DISTANCE:
+                return result
+            radius = min(radius * 2, MAX_DISTANCE)
+
+    async def refresh(self) -> None:
+        """ Method for reloading the changed places from the database """
+        async with self.lock:
+            if self.rebuild_required or time.monotonic() > \
+                    self.built_at + settings.GEO_INDEX_TTL:
+                self.rebuild_required = False
+                self.stale_places.clear()
+                self.load(await get_geo_meetups())
+                self.built_at = time.monotonic()
+            elif self.stale_places:
+                place_ids = list(self.stale_places)
+                self.stale_places.clear()
+                self.load(await get_geo_meetups(place_ids), place_ids)
+
+    async def nearby(self, lat: float, lon: float, size: int,
+                     radius: float | None = None) -> list[dict]:
+        """
+        Method for getting the nearest actual meetups from the refreshed
+        index
+        :param lat: point latitude
+        :param lon: point longitude
+        :param size: maximum number of meetups
+        :param radius: maximum distance in kilometers
+        :return: list of meetups with the distance, the nearest first
+        """
+        await self.refresh()
+        return self.search(lat, lon, size, radius)
+
+    def on_catalog_change(self, connection: asyncpg.Connection, pid: int,
+                          channel: str, payload: str) -> None:
+        """
+        Method for handling pgsync notifications. Changed places and places
+        of changed meetups are reloaded, other changes rebuild the index
+        :param connection: listening connection
+        :param pid: ID of the notifying database backend
+        :param channel: notification channel
+        :param payload: notification with the changed rows keys in JSON
+        format
+        """
+        try:
+            change = json.loads(payload)
+            table = change["table"]
+        except (ValueError, KeyError, TypeError):
+            self.rebuild_required = True
+            return
+        if table not in CATALOG_TABLES:
+            return
+
+        key = "id" if table == "places" else "place_id"
+        place_ids = {row.get(key) for row in (change.get("new"),
+                                              change.get("old")) if row}
+        if table == "themes" or not place_ids or None in place_ids:
+            self.rebuild_required = True
+        else:
+            self.stale_places.update(place_ids)
+
+
+geo_index = GeoIndex(cell_size=settings.GEO_INDEX_CELL)
@@ -0,0 +1,202 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, Iterator
+
+from config.settings import settings
+from files.utils.files_utils import PRIVATE_CACHE_CONTROL, is_etag_matched
+from meetups.utils.meetups_utils import (get_catalog_version,
+                                         is_valid_coordinates)
+from starlette.datastructures import Headers
+from starlette.responses import Response, StreamingResponse
+
+ICS_CONTENT_TYPE = "text/calendar; charset=utf-8"
+# Maximum length of a content line in octets, longer lines are folded
+ICS_LINE_LENGTH = 75
+# Meetup fields rendered to the feed
+ICS_FIELDS = ("id", "meetup_name", "date", "description", "theme",
+              "place_name", "location")
+
+
+class IcsFeedCache:
+    """
+    Cache of the rendered iCalendar feeds. Keeps the last rendering of a user
+    feed with its version, the least recently used feeds are evicted
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.feeds: OrderedDict[int, tuple[str, bytes]] = OrderedDict()
+
+    def get(self, user_id: int, version: str) -> bytes | None:
+        """
+        Method for getting the feed rendering of the given version
+        :param user_id: user ID in integer format
+        :param version: version of the user's subscriptions
+        :return: rendered feed, None if it is not cached
+        """
+        cached = self.feeds.get(user_id)
+        if cached is None or cached[0] != version:
+            return None
+        self.feeds.move_to_end(user_id)
+        return cached[1]
+
+    def put(self, user_id: int, version: str, content: bytes) -> None:
+        """
+        Method for caching the feed rendering
+        :param user_id: user ID in integer format
+        :param version: version of the user's subscriptions
+        :param content: rendered feed
+        """
+        self.feeds[user_id] = (version, content)
+        self.feeds.move_to_end(user_id)
+        while len(self.feeds) > self.max_size:
+            self.feeds.popitem(last=False)
+
+    def stream(self, user_id: int, version: str,
+               chunks: Iterable[str]) -> Iterator[bytes]:
+        """
+        Method for streaming the feed chunks. The rendering is cached when
+        all the chunks have been sent
+        :param user_id: user ID in integer format
+        :param version: version of the user's subscriptions
+        :param chunks: rendered parts of the feed
+        :return: iterator of the encoded chunks
+        """
+        rendered = []
+        for chunk in chunks:
+            data = chunk.encode()
+            rendered.append(data)
+            yield data
+        self.put(user_id, version, b"".join(rendered))
+
+
+def escape_ics_text(value) -> str:
+    """
+    Function for escaping a text property value
+    :param value: property value
+    :return: escaped value
+    """
+    return (
+        str(value).replace("\\", "\\\\").replace(";", "\\;")
+        .replace(",", "\\,").replace("\r", "").replace("\n", "\\n")
+    )
+
+
+def fold_ics_line(line: str) -> str:
+    """
+    Function for folding a content line longer than 75 octets. Lines are
+    never split inside a multi-byte character
+    :param line: content line without the line break
+    :return: folded line ending with the line break
+    """
+    data = line.encode()
+    parts, limit = [], ICS_LINE_LENGTH
+    while len(data) > limit:
+        cut = limit
+        while data[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(data[:cut])
+        data, limit = data[cut:], ICS_LINE_LENGTH - 1
+    parts.append(data)
+    return b"\r\n ".join(parts).decode() + "\r\n"
+
+
+def format_ics_date(date: datetime) -> str:
+    """ Function for formatting a UTC date as an iCalendar date-time """
+    return date.strftime("%Y%m%dT%H%M%SZ")
+
+
+def render_ics_event(meetup, dtstamp: datetime) -> str:
+    """
+    Function for rendering a meetup as the VEVENT component
+    :param meetup: database Record with the meetup
+    :param dtstamp: date of the feed rendering
+    :return: rendered component
+    """
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:meetup-{meetup['id']}@{settings.app_name.replace(' ', '-')}",
+        f"DTSTAMP:{format_ics_date(dtstamp)}",
+        f"DTSTART:{format_ics_date(meetup['date'])}",
+        f"SUMMARY:{escape_ics_text(meetup['meetup_name'])}",
+    ]
+    if meetup["description"]:
+        lines.append(f"DESCRIPTION:{escape_ics_text(meetup['description'])}")
+    if meetup["place_name"]:
+        lines.append(f"LOCATION:{escape_ics_text(meetup['place_name'])}")
+    if meetup["location"] and is_valid_coordinates(meetup["location"]):
+        lat, lon = meetup["location"].split(",")
+        lines.append(f"GEO:{lat.strip()};{lon.strip()}")
+    if meetup["theme"]:
+        lines.append(f"CATEGORIES:{escape_ics_text(meetup['theme'])}")
+    lines.append("END:VEVENT")
+
+    return "".join(fold_ics_line(line) for line in lines)
+
+
+def iterate_ics_feed(meetups: Iterable,
+                     dtstamp: datetime | None = None) -> Iterator[str]:
+    """
+    Function for rendering the iCalendar feed one component at a time
+    :param meetups: database Records with meetups
+    :param dtstamp: date of the feed rendering, current date by default
+    :return: iterator of the rendered feed parts
+    """
+    dtstamp = dtstamp or datetime.utcnow()
+
+    yield "".join(fold_ics_line(line) for line in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:-//{settings.app_name}//Meetups//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_ics_text(settings.app_name)}",
+    ))
+    for meetup in meetups:
+        yield render_ics_event(meetup, dtstamp)
+    yield fold_ics_line("END:VCALENDAR")
+
+
+def get_ics_feed_version(meetups: Iterable) -> str:
+    """
+    Function for getting the version of the user's subscriptions. Only the
+    rendered fields are hashed, in the meetup ID order, so other meetup
+    changes and the rows order keep the version
+    :param meetups: database Records with the user's meetups
+    :return: feed version in hex format
+    """
+    return get_catalog_version(sorted(
+        tuple(meetup[field] for field in ICS_FIELDS) for meetup in meetups
+    ))
+
+
+def create_ics_response(user_id: int, meetups: list,
+                        headers: Headers) -> Response:
+    """
+    Function for creating a response with the user's iCalendar feed. Supports
+    conditional (If-None-Match) requests, the cached rendering of the same
+    version is sent without rendering
+    :param user_id: user ID in integer format
+    :param meetups: database Records with the user's meetups
+    :param headers: request headers
+    :return: feed response or 304 response
+    """
+    version = get_ics_feed_version(meetups)
+    etag = f'"{version}"'
+    response_headers = {"etag": etag, "cache-control": PRIVATE_CACHE_CONTROL}
+
+    if is_etag_matched(etag, headers.get("if-none-match")):
+        return Response(status_code=304, headers=response_headers)
+
+    content = ics_feed_cache.get(user_id, version)
+    if content is not None:
+        return Response(content, headers=response_headers,
+                        media_type=ICS_CONTENT_TYPE)
+
+    return StreamingResponse(
+        ics_feed_cache.stream(user_id, version, iterate_ics_feed(meetups)),
+        headers=response_headers, media_type=ICS_CONTENT_TYPE
+    )
+
+
+ics_feed_cache = IcsFeedCache(settings.ICS_CACHE_SIZE)
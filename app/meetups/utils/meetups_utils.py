@@ -1,17 +1,53 @@
 import csv
+import hashlib
+import io
+import itertools
+import json
+import mimetypes
 import os
-from datetime import datetime
-
+import re
+import shutil
+import tempfile
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Callable, Iterable, Iterator
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
 import requests
 from config.database import database
 from config.settings import settings
 from fastapi import HTTPException
+from files.utils.storage import StorageObject, get_storage_url, storage
 from meetups.models import Meetups, MeetupsUsers, Places, Themes
 from meetups.utils.pdf import TablePDF
 from meetups_logging import logger
 from middlewares.request_middleware import get_client_ip
 from pydantic import FutureDate
-from sqlalchemy import and_, delete, insert, select
+from sqlalchemy import (ARRAY, Integer, and_, any_, delete, insert, literal,
+                        or_, select, update)
+from sqlalchemy.sql.expression import ColumnElement, Update
+
+REPORT_KEY_PATTERN = re.compile(r"^(?:(\d+)/)?reports/([^/]+)/[^/]+$")
+# Folder of the shared reports, the legacy ones are under '{user_id}/reports/'
+REPORTS_PREFIX = "reports/"
+# Number of rows passed to the report writers at once
+REPORT_BATCH_SIZE = 1000
+# Arrow types of the report columns, the other columns are strings
+REPORT_ARROW_TYPES = {"id": pa.int64(), "date": pa.timestamp("us")}
+
+
+@dataclass(frozen=True)
+class ReportFormat:
+    writer: Callable[[BinaryIO, tuple, Iterator[list]], None]
+    extension: str
+    content_type: str
+
+
+# Report writers by the format name, filled by register_report_format
+report_formats: dict[str, ReportFormat] = {}
 
 
 async def get_theme_by_name_tags(name: str, tags: str) -> int | None:
@@ -117,17 +153,23 @@ async def get_meetup_by_date_name_place(
     return await database.fetch_one(meetup_select)
 
 
-async def create_new_place(place_name: str, location: str) -> int:
+async def create_new_place(place_name: str, location: str,
+                           latitude: float = None,
+                           longitude: float = None) -> int:
     """
     Function for new place creation
     :param place_name: place name in string format
     :param location: place location in string format
+    :param latitude: parsed place latitude
+    :param longitude: parsed place longitude
     :return: place ID in integer format
     """
     place_insert = (
         insert(Places)
         .values(place_name=place_name,
-                location=location)
+                location=location,
+                latitude=latitude,
+                longitude=longitude)
         .returning(Places.id)
     )
     place = await database.fetch_one(place_insert)
@@ -185,6 +227,63 @@ async def get_meetup_users_by_userid_meetup_id(
     return await database.fetch_one(query)
 
 
+async def take_meetups_seats(meetups_ids: list[int]) -> set[int]:
+    """
+    Function for increasing subscribers counters of the meetups which are not
+    full. Row locks make the capacity check atomic for concurrent requests
+    :param meetups_ids: list of meetups IDs in integer format
+    :return: set of IDs of the meetups with a taken seat
+    """
+    query = (
+        update(Meetups)
+        .where(and_(Meetups.id == any_(literal(meetups_ids, ARRAY(Integer))),
+                    or_(Meetups.capacity.is_(None),
+                        Meetups.subscribers_count < Meetups.capacity)))
+        .values(subscribers_count=Meetups.subscribers_count + 1)
+        .returning(Meetups.id)
+    )
+    meetups = await database.fetch_all(query)
+
+    return {meetup.id for meetup in meetups}
+
+
+def get_subscriptions_removal_query(condition: ColumnElement) -> Update:
+    """
+    Function for building a single query for subscriptions removal which
+    also decreases subscribers counters of the meetups
+    :param condition: condition for the meetups_users rows to remove
+    :return: query returning IDs of the meetups with removed subscriptions
+    """
+    subscriptions = (
+        delete(MeetupsUsers)
+        .where(condition)
+        .returning(MeetupsUsers.meetup_id)
+        .cte("subscriptions")
+    )
+    return (
+        update(Meetups)
+        .where(Meetups.id == subscriptions.c.meetup_id)
+        .values(subscribers_count=Meetups.subscribers_count - 1)
+        .returning(Meetups.id)
+        .add_cte(subscriptions)
+    )
+
+
+async def get_user_meetups_ids(user_id: int) -> list[int]:
+    """
+    Function for getting IDs of all the meetups the user is subscribed to
+    :param user_id: user ID in integer format
+    :return: list of meetups IDs in integer format
+    """
+    query = (
+        select(MeetupsUsers.meetup_id)
+        .where(MeetupsUsers.user_id == user_id)
+    )
+    meetups = await database.fetch_all(query)
+
+    return [meetup.meetup_id for meetup in meetups]
+
+
 def convert_database_records_to_list(records_list: database) -> list:
     """
     Function for processing database Records list
@@ -194,74 +293,367 @@ def convert_database_records_to_list(records_list: database) -> list:
     return [tuple(_ for _ in record.values()) for record in records_list]
 
 
-def create_report_csv(user_id: int, meetups_list: list) -> dict:
+def get_catalog_version(meetups_list: list) -> str:
     """
-    Function for writing all available meetups to CSV file
-    :param user_id: user ID in integer format
-    :param meetups_list: list of database Record with meetups
-    :return: result response message in JSON format
+    Function for getting the version of the meetups catalog. The version is
+    the hash of the meetups data, so it changes with any meetup change
+    :param meetups_list: list with meetups data
+    :return: catalog version in hex format
+    """
+    data = json.dumps(meetups_list, default=str, separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def get_report_key(
+        mode: str, catalog_version: str, filters: dict | None = None
+) -> str:
+    """
+    Function for getting the storage key of a report. Reports of the same
+    catalog version and filters are identical, so the key is shared by all
+    the users
+    :param mode: report format
+    :param catalog_version: version of the meetups catalog
+    :param filters: report filter params
+    :return: storage key of the report
+    """
+    params = json.dumps(
+        {"mode": mode, "version": catalog_version, "filters": filters or {}},
+        default=str, sort_keys=True
+    )
+    digest = hashlib.sha256(params.encode()).hexdigest()
+    return f"reports/{mode}/{digest}.{report_formats[mode].extension}"
+
+
+def register_report_format(
+        mode: str, extension: str, content_type: str
+) -> Callable:
+    """
+    Decorator for registering a report writer. The writer gets a binary file,
+    a tuple of columns names and an iterator of rows batches
+    :param mode: report format name used in the report requests
+    :param extension: report file extension
+    :param content_type: MIME type of the report
+    :return: decorator leaving the writer unchanged
+    """
+    def decorator(writer: Callable) -> Callable:
+        report_formats[mode] = ReportFormat(writer, extension, content_type)
+        mimetypes.add_type(content_type, f".{extension}")
+        return writer
+    return decorator
+
+
+def iterate_batches(rows: Iterable, size: int) -> Iterator[list]:
+    """
+    Function for splitting rows into batches
+    :param rows: iterable with rows
+    :param size: maximum number of rows in a batch
+    :return: iterator of rows lists
+    """
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+@register_report_format("csv", "csv", "text/csv")
+def write_report_csv(
+        file: BinaryIO, tittles: tuple, batches: Iterator[list]
+) -> None:
+    """
+    Function for writing meetups to CSV file
+    :param file: binary file the report is written to
+    :param tittles: tuple of columns names
+    :param batches: iterator of meetups rows batches
+    """
+    csv_file = io.TextIOWrapper(file, newline='')
+    writer = csv.writer(csv_file,
+                        delimiter=',',
+                        lineterminator='\n',
+                        quoting=csv.QUOTE_MINIMAL)
+    for batch in batches:
+        writer.writerows(batch)
+    csv_file.flush()
+    csv_file.detach()
+
+
+@register_report_format("ndjson", "ndjson", "application/x-ndjson")
+def write_report_ndjson(
+        file: BinaryIO, tittles: tuple, batches: Iterator[list]
+) -> None:
+    """
+    Function for writing meetups to NDJSON file, one JSON object per line
+    :param file: binary file the report is written to
+    :param tittles: tuple of columns names
+    :param batches: iterator of meetups rows batches
+    """
+    for batch in batches:
+        file.write("".join(
+            json.dumps(dict(zip(tittles, row)), default=str) + "\n"
+            for row in batch
+        ).encode())
+
+
+@register_report_format("pdf", "pdf", "application/pdf")
+def write_report_pdf(
+        file: BinaryIO, tittles: tuple, batches: Iterator[list]
+) -> None:
+    """
+    Function for writing meetups to PDF file with a table
+    :param file: binary file the report is written to
+    :param tittles: tuple of columns names
+    :param batches: iterator of meetups rows batches
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "report.pdf")
+        pdf = TablePDF(
+            data_list=[row for batch in batches for row in batch],
+            file_path=file_path,
+            tittles=tittles,
+            orientation='L',
+            font="Times",
+            format='A4',
+            size=10,
+        )
+
+        pdf.add_page()
+        pdf.set_title("Available meetups list")
+        pdf.draw_table()
+
+        with open(file_path, 'rb') as pdf_file:
+            shutil.copyfileobj(pdf_file, file)
+
+
+def get_report_schema(tittles: tuple) -> pa.Schema:
+    """
+    Function for getting the Arrow schema of a report
+    :param tittles: tuple of columns names
+    :return: schema with the REPORT_ARROW_TYPES columns types, the other
+    columns are strings
+    """
+    return pa.schema([
+        (str(tittle), REPORT_ARROW_TYPES.get(tittle, pa.string()))
+        for tittle in tittles
+    ])
+
+
+def convert_report_value(value, arrow_type: pa.DataType):
+    """
+    Function for converting a report value to the column type. Rows cross
+    Celery as JSON, so the dates come as ISO strings
+    :param value: report value
+    :param arrow_type: Arrow type of the column
+    :return: converted value, None is kept
     """
-    # Create paths variables
-    base_path = f"storage/{user_id}/reports/csv"
-    file_path = f"{base_path}/report_{datetime.utcnow()}.csv"
+    if value is None:
+        return None
+    if pa.types.is_timestamp(arrow_type):
+        if isinstance(value, str):
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return value
+    if pa.types.is_integer(arrow_type):
+        return int(value)
+    return str(value)
+
+
+def get_arrow_batches(
+        tittles: tuple, batches: Iterator[list]
+) -> Iterator[pa.RecordBatch]:
+    """
+    Function for converting rows batches to Arrow record batches of the
+    report schema
+    :param tittles: tuple of columns names
+    :param batches: iterator of meetups rows batches
+    :return: iterator of record batches with the same schema, one empty
+    batch if there are no rows
+    """
+    schema = get_report_schema(tittles)
+    empty = True
+    for batch in batches:
+        empty = False
+        yield pa.RecordBatch.from_arrays(
+            [pa.array([convert_report_value(value, field.type)
+                       for value in column], type=field.type)
+             for column, field in zip(zip(*batch), schema)],
+            schema=schema
+        )
+
+    if empty:
+        yield pa.RecordBatch.from_pylist([], schema=schema)
+
 
-    # Writing data to CSV file
+def write_arrow_batches(
+        writer_class: type, file: BinaryIO, tittles: tuple,
+        batches: Iterator[list]
+) -> None:
+    """
+    Function for writing rows batches by an Arrow columnar writer. Batches
+    are written as they come, so the report is never kept in memory
+    :param writer_class: writer opened with a file and a schema
+    :param file: binary file the report is written to
+    :param tittles: tuple of columns names
+    :param batches: iterator of meetups rows batches
+    """
+    writer = None
     try:
-        os.makedirs(base_path, exist_ok=True)
-        with open(file_path, 'w') as csv_file:
-            writer = csv.writer(csv_file,
-                                delimiter=',',
-                                lineterminator='\n',
-                                quoting=csv.QUOTE_MINIMAL)
-            writer.writerows(meetups_list)
-    except Exception as e:
-        logger.error(str(e))
-        return {
-            "success": False,
-            "message": f"Writing the file to disk failed. Exception: "
-                       f"'{str(e)}'"
-        }
+        for record_batch in get_arrow_batches(tittles, batches):
+            if writer is None:
+                writer = writer_class(file, record_batch.schema)
+            writer.write_batch(record_batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+@register_report_format("parquet", "parquet", "application/vnd.apache.parquet")
+def write_report_parquet(
+        file: BinaryIO, tittles: tuple, batches: Iterator[list]
+) -> None:
+    """
+    Function for writing meetups to Parquet file, one row group per batch
+    :param file: binary file the report is written to
+    :param tittles: tuple of columns names
+    :param batches: iterator of meetups rows batches
+    """
+    write_arrow_batches(pq.ParquetWriter, file, tittles, batches)
 
-    return {"path": file_path}
+
+@register_report_format("arrow", "arrow",
+                        "application/vnd.apache.arrow.file")
+def write_report_arrow(
+        file: BinaryIO, tittles: tuple, batches: Iterator[list]
+) -> None:
+    """
+    Function for writing meetups to Arrow IPC file
+    :param file: binary file the report is written to
+    :param tittles: tuple of columns names
+    :param batches: iterator of meetups rows batches
+    """
+    write_arrow_batches(ipc.new_file, file, tittles, batches)
 
 
-def create_report_pdf(
-        user_id: int, tittles: tuple, meetups_list: list
+def create_report(
+        mode: str, key: str, tittles: tuple, meetups_list: Iterable
 ) -> dict:
     """
-    Function for PDF report creation
-    :param user_id: user ID in integer format
+    Function for report creation in one of the registered formats. An already
+    stored report is returned without rendering
+    :param mode: report format name
+    :param key: storage key of the report
     :param tittles: tuple of columns names
-    :param meetups_list: list with meetups data
-    :return: result message in JSON format
-    """
-    # Create paths variables
-    base_path = f"storage/{user_id}/reports/pdf"
-    file_path = f"{base_path}/report_{datetime.utcnow()}.pdf"
-
-    pdf = TablePDF(
-        data_list=meetups_list,
-        file_path=file_path,
-        tittles=tittles,
-        orientation='L',
-        font="Times",
-        format='A4',
-        size=10,
-    )
+    :param meetups_list: iterable with meetups data
+    :return: result response message in JSON format
+    """
+    if storage.exists(key):
+        return {"path": get_storage_url(key)}
 
-    pdf.add_page()
-    pdf.set_title("Available meetups list")
+    report_format = report_formats[mode]
 
+    # Writing data to a temporary file and streaming it to the storage
     try:
-        os.makedirs(base_path, exist_ok=True)
-        pdf.draw_table()
+        with tempfile.TemporaryFile() as file:
+            report_format.writer(
+                file, tittles,
+                iterate_batches(meetups_list, REPORT_BATCH_SIZE)
+            )
+            file.seek(0)
+            storage.put(key, file, content_type=report_format.content_type)
+    except Exception as e:
+        logger.error(str(e))
+        return {
+            "success": False,
+            "message": f"Smth went wrong with {mode} report creation. "
+                       f"Exception: '{str(e)}'"
+        }
+
+    return {"path": get_storage_url(key)}
+
+
+def get_expired_reports(
+        reports: list[StorageObject], max_age: timedelta, max_per_user: int,
+        max_total: int, now: datetime
+) -> list[StorageObject]:
+    """
+    Function for selecting the reports violating the retention rules. The
+    newest reports are kept, a report is expired if it is older than max_age
+    or newer reports of its owner or of all the users are over the limits.
+    Reports shared by all the users have no owner and are limited by max_age
+    and max_total only
+    :param reports: stored reports
+    :param max_age: maximum age of a report
+    :param max_per_user: maximum number of reports of one user
+    :param max_total: maximum number of reports of all the users
+    :param now: current time
+    :return: expired reports, the oldest first
+    """
+    expired = []
+    kept_total, kept_per_user = 0, defaultdict(int)
+
+    for report in sorted(reports, key=lambda item: item.modified,
+                         reverse=True):
+        user_id = REPORT_KEY_PATTERN.match(report.key).group(1)
+        if now - report.modified > max_age or \
+                (user_id is not None
+                 and kept_per_user[user_id] >= max_per_user) or \
+                kept_total >= max_total:
+            expired.append(report)
+            continue
+        kept_total += 1
+        kept_per_user[user_id] += 1
+
+    return expired[::-1]
+
+
+def list_reports() -> Iterator[StorageObject]:
+    """
+    Function for listing the stored reports. Only the shared reports folder
+    and the legacy reports folders of the users are listed, not the whole
+    storage
+    :return: iterator of the stored reports
+    """
+    prefixes = [REPORTS_PREFIX] + [
+        f"{folder}{REPORTS_PREFIX}" for folder in storage.list_folders()
+        if folder[:-1].isdigit()
+    ]
+    for prefix in prefixes:
+        for item in storage.list(prefix):
+            if REPORT_KEY_PATTERN.match(item.key):
+                yield item
+
+
+def cleanup_reports(batch_size: int) -> dict:
+    """
+    Function for removing the reports expired by the retention settings.
+    Removes at most batch_size reports per call, the oldest first
+    :param batch_size: maximum number of reports to remove
+    :return: result response message in JSON format with the number of
+             removed and remaining expired reports and reclaimed bytes
+    """
+    try:
+        expired = get_expired_reports(
+            list(list_reports()),
+            max_age=timedelta(days=settings.REPORTS_MAX_AGE_DAYS),
+            max_per_user=settings.REPORTS_MAX_PER_USER,
+            max_total=settings.REPORTS_MAX_TOTAL,
+            now=datetime.now(timezone.utc)
+        )
+        batch = expired[:batch_size]
+        storage.delete_many([report.key for report in batch])
     except Exception as e:
         logger.error(str(e))
-        return {"success": False,
-                "message": f"Smth went worong with PDF report creation. "
-                           f"Exception '{str(e)}'"}
+        return {
+            "success": False,
+            "message": f"Reports cleanup failed. Exception: '{str(e)}'"
+        }
 
-    return {"path": file_path}
+    reclaimed = sum(report.size for report in batch)
+    logger.info(f"Reports cleanup: {len(batch)} reports removed, "
+                f"{reclaimed} bytes reclaimed")
+    return {
+        "success": True,
+        "message": f"{len(batch)} reports have been removed",
+        "removed": len(batch),
+        "remaining": len(expired) - len(batch),
+        "reclaimed": reclaimed
+    }
 
 
 def get_ip() -> str:
@@ -312,23 +704,33 @@ def get_coordinates_by_ip(ip: str) -> dict:
     return {"lon": lon, "lat": lat}
 
 
-def is_valid_coordinates(coordinates: str) -> bool:
+def parse_coordinates(coordinates: str) -> tuple[float, float] | None:
     """
-    Function for checking geographical coordinates
+    Function for parsing geographical coordinates
     :param coordinates: string with latitude and longitude
-    :return: True if coordinates is valid, False - is incorrect
+    :return: tuple with latitude and longitude, None if coordinates are
+    incorrect
     """
     try:
         lat, lon = coordinates.split(",")
         lat = float(lat)
         lon = float(lon)
     except ValueError:
-        return False
+        return None
 
     if -90 <= lat <= 90 and -180 <= lon <= 180:
-        return True
+        return lat, lon
+
+    return None
 
-    return False
+
+def is_valid_coordinates(coordinates: str) -> bool:
+    """
+    Function for checking geographical coordinates
+    :param coordinates: string with latitude and longitude
+    :return: True if coordinates is valid, False - is incorrect
+    """
+    return parse_coordinates(coordinates) is not None
 
 
 def get_token(header: str) -> str | None:
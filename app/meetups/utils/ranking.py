@@ -0,0 +1,109 @@
+import math
+from datetime import datetime
+
+import numpy as np
+from config.settings import settings
+from meetups.utils.geo_index import haversine_distances
+from meetups.utils.meetups_utils import parse_coordinates
+
+# Coordinates of the meetups with an invalid location
+UNKNOWN_COORDINATES = (np.nan, np.nan)
+
+
+def get_coordinates(locations: list[str]) -> np.ndarray:
+    """
+    Function for parsing the 'lat, lon' locations in one pass. Locations are
+    parsed one by one only if some of them are malformed
+    :param locations: list of locations
+    :return: array of latitudes and longitudes, NaN for invalid locations
+    """
+    values = ",".join(locations).split(",")
+    try:
+        if len(values) != 2 * len(locations):
+            raise ValueError("Malformed location")
+        coordinates = np.array(values, dtype=np.float64).reshape(-1, 2)
+    except ValueError:
+        coordinates = np.array(
+            [parse_coordinates(location) or UNKNOWN_COORDINATES
+             for location in locations],
+            dtype=np.float64
+        ).reshape(-1, 2)
+
+    invalid = ((np.abs(coordinates[:, 0]) > 90)
+               | (np.abs(coordinates[:, 1]) > 180))
+    coordinates[invalid] = np.nan
+    return coordinates
+
+
+def get_distances(meetups: list[dict], point: tuple[float, float]
+                  ) -> np.ndarray:
+    """
+    Function for computing the distances from a point to the meetups places
+    :param meetups: list of meetups with the location field
+    :param point: latitude and longitude of the point
+    :return: array of distances in kilometers, NaN for invalid locations
+    """
+    coordinates = get_coordinates(
+        [meetup["location"] or "" for meetup in meetups]
+    )
+    return haversine_distances(*point, coordinates[:, 0], coordinates[:, 1])
+
+
+def get_composite_ranks(meetups: list[dict], distances: np.ndarray,
+                        now: datetime) -> np.ndarray:
+    """
+    Function for computing the composite ranks of the meetups. The rank is
+    the text score relative to the best one, halved every
+    RANK_DISTANCE_SCALE kilometers of distance and every RANK_RECENCY_SCALE
+    days before the meetup
+    :param meetups: list of meetups with the date and score fields
+    :param distances: array of the meetups distances in kilometers
+    :param now: current date
+    :return: array of ranks between 0 and 1
+    """
+    scores = np.array([meetup.get("score") for meetup in meetups],
+                      dtype=np.float64)
+    if np.isnan(scores).all() or np.nanmax(scores) <= 0:
+        text_ranks = np.ones(len(meetups))
+    else:
+        text_ranks = np.nan_to_num(scores / np.nanmax(scores))
+
+    dates = np.array([meetup["date"] for meetup in meetups],
+                     dtype="datetime64[us]")
+    days = (dates - np.datetime64(now, "us")) / np.timedelta64(1, "D")
+    recency_ranks = 0.5 ** (np.maximum(days, 0) / settings.RANK_RECENCY_SCALE)
+    distance_ranks = np.nan_to_num(
+        0.5 ** (distances / settings.RANK_DISTANCE_SCALE)
+    )
+
+    return text_ranks * recency_ranks * distance_ranks
+
+
+def rank_meetups(meetups: list[dict], point: tuple[float, float] | None,
+                 composite: bool = False) -> list[dict]:
+    """
+    Function for adding the distance from the client point to the search
+    results, computed for all the results at once. With the composite
+    ranking the results are also ordered by the composite rank
+    :param meetups: list of meetups in the search result format
+    :param point: latitude and longitude of the client point
+    :param composite: True for ordering by the composite rank
+    :return: new list of meetups with the distance and rank fields
+    """
+    if not meetups or point is None:
+        return [{**meetup, "distance": None} for meetup in meetups]
+
+    distances = get_distances(meetups, point)
+    rounded = [None if math.isnan(distance) else distance
+               for distance in np.round(distances, 3).tolist()]
+    if not composite:
+        return [{**meetup, "distance": distance}
+                for meetup, distance in zip(meetups, rounded)]
+
+    ranks = get_composite_ranks(meetups, distances, datetime.utcnow())
+    order = np.argsort(-ranks, kind="stable")
+    return [
+        {**meetups[index], "distance": rounded[index], "rank": rank}
+        for index, rank in zip(order.tolist(),
+                               np.round(ranks[order], 6).tolist())
+    ]
@@ -0,0 +1,200 @@
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from config.database import database
+from config.settings import settings
+from elasticsearch import Elasticsearch
+from elasticsearch.exceptions import ElasticsearchException
+from meetups.models import Meetups, Places, Themes
+from meetups_logging import logger
+from sqlalchemy import func, null, or_, select
+
+# Text search configuration of the search_vector columns
+SEARCH_CONFIG = "simple"
+DISTANCE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([a-z]*)\s*$")
+# Meters in the Elasticsearch distance units, meters are the default
+DISTANCE_UNITS = {"": 1, "m": 1, "km": 1000, "mi": 1609.344}
+
+
+@dataclass
+class SearchParams:
+    search_string: str | None = None
+    point: tuple[float, float] | None = None
+    distance: float | None = None
+    size: int = 10
+    start_from: int = 0
+
+
+def parse_distance(distance: str) -> float:
+    """
+    Function for converting an Elasticsearch distance to meters
+    :param distance: distance with the unit, e.g. '100km'
+    :return: distance in meters
+    """
+    match = DISTANCE_PATTERN.match(str(distance).lower())
+    if match is None or match.group(2) not in DISTANCE_UNITS:
+        raise ValueError(f"Unsupported distance: '{distance}'")
+    return float(match.group(1)) * DISTANCE_UNITS[match.group(2)]
+
+
+def parse_search_body(query_body: dict) -> SearchParams:
+    """
+    Function for getting the search params from the query body built by the
+    Elasticsearch query builder
+    :param query_body: Elasticsearch query body
+    :return: search params
+    """
+    params = SearchParams(size=query_body.get("size", 10),
+                          start_from=query_body.get("from", 0))
+    bool_query = query_body.get("query", {}).get("bool", {})
+
+    for item in bool_query.get("filter", []):
+        if "geo_distance" in item:
+            geo_distance = item["geo_distance"]
+            point = geo_distance["places.location"]
+            params.point = (float(point["lat"]), float(point["lon"]))
+            params.distance = parse_distance(geo_distance["distance"])
+
+    for item in bool_query.get("should", []):
+        if "multi_match" in item:
+            params.search_string = item["multi_match"]["query"]
+
+    return params
+
+
+def get_tsquery(search_string: str) -> str | None:
+    """
+    Function for converting keywords to the text search query. Any of the
+    words matches, the last ones may be typed partially
+    :param search_string: searched keywords
+    :return: text search query, None if there are no words
+    """
+    words = re.findall(r"[^\W_]+", search_string.lower())
+    return " | ".join(f"{word}:*" for word in words) or None
+
+
+async def search_meetups_fallback(query_body: dict) -> list[dict]:
+    """
+    Function for searching actual meetups with Postgres full-text search.
+    Supports the same keywords, distance and date filters and the same
+    sorting as the Elasticsearch query builder
+    :param query_body: Elasticsearch query body
+    :return: list of meetups in the Elasticsearch search result format, the
+    score is the text search rank
+    """
+    params = parse_search_body(query_body)
+    query = (
+        select(
+            Meetups.id, Meetups.meetup_name, Meetups.description,
+            Meetups.date, Places.place_name, Places.location, Themes.theme,
+            Themes.tags
+        )
+        .join(Places, Meetups.place_id == Places.id)
+        .join(Themes, Meetups.theme_id == Themes.id)
+        .where(Meetups.date >= datetime.utcnow())
+    )
+    order_by = []
+
+    if params.search_string is not None:
+        tsquery_text = get_tsquery(params.search_string)
+        if tsquery_text is None:
+            return []
+        tsquery = func.to_tsquery(SEARCH_CONFIG, tsquery_text)
+        query = query.where(or_(
+            Meetups.search_vector.op("@@")(tsquery),
+            Themes.search_vector.op("@@")(tsquery),
+            Places.search_vector.op("@@")(tsquery),
+        ))
+        search_vector = Meetups.search_vector.op("||")(
+            Themes.search_vector).op("||")(Places.search_vector)
+        score = func.ts_rank(search_vector, tsquery)
+        query = query.add_columns(score.label("score"))
+        order_by.append(score.desc())
+    else:
+        query = query.add_columns(null().label("score"))
+
+    if params.point is not None:
+        point = func.ll_to_earth(*params.point)
+        location = func.ll_to_earth(Places.latitude, Places.longitude)
+        query = query.where(
+            func.earth_box(point, params.distance).op("@>")(location),
+            func.earth_distance(point, location) <= params.distance
+        )
+
+    query = (
+        query.order_by(*order_by, Meetups.date.desc())
+        .limit(params.size)
+        .offset(params.start_from)
+    )
+
+    async with database.transaction():
+        await database.execute(
+            f"SET LOCAL statement_timeout = "
+            f"{int(settings.SEARCH_FALLBACK_TIMEOUT * 1000)}"
+        )
+        records = await database.fetch_all(query)
+
+    return [
+        {**record, "date": record["date"].isoformat()}
+        for record in map(dict, records)
+    ]
+
+
+class MeetupsSearch:
+    """
+    Meetups search by Elasticsearch with the Postgres full-text search
+    fallback. The blocking Elasticsearch client is called in a thread with
+    the SEARCH_ES_TIMEOUT deadline, so a slow Elasticsearch does not block the
+    event loop. After an error or timeout it is not queried for
+    SEARCH_ES_RETRY seconds, so the search latency stays bounded
+    """
+
+    def __init__(self, es: Elasticsearch):
+        self.es = es
+        self.es_retry_at = 0.0
+
+    def search_elasticsearch(self, query_body: dict) -> list[dict]:
+        """
+        Method for searching meetups in the meetups index
+        :param query_body: Elasticsearch query body
+        :return: list of meetups with the places, themes and score fields
+        """
+        search_result = self.es.search(
+            index="meetups",
+            body=query_body,
+            _source_excludes=[
+                "_meta", "places.id", "themes.id", "theme_id", "place_id"
+            ],
+            request_timeout=settings.SEARCH_ES_TIMEOUT
+        )
+        return [
+            {
+                **meetup["_source"].pop("places"),
+                **meetup["_source"].pop("themes"),
+                **meetup["_source"],
+                "score": meetup.get("_score")
+            }
+            for meetup in search_result["hits"]["hits"]
+        ]
+
+    async def search(self, query_body: dict) -> list[dict]:
+        """
+        Method for searching meetups
+        :param query_body: Elasticsearch query body
+        :return: list of meetups with the places and themes fields
+        """
+        if time.monotonic() >= self.es_retry_at:
+            try:
+                return await asyncio.wait_for(
+                    asyncio.to_thread(self.search_elasticsearch, query_body),
+                    timeout=settings.SEARCH_ES_TIMEOUT
+                )
+            except (ElasticsearchException, asyncio.TimeoutError) as e:
+                logger.warning(f"Search fallback to Postgres: "
+                               f"'{str(e) or type(e).__name__}'")
+                self.es_retry_at = time.monotonic() + settings.SEARCH_ES_RETRY
+
+        return await search_meetups_fallback(query_body)
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Callable
+
+import asyncpg
+from config.settings import settings
+from meetups_logging import logger
+from prometheus_client import Counter, Gauge
+
+SEARCH_CACHE_REQUESTS = Counter(
+    "meetups_search_cache_requests", "Meetups search requests by cache result",
+    ["result"]
+)
+SEARCH_CACHE_INVALIDATIONS = Counter(
+    "meetups_search_cache_invalidations",
+    "Meetups search cache invalidations by the catalog changes"
+)
+SEARCH_CACHE_HIT_RATIO = Gauge(
+    "meetups_search_cache_hit_ratio",
+    "Share of the meetups search requests not sent to Elasticsearch",
+    multiprocess_mode="liveall"
+)
+# Tables synced to the meetups index by pgsync
+CATALOG_TABLES = {"meetups", "places", "themes"}
+# Fields of a geo_distance query which are not the searched point
+GEO_DISTANCE_OPTIONS = {"distance", "distance_type", "validation_method",
+                        "ignore_unmapped", "boost", "_name"}
+
+
+class SearchCache:
+    """
+    Bounded cache of the meetups search results with a short time to live.
+    Entries are versioned, so a search started before a catalog change does
+    not cache its outdated result
+    """
+
+    def __init__(self, max_size: int, ttl: float, geo_precision: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.geo_precision = geo_precision
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.entries: OrderedDict[str, tuple[float, list]] = OrderedDict()
+
+    def normalize(self, query_body: dict) -> dict:
+        """
+        Method for normalizing a search query. Coordinates of geo distance
+        queries are rounded, so nearby users share the cache entries
+        :param query_body: Elasticsearch query body
+        :return: normalized copy of the query body
+        """
+        if isinstance(query_body, list):
+            return [self.normalize(item) for item in query_body]
+        if not isinstance(query_body, dict):
+            return query_body
+
+        normalized = {}
+        for key, value in query_body.items():
+            if key == "geo_distance" and isinstance(value, dict):
+                value = {
+                    field: point if field in GEO_DISTANCE_OPTIONS
+                    else self.round_point(point)
+                    for field, point in value.items()
+                }
+            normalized[key] = self.normalize(value)
+        return normalized
+
+    def round_point(self, point):
+        """
+        Method for rounding the coordinates of a geo point
+        :param point: geo point as a dict with lat and lon
+        :return: geo point with rounded coordinates, other values unchanged
+        """
+        if not isinstance(point, dict) or set(point) != {"lat", "lon"}:
+            return point
+        return {axis: round(float(value), self.geo_precision)
+                for axis, value in point.items()}
+
+    @staticmethod
+    def get_key(query_body: dict) -> str:
+        """
+        Method for getting the cache key of a normalized search query
+        :param query_body: normalized Elasticsearch query body
+        :return: cache key in hex format
+        """
+        data = json.dumps(query_body, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def get(self, key: str) -> list | None:
+        """
+        Method for getting a cached search result
+        :param key: cache key of the search query
+        :return: search result, None if it is not cached or expired
+        """
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self.entries[key]
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            SEARCH_CACHE_REQUESTS.labels(result="miss").inc()
+        else:
+            self.hits += 1
+            SEARCH_CACHE_REQUESTS.labels(result="hit").inc()
+            self.entries.move_to_end(key)
+        SEARCH_CACHE_HIT_RATIO.set(self.hit_ratio)
+
+        return None if entry is None else entry[1]
+
+    def put(self, key: str, result: list, version: int) -> None:
+        """
+        Method for caching a search result
+        :param key: cache key of the search query
+        :param result: search result
+        :param version: cache version the search was started with
+        """
+        if version != self.version:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, result)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """ Method for dropping all the cached results on catalog changes """
+        self.version += 1
+        self.entries.clear()
+        SEARCH_CACHE_INVALIDATIONS.inc()
+
+    @property
+    def hit_ratio(self) -> float:
+        """ Share of the search requests served from the cache """
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+
+def on_catalog_change(connection: asyncpg.Connection, pid: int,
+                      channel: str, payload: str) -> None:
+    """
+    Function for handling pgsync notifications. The cache is invalidated by
+    the changes of the tables of the meetups index only
+    :param connection: listening connection
+    :param pid: ID of the notifying database backend
+    :param channel: notification channel
+    :param payload: notification with the changed table in JSON format
+    """
+    try:
+        table = json.loads(payload).get("table")
+    except (ValueError, AttributeError):
+        table = None
+    if table is None or table in CATALOG_TABLES:
+        search_cache.invalidate()
+
+
+async def listen_catalog_changes(
+        url: str, callbacks: tuple[Callable, ...] = (on_catalog_change,)
+) -> asyncpg.Connection | None:
+    """
+    Function for handling the catalog changes. pgsync triggers notify the
+    channel named after the database on every change synced to Elasticsearch
+    :param url: database URL
+    :param callbacks: notifications handlers
+    :return: listening connection, None if the database is not available
+    """
+    try:
+        connection = await asyncpg.connect(url)
+        for callback in callbacks:
+            await connection.add_listener(settings.SEARCH_CACHE_CHANNEL,
+                                          callback)
+    except (OSError, asyncpg.PostgresError) as e:
+        logger.warning(f"Catalog changes are not listened: '{str(e)}'")
+        return None
+    return connection
+
+
+search_cache = SearchCache(max_size=settings.SEARCH_CACHE_SIZE,
+                           ttl=settings.SEARCH_CACHE_TTL,
+                           geo_precision=settings.SEARCH_GEO_PRECISION)
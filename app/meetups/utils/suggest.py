@@ -0,0 +1,149 @@
+import asyncio
+import time
+from typing import Iterable
+
+from config.settings import settings
+from elasticsearch import Elasticsearch
+from elasticsearch.exceptions import ElasticsearchException
+from meetups.utils.crud import get_suggestions_names
+from meetups_logging import logger
+
+# Completion fields of the meetups index by the suggestions category
+SUGGEST_FIELDS = {
+    "meetups": "meetup_name.suggest",
+    "themes": "themes.theme.suggest",
+    "places": "places.place_name.suggest",
+}
+
+
+class TrieNode:
+    __slots__ = ("children", "values")
+
+    def __init__(self):
+        self.children: dict[str, TrieNode] = {}
+        self.values: list[str] = []
+
+
+class PrefixTrie:
+    """
+    Case-insensitive prefix tree of names. Every node keeps the first
+    max_size names starting with its prefix, the shortest first, so a lookup
+    only walks the prefix
+    """
+
+    def __init__(self, names: Iterable[str], max_size: int):
+        self.root = TrieNode()
+        self.max_size = max_size
+        for name in sorted(set(names), key=lambda item: (len(item), item)):
+            self.insert(name)
+
+    def insert(self, name: str) -> None:
+        """
+        Method for adding a name to the nodes of all its prefixes
+        :param name: suggested name
+        """
+        node = self.root
+        for char in name.lower():
+            node = node.children.setdefault(char, TrieNode())
+            if len(node.values) < self.max_size:
+                node.values.append(name)
+
+    def search(self, prefix: str, size: int) -> list[str]:
+        """
+        Method for getting the names starting with a prefix
+        :param prefix: typed prefix
+        :param size: maximum number of names
+        :return: list of names, the shortest first
+        """
+        node = self.root
+        for char in prefix.lower():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.values[:size]
+
+
+class Suggester:
+    """
+    Type-ahead suggestions of meetups, themes and places names. Suggestions
+    come from the completion fields of the meetups index. While Elasticsearch
+    is unavailable they come from prefix trees built from the database. The
+    blocking Elasticsearch client is called in a thread with the
+    SUGGEST_ES_TIMEOUT deadline, so it does not block the event loop
+    """
+
+    def __init__(self, es: Elasticsearch):
+        self.es = es
+        self.es_retry_at = 0.0
+        self.tries: dict[str, PrefixTrie] = {}
+        self.tries_built_at = None
+        self.tries_lock = asyncio.Lock()
+
+    def get_es_suggestions(self, prefix: str, size: int) -> dict:
+        """
+        Method for getting suggestions from the completion fields
+        :param prefix: typed prefix
+        :param size: maximum number of suggestions in a category
+        :return: dict with lists of names by the category
+        """
+        result = self.es.search(
+            index="meetups",
+            body={
+                "_source": False,
+                "suggest": {
+                    category: {
+                        "prefix": prefix,
+                        "completion": {"field": field, "size": size,
+                                       "skip_duplicates": True}
+                    }
+                    for category, field in SUGGEST_FIELDS.items()
+                }
+            },
+            request_timeout=settings.SUGGEST_ES_TIMEOUT
+        )
+        return {
+            category: [option["text"]
+                       for option in result["suggest"][category][0]["options"]]
+            for category in SUGGEST_FIELDS
+        }
+
+    async def get_tries(self) -> dict[str, PrefixTrie]:
+        """
+        Method for getting the prefix trees. Trees older than
+        SUGGEST_TRIE_TTL seconds are rebuilt from the database
+        :return: dict with prefix trees by the category
+        """
+        async with self.tries_lock:
+            if self.tries_built_at is None or time.monotonic() > \
+                    self.tries_built_at + settings.SUGGEST_TRIE_TTL:
+                names = await get_suggestions_names()
+                self.tries = {
+                    category: PrefixTrie(names[category],
+                                         settings.SUGGEST_MAX_SIZE)
+                    for category in SUGGEST_FIELDS
+                }
+                self.tries_built_at = time.monotonic()
+        return self.tries
+
+    async def suggest(self, prefix: str, size: int) -> dict:
+        """
+        Method for getting the suggestions for a typed prefix. After an
+        Elasticsearch failure it is not queried for SUGGEST_ES_RETRY seconds
+        :param prefix: typed prefix
+        :param size: maximum number of suggestions in a category
+        :return: dict with lists of names by the category
+        """
+        if time.monotonic() >= self.es_retry_at:
+            try:
+                return await asyncio.wait_for(
+                    asyncio.to_thread(self.get_es_suggestions, prefix, size),
+                    timeout=settings.SUGGEST_ES_TIMEOUT
+                )
+            except (ElasticsearchException, asyncio.TimeoutError) as e:
+                logger.warning(f"Suggestions fallback to the prefix trees: "
+                               f"'{str(e) or type(e).__name__}'")
+                self.es_retry_at = time.monotonic() + settings.SUGGEST_ES_RETRY
+
+        tries = await self.get_tries()
+        return {category: trie.search(prefix, size)
+                for category, trie in tries.items()}
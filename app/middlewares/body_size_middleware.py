@@ -0,0 +1,67 @@
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class RequestBodyTooLarge(Exception):
+    pass
+
+
+class BodySizeLimitMiddleware:
+
+    """ The middleware for rejecting request bodies over the size limit of a
+    path. A declared Content-Length is checked before the body is read, a
+    chunked body is counted while it is streamed to the application. """
+
+    def __init__(self, app: ASGIApp, limits: dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limit = self.limits.get(scope.get("path")) \
+            if scope["type"] == "http" else None
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length", b"0")
+        if content_length.isdigit() and int(content_length) > limit:
+            return await self.reject(limit, scope, receive, send)
+
+        received = 0
+        exceeded = response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            message = await receive()
+            received += len(message.get("body", b""))
+            if received > limit:
+                exceeded = True
+                raise RequestBodyTooLarge()
+            return message
+
+        async def limited_send(message: Message) -> None:
+            nonlocal response_started
+            # The application reports the interrupted body as its own error
+            if exceeded and not response_started:
+                return
+            response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except RequestBodyTooLarge:
+            pass
+
+        if exceeded and not response_started:
+            await self.reject(limit, scope, receive, send)
+
+    @staticmethod
+    async def reject(limit: int, scope: Scope, receive: Receive,
+                     send: Send) -> None:
+        response = JSONResponse(status_code=413, content={
+            "detail": {
+                "success": False,
+                "message": f"Request body exceeds the limit of {limit} bytes"
+            }
+        })
+        await response(scope, receive, send)
@@ -1,7 +1,35 @@
+import asyncio
+
 import socketio
+from auth.utils.security import encode_service_token
 from meetups_logging import logger
 
+SIO_SERVER_URL = "http://localhost:8000/"
+SIO_SERVICE_NAME = "rest_api"
+
 sio = socketio.AsyncClient()
+# Concurrent requests must not open the connection twice
+connect_lock = asyncio.Lock()
+
+
+def get_service_auth() -> dict:
+    """
+    Function for getting the connection auth data. The client calls it on
+    every connection attempt, so reconnects get a fresh service token
+    :return: auth data with the service token
+    """
+    return {"service_token": encode_service_token(SIO_SERVICE_NAME)}
+
+
+async def connect_sio_client() -> None:
+    """
+    Function for connecting the REST API client to the socketio server. The
+    connection is opened once per process and authenticated as a service,
+    users are authenticated by the API itself
+    """
+    async with connect_lock:
+        if not sio.connected:
+            await sio.connect(SIO_SERVER_URL, auth=get_service_auth)
 
 
 @sio.event
@@ -1,19 +1,159 @@
+import asyncio
+import json
+
 import socketio
 from auth.utils.auth_utils import get_user_by_token
-from celery_tasks.tasks import (create_csv_report_celery,
-                                create_pdf_report_celery)
+from auth.utils.security import decode_service_token
+from celery_tasks.tasks import create_report_celery
 from config.settings import settings
 from elasticsearch import Elasticsearch
-from meetups.schemas import MeetupsBase, MeetupsUpdate
-from meetups.utils.crud import (create_meetup_subscription, create_new_meetup,
+from jose import JWTError
+from meetups.schemas import MeetupsBase, MeetupsIds, MeetupsUpdate
+from meetups.utils.crud import (create_meetup_subscription,
+                                create_meetup_subscriptions, create_new_meetup,
                                 delete_meetup_by_id, get_all_actual_meetups,
                                 get_all_meetups, get_all_user_meetups,
-                                remove_meetup_subscription, update_meetup_data)
-from meetups.utils.meetups_utils import convert_database_records_to_list
+                                remove_meetup_subscription,
+                                remove_meetup_subscriptions,
+                                update_meetup_data)
+from meetups.utils.geo_index import geo_index
+from meetups.utils.meetups_utils import (convert_database_records_to_list,
+                                         get_catalog_version, get_report_key,
+                                         get_user_meetups_ids, report_formats)
+from meetups.utils.ranking import rank_meetups
+from meetups.utils.search import MeetupsSearch, parse_search_body
+from meetups.utils.search_cache import search_cache
+from meetups.utils.suggest import Suggester
 from meetups_logging import logger
+from pydantic import ValidationError
+from socketio.exceptions import ConnectionRefusedError
+
+# Internal event moving the user's sockets of every node in or out of the
+# meetup rooms. It is published to the user room and never reaches clients
+MEETUP_ROOMS_EVENT = "_meetup_rooms"
+
+
+class MeetupRoomsMixin:
+    """
+    Message queue manager mixin, which applies the meetup rooms changes
+    published by any node to the sockets connected to this node
+    """
+
+    async def _handle_emit(self, message):
+        if message.get("event") == MEETUP_ROOMS_EVENT:
+            move_local_sockets(self, **message["data"])
+            return
+        await super()._handle_emit(message)
+
+
+class RedisManager(MeetupRoomsMixin, socketio.AsyncRedisManager):
+    pass
+
+
+class AioPikaManager(MeetupRoomsMixin, socketio.AsyncAioPikaManager):
+    pass
+
 
-sio = socketio.AsyncServer(cors_allowed_origins="*", async_mode="asgi")
+def create_client_manager() -> socketio.AsyncManager | None:
+    """
+    Function to configure the socketio client manager. When a message queue
+    is set in settings, rooms and emits are shared between all the workers
+    and nodes connected to this queue
+    :return: client manager object or None for the in-memory default
+    """
+    url = settings.SIO_MESSAGE_QUEUE
+    if not url:
+        return None
+
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisManager(url, channel=settings.SIO_CHANNEL)
+
+    if url.startswith(("amqp://", "amqps://")):
+        return AioPikaManager(url, channel=settings.SIO_CHANNEL)
+
+    raise ValueError(f"Unsupported socketio message queue: '{url}'")
+
+
+sio = socketio.AsyncServer(cors_allowed_origins="*", async_mode="asgi",
+                           client_manager=create_client_manager())
 es = Elasticsearch(hosts=[f"{settings.ELASTIC_HOST}:{settings.ELASTIC_PORT}"])
+meetups_search = MeetupsSearch(es)
+suggester = Suggester(es)
+# Reports being created by this node, keyed by the report storage key
+report_jobs: dict[str, asyncio.Future] = {}
+
+
+def get_user_room(user_id: int) -> str:
+    """ Function for getting the name of the room with all user's sockets """
+    return f"user_{user_id}"
+
+
+def get_meetup_room(meetup_id: int) -> str:
+    """ Function for getting the name of the room with meetup followers """
+    return f"meetup_{meetup_id}"
+
+
+def move_local_sockets(manager: socketio.AsyncManager, user_id: int,
+                       meetup_ids: list[int], enter: bool) -> None:
+    """
+    Function for moving the user's sockets connected to this node in or out
+    of the meetup followers rooms
+    :param manager: socketio client manager of this node
+    :param user_id: user ID in integer format
+    :param meetup_ids: list of meetup IDs
+    :param enter: True for entering the rooms, False for leaving them
+    """
+    if "/" not in manager.rooms:
+        return
+
+    for sid, _ in manager.get_participants("/", get_user_room(user_id)):
+        for meetup_id in meetup_ids:
+            if enter:
+                manager.enter_room(sid, "/", get_meetup_room(meetup_id))
+            else:
+                manager.leave_room(sid, "/", get_meetup_room(meetup_id))
+
+
+async def move_meetup_rooms(user_id: int, meetup_ids: list[int],
+                            enter: bool) -> None:
+    """
+    Function for moving all the user's sockets in or out of the meetup
+    followers rooms. With a message queue the change is published to every
+    node, as the user may be connected to any of them
+    :param user_id: user ID in integer format
+    :param meetup_ids: list of meetup IDs
+    :param enter: True for entering the rooms, False for leaving them
+    """
+    if not meetup_ids:
+        return
+
+    if isinstance(sio.manager, MeetupRoomsMixin):
+        await sio.manager.emit(
+            MEETUP_ROOMS_EVENT,
+            {"user_id": user_id, "meetup_ids": meetup_ids, "enter": enter},
+            namespace="/", room=get_user_room(user_id)
+        )
+    else:
+        move_local_sockets(sio.manager, user_id, meetup_ids, enter)
+
+
+async def create_report(key: str, task, args: list) -> dict:
+    """
+    Function for creating a report by the celery task. Concurrent requests
+    for the same report wait for one task instead of starting their own
+    :param key: storage key of the report
+    :param task: celery task creating the report
+    :param args: celery task arguments
+    :return: result message of the task
+    """
+    job = report_jobs.get(key)
+    if job is None:
+        job = asyncio.ensure_future(asyncio.to_thread(
+            lambda: task.apply_async(args=args).get()
+        ))
+        report_jobs[key] = job
+        job.add_done_callback(lambda _: report_jobs.pop(key, None))
+    return await asyncio.shield(job)
 
 
 # Connection methods definition
@@ -30,16 +170,74 @@ def disconnect(*args, **kwargs):
 
 @sio.event
 async def connect(sid, environ, auth):
-    try:
-        auth_user = await get_user_by_token(auth.get("token"))
-        if not auth_user:
-            await sio.emit("my_response", {"data": "User not authenticated"},
-                           room=sid)
-            await sio.emit("disconnect")
-    except AttributeError:
-        await sio.emit("my_response", {"data": "User not authenticated"},
-                       room=sid)
-        await sio.emit("disconnect")
+    auth = auth or {}
+
+    # Internal clients act on behalf of users authenticated by the REST API
+    if auth.get("service_token"):
+        try:
+            service = decode_service_token(auth["service_token"])
+        except JWTError:
+            service = None
+        if not service:
+            raise ConnectionRefusedError("Service not authenticated")
+
+        await sio.save_session(
+            sid, {"service": service, "user_id": None, "is_super": True}
+        )
+        return
+
+    auth_user = await get_user_by_token(auth.get("token"))
+    if not auth_user or not auth_user.is_active or not auth_user.confirmed:
+        raise ConnectionRefusedError("User not authenticated")
+
+    await sio.save_session(
+        sid, {
+            "service": None,
+            "user_id": auth_user.user_id,
+            "is_super": auth_user.is_super
+        }
+    )
+
+    # Meetups followers get push notifications instead of polling
+    sio.enter_room(sid, get_user_room(auth_user.user_id))
+    for meetup_id in await get_user_meetups_ids(auth_user.user_id):
+        sio.enter_room(sid, get_meetup_room(meetup_id))
+
+
+async def get_session_user_id(sid: str, message: dict) -> int:
+    """
+    Function for getting the user the event is processed for. Service
+    sessions pass the user ID in the message, other sessions always act on
+    behalf of the authenticated user
+    :param sid: socket session ID
+    :param message: incoming event data
+    :return: user ID in integer format
+    """
+    session = await sio.get_session(sid)
+    if session["service"]:
+        return message.get("user_id")
+    return session["user_id"]
+
+
+async def is_superuser_session(sid: str) -> bool:
+    """
+    Function for checking superuser permissions of the socket session
+    :param sid: socket session ID
+    :return: True for superusers and internal services
+    """
+    session = await sio.get_session(sid)
+    return session["is_super"]
+
+
+async def superuser_required_message(sid: str) -> dict:
+    """
+    Function for rejecting events which require superuser permissions
+    :param sid: socket session ID
+    :return: result message in JSON format
+    """
+    message = "Current user is not a superuser"
+    await sio.emit("my_response", {"data": message}, room=sid)
+    return {"success": False, "message": message}
 
 
 # Rooms methods definition
@@ -74,6 +272,9 @@ async def send_room_message(sid, message):
 # Meetups processing
 @sio.on("view_all_meetups")
 async def view_all_meetups(sid):
+    if not await is_superuser_session(sid):
+        return await superuser_required_message(sid)
+
     meetups = await get_all_meetups()
     data = [
         {**dict(meetup), "date": str(dict(meetup)["date"])}
@@ -90,6 +291,9 @@ async def view_all_meetups(sid):
 
 @sio.on("create_meetup")
 async def create_meetup(sid, data):
+    if not await is_superuser_session(sid):
+        return await superuser_required_message(sid)
+
     data = MeetupsBase(**data)
     message = await create_new_meetup(data)
     await sio.emit("my_response", {"data": message.get("message")}, room=sid)
@@ -99,6 +303,9 @@ async def create_meetup(sid, data):
 
 @sio.on("update_meetup")
 async def update_meetup(sid, data):
+    if not await is_superuser_session(sid):
+        return await superuser_required_message(sid)
+
     meetup_data = data.get("data")
     meetup_id = data.get("meetup_id")
 
@@ -113,46 +320,117 @@ async def update_meetup(sid, data):
         }
 
     if meetup_data.get("date"):
-        meetup_data = {
-            **dict(meetup_data["data"]),
-            "date": str(dict(meetup_data)["date"])
-        }
+        meetup_data = {**meetup_data, "date": str(meetup_data["date"])}
 
     meetup_data = MeetupsUpdate(**meetup_data)
     message = await update_meetup_data(meetup_id, meetup_data)
     await sio.emit("my_response", {"data": message.get("message")}, room=sid)
 
+    if message.get("success"):
+        await sio.emit(
+            "meetup_updated", {
+                "meetup_id": meetup_id,
+                "changes": json.loads(meetup_data.json(exclude_none=True))
+            },
+            room=get_meetup_room(meetup_id)
+        )
+
     return message
 
 
 @sio.on("delete_meetup")
 async def delete_meetup(sid, m_id):
-    message = await delete_meetup_by_id(m_id["meetup_id"])
+    if not await is_superuser_session(sid):
+        return await superuser_required_message(sid)
+
+    meetup_id = m_id["meetup_id"]
+    message = await delete_meetup_by_id(meetup_id)
     await sio.emit("my_response", {"data": message.get("message")}, room=sid)
+
+    if message.get("success"):
+        meetup_room = get_meetup_room(meetup_id)
+        await sio.emit("meetup_deleted", {"meetup_id": meetup_id},
+                       room=meetup_room)
+        await sio.close_room(meetup_room)
+
     return message
 
 
 @sio.on("follow_meetup")
 async def follow_meetup(sid, message):
-    user_id = message.get("user_id")
+    user_id = await get_session_user_id(sid, message)
     meetup_id = message.get("meetup_id")
     message = await create_meetup_subscription(user_id, meetup_id)
     await sio.emit("my_response", {"data": message.get("message")}, room=sid)
+
+    if message.get("success"):
+        await move_meetup_rooms(user_id, [meetup_id], enter=True)
+
     return message
 
 
 @sio.on("unfollow_meetup")
 async def unfollow_meetup(sid, message):
-    user_id = message.get("user_id")
+    user_id = await get_session_user_id(sid, message)
     meetup_id = message.get("meetup_id")
     message = await remove_meetup_subscription(user_id, meetup_id)
     await sio.emit("my_response", {"data": message.get("message")}, room=sid)
+
+    if message.get("success"):
+        await move_meetup_rooms(user_id, [meetup_id], enter=False)
+
     return message
 
 
+@sio.on("follow_meetups")
+async def follow_meetups(sid, message):
+    user_id = await get_session_user_id(sid, message)
+    try:
+        meetups_ids = MeetupsIds(**message).meetup_ids
+    except ValidationError as e:
+        return {"success": False, "message": f"Incorrect meetup_ids: {e}"}
+
+    results = await create_meetup_subscriptions(user_id, meetups_ids)
+    await sio.emit(
+        "my_response", {
+            "data": f"Follow_meetups has been completed. Sid: {sid}"
+        }, room=sid
+    )
+
+    await move_meetup_rooms(
+        user_id, [result["meetup_id"] for result in results
+                  if result["success"]], enter=True
+    )
+
+    return results
+
+
+@sio.on("unfollow_meetups")
+async def unfollow_meetups(sid, message):
+    user_id = await get_session_user_id(sid, message)
+    try:
+        meetups_ids = MeetupsIds(**message).meetup_ids
+    except ValidationError as e:
+        return {"success": False, "message": f"Incorrect meetup_ids: {e}"}
+
+    results = await remove_meetup_subscriptions(user_id, meetups_ids)
+    await sio.emit(
+        "my_response", {
+            "data": f"Unfollow_meetups has been completed. Sid: {sid}"
+        }, room=sid
+    )
+
+    await move_meetup_rooms(
+        user_id, [result["meetup_id"] for result in results
+                  if result["success"]], enter=False
+    )
+
+    return results
+
+
 @sio.on("browse_user_meetups")
 async def browse_user_meetups(sid, message):
-    user_id = message.get("user_id")
+    user_id = await get_session_user_id(sid, message)
     meetups = await get_all_user_meetups(user_id)
     meetups = [
         {**dict(meetup), "date": str(dict(meetup)["date"])}
@@ -168,46 +446,32 @@ async def browse_user_meetups(sid, message):
 
 @sio.on("get_meetups_report")
 async def get_meetups_report(sid, message):
-    user_id = message.get("user_id")
-    mode = message.get("mode")
+    mode = str(message.get("mode")).lower()
 
-    if mode.lower() not in ['csv', 'pdf']:
+    if mode not in report_formats:
         await sio.emit(
             "my_response", {"data": f"Incorrect report mode Sid: {sid}"},
             room=sid
         )
         return {"success": False, "message": "Incorrect mode"}
 
-    result = None
     meetups_records_list = await get_all_actual_meetups()
     meetups_title = tuple(meetups_records_list[-1].keys())
     meetups_list = convert_database_records_to_list(meetups_records_list)
+    key = get_report_key(mode, get_catalog_version(meetups_list))
 
-    if mode == 'csv':
-        try:
-            result = create_csv_report_celery.apply_async(
-                args=[user_id, meetups_list]
-            ).get()
-        except Exception as e:
-            msg = {
-                "success": False,
-                "message": f"Smth went wrong with report creation: '{str(e)}'"
-            }
-            logger.error(msg)
-            return msg
-
-    elif mode == 'pdf':
-        try:
-            result = create_pdf_report_celery.apply_async(
-                args=[user_id, meetups_title, meetups_list]
-            ).get()
-        except Exception as e:
-            msg = {
-                "success": False,
-                "message": f"Smth went wrong with report creation: '{str(e)}'"
-            }
-            logger.error(msg)
-            return msg
+    try:
+        result = await create_report(
+            key, create_report_celery,
+            [mode, key, meetups_title, meetups_list]
+        )
+    except Exception as e:
+        msg = {
+            "success": False,
+            "message": f"Smth went wrong with report creation: '{str(e)}'"
+        }
+        logger.error(msg)
+        return msg
 
     await sio.emit(
         "my_response",
@@ -218,25 +482,35 @@ async def get_meetups_report(sid, message):
 
 
 @sio.on("search")
-async def search(sid, query_body):
-    search_result = es.search(
-        index="meetups",
-        body=query_body,
-        _source_excludes=[
-            "_meta", "places.id", "themes.id", "theme_id", "place_id"
-        ],
-    )
+async def search(sid, message):
+    point = parse_search_body(message["query_body"]).point
+    query_body = search_cache.normalize(message["query_body"])
+    key = search_cache.get_key(query_body)
+    result = search_cache.get(key)
+
+    if result is None:
+        version = search_cache.version
+        result = await meetups_search.search(query_body)
+        search_cache.put(key, result, version)
+    result = rank_meetups(result, point, message.get("composite_rank", False))
+
     await sio.emit(
         "my_response",
         {"data": f"Searching has been completed. Sid {sid}"},
         room=sid
     )
 
-    return [
-        {
-            **meetup["_source"].pop("places"),
-            **meetup["_source"].pop("themes"),
-            **meetup["_source"]
-        }
-        for meetup in search_result["hits"]["hits"]
-    ]
+    return result
+
+
+@sio.on("nearby")
+async def nearby(sid, message):
+    size = min(message.get("size", 10), settings.NEARBY_MAX_SIZE)
+    return await geo_index.nearby(float(message["lat"]), float(message["lon"]),
+                                  size, message.get("radius"))
+
+
+@sio.on("suggest")
+async def suggest(sid, message):
+    size = min(message.get("size", 5), settings.SUGGEST_MAX_SIZE)
+    return await suggester.suggest(str(message.get("prefix", "")), size)
@@ -1,12 +1,23 @@
 import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
 from typing import Mapping
 
 import alembic
 import pytest
 import pytest_mock
+from aiosmtpd.controller import Controller
 from alembic.config import Config
 from asgi_lifespan import LifespanManager
+from auth.utils.mail import SMTPConnection
+from fastapi_mail import ConnectionConfig
+from files.utils.storage import S3Storage
 from httpx import AsyncClient
+from moto.server import ThreadedMotoServer
 from sqlalchemy.exc import ProgrammingError
 from sqlalchemy_utils import create_database, drop_database
 
@@ -88,3 +99,185 @@ def mock_files_saving(mocker: pytest_mock):
         target='auth.utils.auth_utils.save_avatar_image',
         return_value=payload
     )
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 15) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Port {port} is not available")
+
+
+class RedisStandInHandler(socketserver.StreamRequestHandler):
+    """ Handler of a connection to the local Redis server. Only the pub/sub
+    commands used by the socketio redis manager are served, other commands
+    are acknowledged """
+
+    def setup(self):
+        super().setup()
+        self.write_lock = threading.Lock()
+
+    def read_command(self) -> list[bytes] | None:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        command = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            command.append(self.rfile.read(length + 2)[:-2])
+        return command
+
+    def write(self, *items: bytes | int) -> None:
+        data = b"*%d\r\n" % len(items)
+        for item in items:
+            if isinstance(item, int):
+                data += b":%d\r\n" % item
+            else:
+                data += b"$%d\r\n%s\r\n" % (len(item), item)
+        with self.write_lock:
+            self.wfile.write(data)
+
+    def handle(self):
+        channels = self.server.channels
+        while (command := self.read_command()) is not None:
+            name, args = command[0].upper(), command[1:]
+            if name == b"PUBLISH":
+                subscribers = list(channels.get(args[0], ()))
+                for subscriber in subscribers:
+                    subscriber.write(b"message", args[0], args[1])
+                with self.write_lock:
+                    self.wfile.write(b":%d\r\n" % len(subscribers))
+            elif name in (b"SUBSCRIBE", b"UNSUBSCRIBE"):
+                for channel in args or list(channels):
+                    if name == b"SUBSCRIBE":
+                        channels.setdefault(channel, set()).add(self)
+                    else:
+                        channels.get(channel, set()).discard(self)
+                    count = sum(self in subscribers
+                                for subscribers in channels.values())
+                    self.write(name.lower(), channel, count)
+            else:
+                with self.write_lock:
+                    self.wfile.write(b"+OK\r\n")
+
+    def finish(self):
+        for subscribers in self.server.channels.values():
+            subscribers.discard(self)
+        super().finish()
+
+
+class RedisStandIn(socketserver.ThreadingTCPServer):
+    """ Local Redis pub/sub server shared by the socketio nodes """
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int]):
+        super().__init__(address, RedisStandInHandler)
+        self.channels: dict[bytes, set[RedisStandInHandler]] = {}
+
+
+@pytest.fixture(scope='module')
+def redis_stand_in() -> str:
+    port = get_free_port()
+    server = RedisStandIn(("127.0.0.1", port))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{port}/0"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope='module')
+def sio_nodes(redis_stand_in: str) -> list[str]:
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    env = {**os.environ, "SIO_MESSAGE_QUEUE": redis_stand_in}
+    ports = [get_free_port() for _ in range(2)]
+    nodes = [
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "tests.integration.sio_node:app",
+             "--host", "127.0.0.1", "--port", str(port)],
+            cwd=base_dir, env=env
+        )
+        for port in ports
+    ]
+    try:
+        for port in ports:
+            wait_for_port(port)
+        yield [f"http://127.0.0.1:{port}" for port in ports]
+    finally:
+        for node in nodes:
+            node.terminate()
+            node.wait()
+
+
+class SMTPStandInHandler:
+    """ Handler of the local SMTP server, keeps the received messages and the
+    sessions they have been sent over. Recipients starting with 'rejected' are
+    refused permanently, with 'busy' - temporarily """
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_RCPT(self, server, session, envelope, address: str,
+                          rcpt_options: list) -> str:
+        if address.startswith("rejected"):
+            return "550 Mailbox unavailable"
+        if address.startswith("busy"):
+            return "451 Try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope) -> str:
+        self.messages.append(envelope)
+        self.sessions.add(id(session))
+        return "250 Message accepted for delivery"
+
+
+@pytest.fixture
+def smtp_stand_in(mocker: pytest_mock) -> SMTPStandInHandler:
+    handler = SMTPStandInHandler()
+    controller = Controller(handler, hostname="127.0.0.1",
+                            port=get_free_port())
+    controller.start()
+
+    config = ConnectionConfig(
+        MAIL_USERNAME="test", MAIL_PASSWORD="test", MAIL_FROM="test@test.com",
+        MAIL_PORT=controller.port, MAIL_SERVER=controller.hostname,
+        MAIL_STARTTLS=False, MAIL_SSL_TLS=False, USE_CREDENTIALS=False
+    )
+    mocker.patch("auth.utils.mail.smtp_connection", SMTPConnection(config))
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture(scope='module')
+def s3_stand_in() -> str:
+    port = get_free_port()
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port)
+    server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3_storage(s3_stand_in: str) -> S3Storage:
+    storage = S3Storage(
+        bucket="meetups", endpoint_url=s3_stand_in, access_key="test",
+        secret_key="test", region="us-east-1",
+        multipart_threshold=5 * 1024 * 1024
+    )
+    storage.client.create_bucket(Bucket="meetups")
+    yield storage
+    for item in storage.list():
+        storage.delete(item.key)
+    storage.client.delete_bucket(Bucket="meetups")
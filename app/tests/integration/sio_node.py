@@ -0,0 +1,55 @@
+"""
+Socketio node for the scale-out tests. Serves the application socketio server
+without the database, so several nodes can be started as separate processes
+sharing one message queue.
+"""
+from types import SimpleNamespace
+
+import sio_server
+from socketio import ASGIApp
+
+
+async def get_user_by_token(token: str) -> SimpleNamespace | None:
+    """ Every non-empty token belongs to an active test user, 'admin_token'
+    belongs to the superuser """
+    if not token:
+        return None
+    return SimpleNamespace(user_id=1, is_super=token == "admin_token",
+                           is_active=True, confirmed=True)
+
+
+async def get_user_meetups_ids(user_id: int) -> list[int]:
+    """ Test users are subscribed to the meetup with ID 1 """
+    return [1]
+
+
+async def update_meetup_data(meetup_id: int, meetup_data) -> dict:
+    return {"success": True,
+            "message": f"Meetup (meetup_id={meetup_id}) has been updated"}
+
+
+async def delete_meetup_by_id(meetup_id: int) -> dict:
+    return {"success": True,
+            "message": f"Meetup (meetup_id={meetup_id}) has been deleted"}
+
+
+async def create_meetup_subscription(user_id: int, meetup_id: int) -> dict:
+    return {"success": True,
+            "message": f"User (user_id={user_id}) is subscribed to "
+                       f"meetup (meetup_id={meetup_id})"}
+
+
+async def remove_meetup_subscription(user_id: int, meetup_id: int) -> dict:
+    return {"success": True,
+            "message": f"User (user_id={user_id}) is unsubscribed from "
+                       f"meetup (meetup_id={meetup_id})"}
+
+
+sio_server.get_user_by_token = get_user_by_token
+sio_server.get_user_meetups_ids = get_user_meetups_ids
+sio_server.update_meetup_data = update_meetup_data
+sio_server.delete_meetup_by_id = delete_meetup_by_id
+sio_server.create_meetup_subscription = create_meetup_subscription
+sio_server.remove_meetup_subscription = remove_meetup_subscription
+
+app = ASGIApp(socketio_server=sio_server.sio)
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+from httpx import AsyncClient
+from starlette.status import (HTTP_206_PARTIAL_CONTENT, HTTP_401_UNAUTHORIZED,
+                              HTTP_404_NOT_FOUND)
+
+
+@pytest.fixture
+def test_report() -> str:
+    base_path = "storage/2/reports/csv"
+    file_path = f"{base_path}/report_test.csv"
+    os.makedirs(base_path, exist_ok=True)
+    with open(file_path, 'w') as file:
+        file.write("1,test_name_a\n2,test_name_b\n")
+    yield file_path
+    os.remove(file_path)
+
+
+@pytest.mark.integration
+async def test_get_file_range(client: AsyncClient, auth_user_headers: dict,
+                              test_report: str):
+    """
+    Test case for downloading a part of a report by a superuser
+    """
+    auth_user_headers["range"] = "bytes=0-13"
+
+    response = await client.get(f"/{test_report}", headers=auth_user_headers)
+
+    assert response.status_code == HTTP_206_PARTIAL_CONTENT
+    assert response.content == b"1,test_name_a\n"
+
+
+@pytest.mark.integration
+async def test_get_file_outside_storage(client: AsyncClient,
+                                        auth_user_headers: dict):
+    """
+    Negative test case for downloading a file outside the storage directory
+    """
+    response = await client.get("/storage/..%2Fmain.py",
+                                headers=auth_user_headers)
+
+    assert response.status_code == HTTP_404_NOT_FOUND
+
+
+@pytest.mark.integration
+async def test_get_file_unauthorized(client: AsyncClient, test_report: str):
+    """
+    Negative test case for downloading a report without authorization
+    """
+    response = await client.get(f"/{test_report}")
+
+    assert response.status_code == HTTP_401_UNAUTHORIZED
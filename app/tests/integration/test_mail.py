@@ -0,0 +1,182 @@
+from email import message_from_bytes
+from types import SimpleNamespace
+
+import pytest
+from auth.utils import mail
+from auth.utils.mail import send_verification_email
+from celery_batches import SimpleRequest
+from celery_tasks.tasks import (fit_prefetch_to_mail_batch, get_worker_loop,
+                                send_verification_email_celery)
+from config.settings import settings
+
+
+def get_html(content: bytes) -> str:
+    message = message_from_bytes(content)
+    for part in message.walk():
+        if part.get_content_type() == "text/html":
+            return part.get_payload(decode=True).decode()
+
+
+@pytest.mark.integration
+async def test_send_verification_emails_over_one_session(smtp_stand_in):
+    """
+    Test case for sending several emails over one SMTP session
+    """
+    for index in range(3):
+        await send_verification_email(f"user_{index}@test.com",
+                                      f"user_{index}", "http://test/")
+
+    mail.smtp_connection.close()
+    await send_verification_email("user_3@test.com", "user_3", "http://test/")
+    await mail.close_email_connection()
+
+    recipients = [message.rcpt_tos for message in smtp_stand_in.messages]
+    expected_recipients = [[f"user_{index}@test.com"] for index in range(4)]
+
+    assert recipients == expected_recipients
+    assert len(smtp_stand_in.sessions) == 2
+
+
+@pytest.mark.integration
+def test_send_verification_email_celery(smtp_stand_in):
+    """
+    Test case for email tasks sharing the event loop of the worker process
+    """
+    loop = get_worker_loop()
+
+    for index in range(2):
+        send_verification_email_celery.apply(
+            args=[f"user_{index}@test.com", f"user_{index}", "http://test/"]
+        )
+
+    loop.run_until_complete(mail.close_email_connection())
+
+    assert get_worker_loop() is loop
+    assert len(smtp_stand_in.messages) == 2
+    assert len(smtp_stand_in.sessions) == 1
+
+
+@pytest.mark.integration
+def test_send_verification_email_celery_batch(smtp_stand_in, mocker):
+    """
+    Test case for sending a batch of emails with coalescing and retries
+    """
+    retry = mocker.patch.object(send_verification_email_celery,
+                                'apply_async')
+    emails = ["user_0@test.com", "user_1@test.com", "user_0@test.com",
+              "rejected@test.com", "busy@test.com"]
+    requests = [
+        SimpleRequest(id=str(index), name="test",
+                      args=(email, f"user_{index}", "http://test/"), kwargs={},
+                      delivery_info={}, hostname="test", ignore_result=True,
+                      reply_to=None, correlation_id=None)
+        for index, email in enumerate(emails)
+    ]
+
+    send_verification_email_celery(requests)
+    get_worker_loop().run_until_complete(mail.close_email_connection())
+
+    recipients = [message.rcpt_tos for message in smtp_stand_in.messages]
+
+    assert recipients == [["user_0@test.com"], ["user_1@test.com"]]
+    assert "Hi user_2," in get_html(smtp_stand_in.messages[0].content)
+    assert len(smtp_stand_in.sessions) == 1
+    retry.assert_called_once_with(args=["busy@test.com", "user_4",
+                                        "http://test/"],
+                                  kwargs={"retries": 1}, countdown=1)
+
+
+@pytest.mark.integration
+def test_send_verification_email_celery_batch_errors(smtp_stand_in, mocker):
+    """
+    Test case for retrying the messages failed by other than SMTP errors
+    """
+    retry = mocker.patch.object(send_verification_email_celery,
+                                'apply_async')
+    render = mail.render_verification_email
+
+    def render_verification_email(username, *args):
+        if username == "broken":
+            raise RuntimeError("Template error")
+        return render(username, *args)
+
+    mocker.patch("auth.utils.mail.render_verification_email",
+                 side_effect=render_verification_email)
+    requests = [
+        SimpleRequest(id=str(index), name="test",
+                      args=(f"{username}@test.com", username, "http://test/"),
+                      kwargs={}, delivery_info={}, hostname="test",
+                      ignore_result=True, reply_to=None, correlation_id=None)
+        for index, username in enumerate(["broken", "user_1"])
+    ]
+
+    send_verification_email_celery(requests)
+    get_worker_loop().run_until_complete(mail.close_email_connection())
+
+    recipients = [message.rcpt_tos for message in smtp_stand_in.messages]
+
+    assert recipients == [["user_1@test.com"]]
+    retry.assert_called_once_with(args=["broken@test.com", "broken",
+                                        "http://test/"],
+                                  kwargs={"retries": 1}, countdown=1)
+
+
+@pytest.mark.integration
+def test_fit_prefetch_to_mail_batch(mocker):
+    """
+    Test case for the prefetch window fitting the emails batch
+    """
+    mocker.patch.object(settings, "MAIL_BATCH_SIZE", 25)
+
+    def get_app(*queues: str) -> SimpleNamespace:
+        return SimpleNamespace(amqp=SimpleNamespace(
+            queues=SimpleNamespace(consume_from={queue: None
+                                                 for queue in queues})
+        ))
+
+    worker_a = SimpleNamespace(concurrency=10, prefetch_multiplier=1,
+                               app=get_app("celery", "emails", "reports"))
+    worker_b = SimpleNamespace(concurrency=10, prefetch_multiplier=4,
+                               app=get_app("emails"))
+    worker_c = SimpleNamespace(concurrency=2, prefetch_multiplier=1,
+                               app=get_app("images"))
+
+    fit_prefetch_to_mail_batch(worker_a)
+    fit_prefetch_to_mail_batch(worker_b)
+    fit_prefetch_to_mail_batch(worker_c)
+
+    assert worker_a.prefetch_multiplier == 3
+    assert worker_b.prefetch_multiplier == 4
+    assert worker_c.prefetch_multiplier == 1
+
+
+@pytest.mark.integration
+def test_send_verification_email_celery_legacy(smtp_stand_in, mocker):
+    """
+    Test case for sending the messages queued in the legacy (email, html)
+    layout together with the current ones
+    """
+    retry = mocker.patch.object(send_verification_email_celery,
+                                'apply_async')
+    requests = [
+        SimpleRequest(id=str(index), name="test", args=args, kwargs={},
+                      delivery_info={}, hostname="test", ignore_result=True,
+                      reply_to=None, correlation_id=None)
+        for index, args in enumerate([
+            ("user_0@test.com", "<p>Legacy confirmation</p>"),
+            ("user_1@test.com", "user_1", "http://test/"),
+        ])
+    ]
+
+    send_verification_email_celery(requests)
+    get_worker_loop().run_until_complete(mail.close_email_connection())
+
+    messages = smtp_stand_in.messages
+    legacy_message = message_from_bytes(messages[0].content)
+
+    assert [message.rcpt_tos for message in messages] == \
+        [["user_0@test.com"], ["user_1@test.com"]]
+    assert legacy_message["Subject"] == "Registration confirmation"
+    assert get_html(messages[0].content).strip() == \
+        "<p>Legacy confirmation</p>"
+    retry.assert_not_called()
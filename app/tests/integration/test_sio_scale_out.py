@@ -0,0 +1,223 @@
+import asyncio
+
+import pytest
+import socketio
+from auth.utils.security import encode_jwt_token, encode_service_token
+from socketio.exceptions import ConnectionError
+
+
+async def create_client(url: str, messages: asyncio.Queue,
+                        token: str = "test_token"):
+    client = socketio.AsyncClient()
+
+    @client.on("my_response")
+    async def my_response(data):
+        await messages.put(data["data"])
+
+    @client.on("meetup_updated")
+    async def meetup_updated(data):
+        await messages.put(data)
+
+    @client.on("meetup_deleted")
+    async def meetup_deleted(data):
+        await messages.put(data)
+
+    await client.connect(url, auth={"token": token})
+    return client
+
+
+async def wait_for_message(messages: asyncio.Queue, expected: str | dict,
+                           timeout: float = 0.5) -> bool:
+    try:
+        while True:
+            message = await asyncio.wait_for(messages.get(), timeout)
+            if message == expected:
+                return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def emit_until_received(client: socketio.AsyncClient, event: str,
+                              data: dict, messages: asyncio.Queue,
+                              expected: str | dict) -> bool:
+    """ The pubsub listener of a node subscribes in the background, so the
+    first emits may be published before the other node listens """
+    for _ in range(20):
+        await client.emit(event, data)
+        if await wait_for_message(messages, expected):
+            return True
+    return False
+
+
+@pytest.mark.integration
+async def test_room_message_across_nodes(sio_nodes: list[str]):
+    """
+    Test case for room broadcasting between clients of different processes
+    """
+    node_a, node_b = sio_nodes
+    messages_a, messages_b = asyncio.Queue(), asyncio.Queue()
+
+    client_a = await create_client(node_a, messages_a)
+    client_b = await create_client(node_b, messages_b)
+
+    try:
+        await client_a.emit("join", {"room": "scale_out"})
+        assert await wait_for_message(messages_a, "Entered room: scale_out")
+
+        assert await emit_until_received(
+            client_b, "send_room_message",
+            {"room": "scale_out", "data": "Hello from node b"},
+            messages_a, "Hello from node b"
+        )
+        assert messages_b.empty()
+    finally:
+        await client_a.disconnect()
+        await client_b.disconnect()
+
+
+@pytest.mark.integration
+async def test_close_room_across_nodes(sio_nodes: list[str]):
+    """
+    Test case for closing a room from the node without its participants
+    """
+    node_a, node_b = sio_nodes
+    messages_a, messages_b = asyncio.Queue(), asyncio.Queue()
+
+    client_a = await create_client(node_a, messages_a)
+    client_b = await create_client(node_b, messages_b)
+
+    try:
+        await client_a.emit("join", {"room": "closing"})
+        assert await wait_for_message(messages_a, "Entered room: closing")
+
+        assert await emit_until_received(
+            client_b, "close_room", {"room": "closing"},
+            messages_a, "Room closing is closing."
+        )
+
+        await client_b.emit("send_room_message",
+                            {"room": "closing", "data": "Too late"})
+        assert not await wait_for_message(messages_a, "Too late")
+    finally:
+        await client_a.disconnect()
+        await client_b.disconnect()
+
+
+@pytest.mark.integration
+async def test_meetup_notifications_across_nodes(sio_nodes: list[str]):
+    """
+    Test case for pushing meetup changes to followers of different processes
+    """
+    node_a, node_b = sio_nodes
+    messages_a, messages_b = asyncio.Queue(), asyncio.Queue()
+
+    client_a = await create_client(node_a, messages_a)
+    client_b = await create_client(node_b, messages_b, token="admin_token")
+
+    try:
+        assert await emit_until_received(
+            client_b, "update_meetup",
+            {"meetup_id": 1, "data": {"meetup_name": "updated"}},
+            messages_a,
+            {"meetup_id": 1, "changes": {"meetup_name": "updated"}}
+        )
+        assert await emit_until_received(
+            client_b, "delete_meetup", {"meetup_id": 1},
+            messages_a, {"meetup_id": 1}
+        )
+    finally:
+        await client_a.disconnect()
+        await client_b.disconnect()
+
+
+@pytest.mark.integration
+async def test_follow_meetup_across_nodes(sio_nodes: list[str]):
+    """
+    Test case for following a meetup through the node without the user's
+    sockets
+    """
+    node_a, node_b = sio_nodes
+    messages_a, messages_b = asyncio.Queue(), asyncio.Queue()
+    update = {"meetup_id": 2, "changes": {"meetup_name": "updated"}}
+
+    client_a = await create_client(node_a, messages_a)
+    client_b = await create_client(node_b, messages_b, token="admin_token")
+    service = socketio.AsyncClient()
+    await service.connect(
+        node_b, auth={"service_token": encode_service_token("test")}
+    )
+
+    try:
+        await service.call("follow_meetup", {"user_id": 1, "meetup_id": 2})
+        assert await emit_until_received(
+            client_b, "update_meetup",
+            {"meetup_id": 2, "data": {"meetup_name": "updated"}},
+            messages_a, update
+        )
+
+        await service.call("unfollow_meetup", {"user_id": 1, "meetup_id": 2})
+        await asyncio.sleep(0.5)
+        await client_b.emit(
+            "update_meetup",
+            {"meetup_id": 2, "data": {"meetup_name": "updated"}}
+        )
+        assert not await wait_for_message(messages_a, update)
+    finally:
+        await client_a.disconnect()
+        await client_b.disconnect()
+        await service.disconnect()
+
+
+@pytest.mark.integration
+async def test_connection_without_token(sio_nodes: list[str]):
+    """
+    Negative test case for socket connection without an access token
+    """
+    client = socketio.AsyncClient()
+
+    with pytest.raises(ConnectionError):
+        await client.connect(sio_nodes[0], auth={})
+
+    assert not client.connected
+
+
+@pytest.mark.integration
+async def test_service_connection(sio_nodes: list[str]):
+    """
+    Test case for socket connections of internal services
+    """
+    client_a = socketio.AsyncClient()
+    client_b = socketio.AsyncClient()
+
+    await client_a.connect(
+        sio_nodes[0], auth={"service_token": encode_service_token("test")}
+    )
+    connected_a = client_a.connected
+    await client_a.disconnect()
+
+    with pytest.raises(ConnectionError):
+        await client_b.connect(
+            sio_nodes[0], auth={"service_token": encode_jwt_token("test")}
+        )
+
+    assert connected_a
+    assert not client_b.connected
+
+
+@pytest.mark.integration
+async def test_admin_events_require_superuser(sio_nodes: list[str]):
+    """
+    Negative test case for meetup removal by a socket of a regular user
+    """
+    client = await create_client(sio_nodes[0], asyncio.Queue())
+
+    try:
+        response = await client.call("delete_meetup", {"meetup_id": 1})
+    finally:
+        await client.disconnect()
+
+    expected_response = {
+        "success": False, "message": "Current user is not a superuser"
+    }
+
+    assert response == expected_response
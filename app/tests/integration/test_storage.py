@@ -0,0 +1,72 @@
+import io
+
+import httpx
+import pytest
+import pytest_mock
+from auth.utils.images import (AVATAR_SIZES, get_avatar_key,
+                               process_avatar_image, write_avatar_original)
+from files.utils.storage import S3Storage
+
+
+@pytest.mark.integration
+def test_s3_storage(s3_storage: S3Storage):
+    """
+    Test case for storing, listing and removal of files in S3 storage
+    """
+    s3_storage.put("1/reports/csv/report.csv", io.BytesIO(b"1,test\n"),
+                   content_type="text/csv")
+
+    with s3_storage.open("1/reports/csv/report.csv") as file:
+        content = file.read()
+    keys = [item.key for item in s3_storage.list("1/")]
+    folders_a = list(s3_storage.list_folders())
+    folders_b = list(s3_storage.list_folders("1/"))
+    exists = s3_storage.exists("1/reports/csv/report.csv")
+
+    s3_storage.delete("1/reports/csv/report.csv")
+
+    assert content == b"1,test\n"
+    assert keys == ["1/reports/csv/report.csv"]
+    assert folders_a == ["1/"]
+    assert folders_b == ["1/reports/"]
+    assert exists
+    assert not s3_storage.exists("1/reports/csv/report.csv")
+
+    with pytest.raises(FileNotFoundError):
+        s3_storage.open("1/reports/csv/report.csv")
+
+
+@pytest.mark.integration
+def test_s3_storage_multipart_upload(s3_storage: S3Storage):
+    """
+    Test case for uploading a large file in parts and downloading it by a
+    presigned URL
+    """
+    content = bytes(range(256)) * 4096 * 11
+
+    s3_storage.put("1/reports/pdf/report.pdf", io.BytesIO(content))
+    response = httpx.get(s3_storage.get_url("1/reports/pdf/report.pdf"))
+    head = s3_storage.client.head_object(Bucket=s3_storage.bucket,
+                                         Key="1/reports/pdf/report.pdf")
+
+    assert response.status_code == 200
+    assert response.content == content
+    assert head["ETag"].strip('"').endswith("-3")
+
+
+@pytest.mark.integration
+def test_process_avatar_image_s3(s3_storage: S3Storage,
+                                 mocker: pytest_mock):
+    """
+    Test case for the avatar processing with S3 storage
+    """
+    mocker.patch("auth.utils.images.storage", s3_storage)
+    with open("./tests/files/test_image.png", 'rb') as file:
+        digest, key = write_avatar_original(file)
+
+    response = process_avatar_image(digest)
+
+    assert response["success"] is True
+    assert not s3_storage.exists(key)
+    assert all(s3_storage.exists(get_avatar_key(digest, size))
+               for size in AVATAR_SIZES)
@@ -0,0 +1,103 @@
+"""
+Latency benchmark of the search results ranking. The distances and the
+composite ranks of a synthetic 10k hits result set are computed in one
+vectorized pass and compared with ranking the hits one by one. Run with
+'pytest -m performance -s'.
+"""
+import math
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from config.settings import settings
+from meetups.utils.geo_index import EARTH_RADIUS
+from meetups.utils.ranking import rank_meetups
+from meetups_logging import logger
+
+RESULT_SIZE = 10000
+REPEATS = 10
+CLIENT_POINT = (53.9, 27.5667)
+
+
+def generate_hits(size: int, rng: random.Random) -> list[dict]:
+    """
+    Function for generating search hits around the client point
+    :param size: number of hits
+    :param rng: random generator
+    :return: hits in the search result format
+    """
+    start = datetime.utcnow()
+    return [
+        {
+            "id": index,
+            "meetup_name": f"Meetup #{index}",
+            "date": (start + timedelta(hours=rng.uniform(1, 2000))
+                     ).isoformat(),
+            "location": f"{rng.uniform(51, 56):.4f}, "
+                        f"{rng.uniform(23, 33):.4f}",
+            "score": rng.uniform(0.5, 10),
+        }
+        for index in range(size)
+    ]
+
+
+def rank_hits_one_by_one(hits: list[dict], point: tuple[float, float]
+                         ) -> list[dict]:
+    """
+    Function for ranking the hits in a plain Python loop, the baseline of
+    the benchmark
+    :param hits: search hits
+    :param point: latitude and longitude of the client point
+    :return: hits with the distance and rank, the best first
+    """
+    now = datetime.utcnow()
+    best_score = max(hit["score"] for hit in hits)
+    lat, lon = map(math.radians, point)
+    result = []
+    for hit in hits:
+        hit_lat, hit_lon = (math.radians(float(value))
+                            for value in hit["location"].split(","))
+        a = (math.sin((hit_lat - lat) / 2) ** 2 + math.cos(lat)
+             * math.cos(hit_lat) * math.sin((hit_lon - lon) / 2) ** 2)
+        distance = 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+        days = (datetime.fromisoformat(hit["date"]) - now) / timedelta(days=1)
+        rank = (hit["score"] / best_score
+                * 0.5 ** (max(days, 0) / settings.RANK_RECENCY_SCALE)
+                * 0.5 ** (distance / settings.RANK_DISTANCE_SCALE))
+        result.append({**hit, "distance": round(distance, 3), "rank": rank})
+    return sorted(result, key=lambda item: -item["rank"])
+
+
+def measure(function, *args) -> tuple[list, float]:
+    """
+    Function for measuring the median latency of a function
+    :param function: measured function
+    :param args: function arguments
+    :return: last result and median latency in ms
+    """
+    latencies = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = function(*args)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(latencies)
+
+
+@pytest.mark.performance
+def test_ranking_benchmark():
+    hits = generate_hits(RESULT_SIZE, random.Random(1))
+
+    vectorized, vectorized_p50 = measure(rank_meetups, hits, CLIENT_POINT,
+                                         True)
+    baseline, baseline_p50 = measure(rank_hits_one_by_one, hits,
+                                     CLIENT_POINT)
+    logger.info(f"Ranking benchmark, {RESULT_SIZE} hits: "
+                f"vectorized_p50={vectorized_p50:.2f}ms, "
+                f"one_by_one_p50={baseline_p50:.2f}ms")
+
+    assert [hit["id"] for hit in vectorized[:100]] == \
+        [hit["id"] for hit in baseline[:100]]
+    assert vectorized[0]["distance"] == baseline[0]["distance"]
+    assert vectorized_p50 < baseline_p50
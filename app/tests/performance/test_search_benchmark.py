@@ -0,0 +1,185 @@
+"""
+Relevance and latency benchmark of the meetups keywords search. A synthetic
+corpus is indexed with the mapping of configs/pgsync/schema.json, and the
+targeted boosted search is compared with matching all the fields. Requires
+a running Elasticsearch, run with 'pytest -m performance -s'.
+"""
+import json
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from config.settings import settings
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk
+from meetups.utils.elastic import match_fields, query_builder, sort_by
+from meetups_logging import logger
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "..",
+                           "configs", "pgsync", "schema.json")
+BENCHMARK_INDEX = "meetups_benchmark"
+CORPUS_SIZE = 5000
+QUERY_REPEATS = 20
+THEMES = [
+    ("Python", "core, language"), ("Django", "web, orm"),
+    ("FastAPI", "web, api, async"), ("Machine Learning", "ml, ai"),
+    ("Data Engineering", "etl, pipelines"), ("DevOps", "docker, ci"),
+    ("Testing", "pytest, qa"), ("Asyncio", "async, concurrency"),
+    ("Security", "auth, crypto"), ("Databases", "postgres, sql"),
+]
+PLACES = [
+    ("Minsk", "53.9, 27.5667"), ("Gomel", "52.4345, 30.9754"),
+    ("Brest", "52.0976, 23.7341"), ("Grodno", "53.6884, 23.8258"),
+    ("Vitebsk", "55.1904, 30.2049"), ("Mogilev", "53.9168, 30.3449"),
+]
+FORMATS = ["meetup", "night", "workshop", "talks", "club"]
+
+
+def get_index_mapping(index: str) -> dict:
+    """
+    Function for converting the pgsync mapping of an index to the
+    Elasticsearch mapping
+    :param index: index name in the pgsync schema
+    :return: index mapping
+    """
+    with open(SCHEMA_PATH) as file:
+        schema = next(item for item in json.load(file)
+                      if item["index"] == index)
+
+    properties = {}
+    for field, mapping in schema["nodes"]["transform"]["mapping"].items():
+        *parents, name = field.split(".")
+        target = properties
+        for parent in parents:
+            target = target.setdefault(parent, {"properties": {}})
+            target = target["properties"]
+        target[name] = mapping
+    return {"properties": properties}
+
+
+def generate_corpus(size: int, rng: random.Random) -> list[dict]:
+    """
+    Function for generating meetups documents. Descriptions mention other
+    themes, so matching them is the noise the targeted search avoids
+    :param size: number of documents
+    :param rng: random generator
+    :return: meetups documents in the pgsync format
+    """
+    corpus = []
+    start = datetime(2030, 1, 1)
+    for meetup_id in range(1, size + 1):
+        theme, tags = rng.choice(THEMES)
+        place_name, location = rng.choice(PLACES)
+        others = rng.sample([item[0] for item in THEMES if item[0] != theme],
+                            2)
+        corpus.append({
+            "id": meetup_id,
+            "meetup_name": f"{theme} {rng.choice(FORMATS)} #{meetup_id}",
+            "description": f"Talks about {others[0]} and {others[1]} "
+                           f"for everyone who is interested",
+            "date": (start + timedelta(hours=meetup_id)).isoformat(),
+            "theme_id": THEMES.index((theme, tags)) + 1,
+            "place_id": PLACES.index((place_name, location)) + 1,
+            "places": {"place_name": place_name, "location": location},
+            "themes": {"theme": theme, "tags": tags},
+        })
+    return corpus
+
+
+def make_typo(word: str, rng: random.Random) -> str:
+    """ Function for swapping two adjacent letters inside a word """
+    index = rng.choice([index for index in range(1, len(word) - 1)
+                        if word[index - 1:index + 2].isalpha()])
+    return word[:index] + word[index + 1] + word[index] + word[index + 2:]
+
+
+def get_search_body(search_string: str, targeted: bool) -> dict:
+    """
+    Function for building the search body the way /meetups/search does
+    :param search_string: searched keywords
+    :param targeted: True for the boosted fields, False for all the fields
+    :return: search body
+    """
+    if targeted:
+        matcher, sorters = match_fields(search_string), ["_score", sort_by()]
+    else:
+        matcher = {"multi_match": {"query": search_string,
+                                   "fuzziness": "AUTO", "fields": ["*"]}}
+        sorters = [sort_by()]
+    return query_builder.build_search_body(matchers=[matcher],
+                                           sorters=sorters)
+
+
+def run_benchmark(es: Elasticsearch, queries: list[tuple[str, str]],
+                  targeted: bool) -> dict:
+    """
+    Function for measuring the search relevance and latency
+    :param es: Elasticsearch client
+    :param queries: searched keywords with the expected theme
+    :param targeted: True for the boosted fields, False for all the fields
+    :return: precision at 10, server and client latencies in ms
+    """
+    precisions, took, latencies = [], [], []
+    for search_string, theme in queries:
+        body = get_search_body(search_string, targeted)
+        for _ in range(QUERY_REPEATS):
+            start = time.perf_counter()
+            result = es.search(index=BENCHMARK_INDEX, body=body,
+                               request_cache=False)
+            latencies.append((time.perf_counter() - start) * 1000)
+            took.append(result["took"])
+        hits = result["hits"]["hits"]
+        relevant = sum(hit["_source"]["themes"]["theme"] == theme
+                       for hit in hits)
+        precisions.append(relevant / len(hits) if hits else 0.0)
+
+    return {
+        "precision@10": statistics.mean(precisions),
+        "took_p50": statistics.median(took),
+        "latency_p50": statistics.median(latencies),
+        "latency_p95": statistics.quantiles(latencies, n=20)[-1],
+    }
+
+
+@pytest.fixture(scope="module")
+def benchmark_es() -> Elasticsearch:
+    es = Elasticsearch(
+        hosts=[f"{settings.ELASTIC_HOST}:{settings.ELASTIC_PORT}"]
+    )
+    if not es.ping():
+        pytest.skip("Elasticsearch is not available")
+
+    es.indices.delete(index=BENCHMARK_INDEX, ignore_unavailable=True)
+    es.indices.create(index=BENCHMARK_INDEX,
+                      body={"mappings": get_index_mapping("meetups")})
+    corpus = generate_corpus(CORPUS_SIZE, random.Random(1))
+    bulk(es, ({"_index": BENCHMARK_INDEX, "_id": doc["id"], **doc}
+              for doc in corpus), refresh=True)
+
+    yield es
+
+    es.indices.delete(index=BENCHMARK_INDEX, ignore_unavailable=True)
+
+
+@pytest.mark.performance
+def test_search_benchmark(benchmark_es: Elasticsearch):
+    rng = random.Random(2)
+    queries = [(theme, theme) for theme, _ in THEMES] + [
+        (make_typo(theme, rng), theme) for theme, _ in THEMES
+    ]
+
+    results = {
+        "all fields": run_benchmark(benchmark_es, queries, targeted=False),
+        "targeted": run_benchmark(benchmark_es, queries, targeted=True),
+    }
+    for name, result in results.items():
+        logger.info(f"Search benchmark, {name}: " + ", ".join(
+            f"{metric}={value:.2f}" for metric, value in result.items()
+        ))
+
+    assert results["targeted"]["precision@10"] >= 0.9
+    assert results["targeted"]["precision@10"] > \
+        results["all fields"]["precision@10"]
@@ -44,17 +44,17 @@ def test_data(db_conn):
     date = dt.datetime.now() + dt.timedelta(days=1)
 
     meetup_query = f"""
-        INSERT INTO meetups (id, meetup_name, theme_id,
-                             place_id, description, date)
-        VALUES (1, 'test_name_a', 1, 1, 'test desc a', '{str(date)}'),
-               (2, 'test_name_b', 1, 2, 'test desc b', '{str(date)}'),
-               (3, 'test_name_c', 1, 1, 'test desc c', '1900-01-01')
+        INSERT INTO meetups (id, meetup_name, theme_id, place_id,
+                             description, date, subscribers_count)
+        VALUES (1, 'test_name_a', 1, 1, 'test desc a', '{str(date)}', 0),
+               (2, 'test_name_b', 1, 2, 'test desc b', '{str(date)}', 1),
+               (3, 'test_name_c', 1, 1, 'test desc c', '1900-01-01', 0)
         """
 
     place_query = """
-        INSERT INTO places (id, place_name, location)
-        VALUES (1, 'test_a', '52.4345, 30.9754'),
-               (2, 'test_b', '53.9, 27.5667')
+        INSERT INTO places (id, place_name, location, latitude, longitude)
+        VALUES (1, 'test_a', '52.4345, 30.9754', 52.4345, 30.9754),
+               (2, 'test_b', '53.9, 27.5667', 53.9, 27.5667)
         """
 
     theme_query = """
@@ -101,9 +101,9 @@ def test_data(db_conn):
 @pytest.fixture
 def test_data_partial(db_conn):
     place_query = """
-        INSERT INTO places (id, place_name, location)
-        VALUES (1, 'test_a', '52.4345, 30.9754'),
-               (2, 'test_b', '53.9, 27.5667')
+        INSERT INTO places (id, place_name, location, latitude, longitude)
+        VALUES (1, 'test_a', '52.4345, 30.9754', 52.4345, 30.9754),
+               (2, 'test_b', '53.9, 27.5667', 53.9, 27.5667)
         """
 
     theme_query = """
@@ -6,6 +6,7 @@ from auth.utils.crud import (create_user, create_user_token, delete_user_by_id,
                              get_user, get_user_by_username,
                              update_user_profile)
 from config.database import database
+from meetups.models import Meetups
 from sqlalchemy import select
 
 
@@ -59,6 +60,19 @@ async def test_delete_user_by_id(test_data):
     assert response == expected_response
 
 
+@pytest.mark.unit
+async def test_delete_user_subscribers_count(test_data):
+    await delete_user_by_id(1)
+
+    query = (
+        select(Meetups.subscribers_count)
+        .where(Meetups.id == 2)
+    )
+    meetup_db = await database.fetch_one(query)
+
+    assert meetup_db.subscribers_count == 0
+
+
 @pytest.mark.unit
 async def test_update_user_profile(test_data, mock_verification_email_unit):
     user = TestUser(
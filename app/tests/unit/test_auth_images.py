@@ -0,0 +1,126 @@
+import hashlib
+import io
+import os
+
+import pytest
+import pytest_mock
+from auth.utils.images import (AVATAR_SIZES, get_avatar_key,
+                               is_decodable_image, process_avatar_image,
+                               write_avatar_original)
+from celery.exceptions import Retry
+from celery_tasks.tasks import process_avatar_image_celery
+from config.settings import settings
+from files.utils.storage import LocalStorage
+from PIL import Image
+from worker.celery import create_celery
+
+TEST_IMAGE_PATH = os.path.join(os.path.dirname(__file__),
+                               "../files/test_image.png")
+
+
+@pytest.fixture
+def local_storage(tmp_path, mocker: pytest_mock) -> LocalStorage:
+    storage = LocalStorage(str(tmp_path))
+    mocker.patch("auth.utils.images.storage", storage)
+    return storage
+
+
+@pytest.mark.unit
+def test_process_avatar_image(local_storage: LocalStorage):
+    with open(os.path.join(os.path.dirname(__file__),
+                           "../files/test_image.png"), 'rb') as file:
+        content = file.read()
+    digest = hashlib.sha256(content).hexdigest()
+
+    response_a = write_avatar_original(io.BytesIO(content))
+    response_b = process_avatar_image(digest)
+    response_c = write_avatar_original(io.BytesIO(content))
+
+    expected_response_b = {
+        "success": True,
+        "message": f"Avatar image has been processed (digest={digest})"
+    }
+
+    assert response_a == (digest, get_avatar_key(digest, 'original'))
+    assert response_b == expected_response_b
+    assert response_c == (digest, None)
+    assert not local_storage.exists(response_a[1])
+
+    for size in AVATAR_SIZES:
+        with Image.open(local_storage.open(get_avatar_key(digest, size))) \
+                as image:
+            assert image.format == "JPEG"
+            assert image.size == (size, size)
+
+
+@pytest.mark.unit
+def test_process_avatar_image_broken(local_storage: LocalStorage):
+    digest = hashlib.sha256(b'Hello world').hexdigest()
+
+    write_avatar_original(io.BytesIO(b'Hello world'))
+    response = process_avatar_image(digest)
+
+    assert response["success"] is False
+    assert not local_storage.exists(get_avatar_key(digest, AVATAR_SIZES[0]))
+    assert not local_storage.exists(get_avatar_key(digest, 'original'))
+
+
+@pytest.mark.unit
+def test_process_avatar_image_storage_error(local_storage: LocalStorage,
+                                            mocker: pytest_mock):
+    with open(TEST_IMAGE_PATH, 'rb') as file:
+        content = file.read()
+    digest = hashlib.sha256(content).hexdigest()
+    write_avatar_original(io.BytesIO(content))
+    mocker.patch.object(local_storage, "put", side_effect=OSError("Full"))
+    update_url = mocker.patch("celery_tasks.tasks.update_avatar_url")
+
+    with pytest.raises(OSError):
+        process_avatar_image(digest)
+    with pytest.raises(Retry):
+        process_avatar_image_celery.apply(args=[digest, 1], throw=True)
+
+    assert local_storage.exists(get_avatar_key(digest, 'original'))
+    update_url.assert_not_called()
+
+
+@pytest.mark.unit
+def test_process_avatar_image_celery(local_storage: LocalStorage,
+                                     mocker: pytest_mock):
+    with open(TEST_IMAGE_PATH, 'rb') as file:
+        content = file.read()
+    digest = hashlib.sha256(content).hexdigest()
+    write_avatar_original(io.BytesIO(content))
+    update_url = mocker.patch("celery_tasks.tasks.update_avatar_url",
+                              new=mocker.AsyncMock())
+
+    response_a = process_avatar_image_celery.apply(args=[digest, 1]).get()
+    response_b = process_avatar_image_celery.apply(args=[digest, 2]).get()
+
+    assert response_a["success"] and response_b["success"]
+    assert update_url.call_args_list == [mocker.call(1, digest),
+                                         mocker.call(2, digest)]
+
+
+@pytest.mark.unit
+def test_process_avatar_image_celery_route():
+    router = create_celery().amqp.router
+
+    route = router.route({}, process_avatar_image_celery.name)
+
+    assert route["queue"].name == "images"
+    assert "images" in {queue.name for queue in settings.CELERY_TASK_QUEUES}
+
+
+@pytest.mark.unit
+def test_is_decodable_image():
+    with open(TEST_IMAGE_PATH, 'rb') as file:
+        response_a = is_decodable_image(file)
+        position = file.tell()
+
+    heic_head = b'\x00\x00\x00\x18ftypheic' + bytes(100)
+    response_b = is_decodable_image(io.BytesIO(heic_head))
+
+    assert response_a is True
+    assert position == 0
+    assert response_b is False
@@ -0,0 +1,44 @@
+import pytest
+from auth.utils.mail import (EmailTemplates, RenderedEmail, create_message,
+                             render_verification_email)
+
+
+@pytest.mark.unit
+def test_render_verification_email():
+    response = render_verification_email("<user>", "http://test/")
+
+    assert response.subject == "Registration confirmation"
+    assert response.text.startswith("Hi <user>, this is email address")
+    assert "http://test/users/activate_user/" in response.text
+    assert response.html.startswith("<p>Hi &lt;user&gt;, this is email")
+
+
+@pytest.mark.unit
+def test_email_templates_locale(tmp_path):
+    for locale, subject in (("en", "Hello"), ("be", "Вітаем")):
+        (tmp_path / locale).mkdir()
+        (tmp_path / locale / "test.jinja2").write_text(
+            f"{{% block subject %}}{subject}{{% endblock %}}"
+            "{% block text %}{{ name }}{% endblock %}"
+            "{% block html %}<b>{{ name }}</b>{% endblock %}",
+            encoding="utf-8"
+        )
+    templates = EmailTemplates(str(tmp_path))
+
+    response_a = templates.render("test", "be", name="test")
+    response_b = templates.render("test", "de", name="test")
+
+    assert response_a == RenderedEmail("Вітаем", "test", "<b>test</b>")
+    assert response_b == RenderedEmail("Hello", "test", "<b>test</b>")
+
+
+@pytest.mark.unit
+def test_create_message():
+    rendered = RenderedEmail("subject", "text", "<p>html</p>")
+
+    response = create_message("test@test.com", rendered)
+    parts = [part.get_content_type() for part in response.iter_parts()]
+
+    assert response.get_content_type() == "multipart/alternative"
+    assert response["To"] == "test@test.com"
+    assert parts == ["text/plain", "text/html"]
@@ -2,7 +2,8 @@ import os
 
 import pytest
 from auth.utils.security import (check_strong_password, decode_jwt_token,
-                                 encode_jwt_token, hash_password,
+                                 decode_service_token, encode_jwt_token,
+                                 encode_service_token, hash_password,
                                  validate_password)
 from jose import jwt
 from werkzeug.security import check_password_hash, generate_password_hash
@@ -93,3 +94,15 @@ def test_decode_jwt_token():
     response_b = decode_jwt_token(token)
 
     assert response_a == crypto_string == response_b
+
+
+@pytest.mark.unit
+def test_decode_service_token():
+    service_token = encode_service_token('test_service')
+    user_token = encode_jwt_token('test_service')
+
+    response_a = decode_service_token(service_token)
+    response_b = decode_service_token(user_token)
+
+    assert response_a == 'test_service'
+    assert response_b is None
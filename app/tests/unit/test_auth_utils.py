@@ -1,12 +1,17 @@
-import os
+import hashlib
 
 import pytest
+import pytest_mock
 from auth.models import Users
 from auth.utils.auth_utils import (VerifyUserItem, activate_user,
-                                   create_superuser, get_user_by_token,
+                                   create_calendar_token, create_superuser,
+                                   get_user_by_calendar_token,
+                                   get_user_by_token, revoke_calendar_token,
                                    save_avatar_image, update_avatar_url_in_db,
                                    verify_avatar_image, verify_email_username)
+from auth.utils.images import AVATAR_URL_SIZE, get_avatar_key
 from config.database import database
+from files.utils.storage import get_storage_url, storage
 from sqlalchemy import select
 
 
@@ -105,21 +110,51 @@ async def test_update_avatar_url_in_db(test_data):
 
 
 @pytest.mark.unit
-async def test_save_avatar_image(db_conn):
+async def test_save_avatar_image(test_data, mocker: pytest_mock):
+    process_avatar = mocker.patch(
+        target='celery_tasks.tasks.process_avatar_image_celery.apply_async'
+    )
+
     with open("./tests/files/test_image.png", 'rb') as file:
         content = file.read()
+        file.seek(0)
+        response = await save_avatar_image(file, 1)
 
-    response = await save_avatar_image(content, 1)
+    digest = hashlib.sha256(content).hexdigest()
 
     expected_response = {
         'success': True,
         'message': 'User avatar upload successful (user_id = 1)'
     }
 
-    with open("./storage/1/images/avatar.jpg", 'rb') as file:
+    with storage.open(get_avatar_key(digest, 'original')) as file:
         saved_content = file.read()
 
+    query = select(Users).where(Users.id == 1)
+    user_db = await database.fetch_one(query)
+
     assert response == expected_response
     assert content == saved_content
+    assert user_db.avatar_url != \
+        get_storage_url(get_avatar_key(digest, AVATAR_URL_SIZE))
+    process_avatar.assert_called_once_with(args=[digest, 1])
+
+    storage.delete(get_avatar_key(digest, 'original'))
+
+
+@pytest.mark.unit
+async def test_calendar_token(test_data):
+    token_a = await create_calendar_token(1)
+    token_b = await create_calendar_token(1)
+
+    response_a = await get_user_by_calendar_token(token_a)
+    response_b = await get_user_by_calendar_token(token_b)
+    response_c = await get_user_by_calendar_token('not a token')
+
+    await revoke_calendar_token(1)
+    response_d = await get_user_by_calendar_token(token_b)
 
-    os.remove("./storage/1/images/avatar.jpg")
+    assert response_a is None
+    assert response_b.id == 1
+    assert response_c is None
+    assert response_d is None
@@ -0,0 +1,56 @@
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from httpx import AsyncClient
+from middlewares.body_size_middleware import BodySizeLimitMiddleware
+
+
+def create_app(limit: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File()):
+        return {"size": len(await file.read())}
+
+    @app.post("/unlimited")
+    async def unlimited(file: UploadFile = File()):
+        return {"size": len(await file.read())}
+
+    app.add_middleware(BodySizeLimitMiddleware, limits={"/upload": limit})
+    return app
+
+
+async def chunked_body(size: int):
+    boundary = b"--boundary\r\n"
+    yield boundary + b'Content-Disposition: form-data; name="file"; ' \
+                     b'filename="test"\r\n\r\n'
+    for _ in range(size // 1024):
+        yield b"x" * 1024
+    yield b"\r\n--boundary--\r\n"
+
+
+@pytest.mark.unit
+async def test_body_size_limit():
+    app = create_app(limit=4096)
+    expected_response = {
+        "detail": {"success": False,
+                   "message": "Request body exceeds the limit of 4096 bytes"}
+    }
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response_a = await client.post("/upload",
+                                       files={"file": b"x" * 1024})
+        response_b = await client.post("/upload",
+                                       files={"file": b"x" * 8192})
+        response_c = await client.post(
+            "/upload", content=chunked_body(8192),
+            headers={"content-type": "multipart/form-data; boundary=boundary"}
+        )
+        response_d = await client.post("/unlimited",
+                                       files={"file": b"x" * 8192})
+
+    assert response_a.status_code == 200
+    assert response_b.status_code == 413
+    assert response_b.json() == expected_response
+    assert response_c.status_code == 413
+    assert response_c.json() == expected_response
+    assert response_d.json() == {"size": 8192}
@@ -0,0 +1,86 @@
+import pytest
+from files.utils.files_utils import (IMMUTABLE_CACHE_CONTROL,
+                                     create_file_response, get_storage_key,
+                                     is_file_allowed, parse_range)
+from httpx import AsyncClient
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.routing import Route
+
+
+@pytest.fixture
+async def files_client(tmp_path) -> AsyncClient:
+    file_path = tmp_path / "report.csv"
+    file_path.write_bytes(bytes(range(256)) * 1024)
+
+    async def get_file(request: Request):
+        return await create_file_response(
+            str(file_path), request.headers, request.method,
+            immutable=request.query_params.get("immutable") == "1"
+        )
+
+    app = Starlette(routes=[Route("/file", get_file, methods=["GET"])])
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+
+
+@pytest.mark.unit
+def test_parse_range():
+    assert parse_range(None, 1000) is None
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=900-2000", 1000) == (900, 999)
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+    assert parse_range("items=0-1", 1000) is None
+
+    with pytest.raises(ValueError):
+        parse_range("bytes=1000-", 1000)
+
+
+@pytest.mark.unit
+def test_storage_access():
+    assert get_storage_key("1/reports/../reports/csv/report.csv") == \
+        "1/reports/csv/report.csv"
+    assert get_storage_key("../app/main.py") is None
+    assert get_storage_key("/etc/passwd") is None
+
+    assert is_file_allowed("avatars/ab/abc/256.jpg", 2, False)
+    assert is_file_allowed("reports/csv/abc.csv", 2, False)
+    assert is_file_allowed("1/reports/csv/report.csv", 1, False)
+    assert is_file_allowed("1/reports/csv/report.csv", 2, True)
+    assert not is_file_allowed("1/reports/csv/report.csv", 2, False)
+    assert not is_file_allowed("1/../2/reports/csv/report.csv", 1, False)
+
+
+@pytest.mark.unit
+async def test_create_file_response(files_client: AsyncClient):
+    content = bytes(range(256)) * 1024
+
+    response_a = await files_client.get("/file")
+    etag = response_a.headers["etag"]
+    response_b = await files_client.get(
+        "/file", headers={"range": "bytes=1000-1999"}
+    )
+    response_c = await files_client.get(
+        "/file", headers={"range": "bytes=1000-1999", "if-range": '"old"'}
+    )
+    response_d = await files_client.get(
+        "/file", headers={"if-none-match": etag}
+    )
+    response_e = await files_client.get(
+        "/file", headers={"range": f"bytes={len(content)}-"}
+    )
+    response_f = await files_client.get("/file?immutable=1")
+
+    assert response_a.status_code == 200
+    assert response_a.content == content
+    assert response_a.headers["accept-ranges"] == "bytes"
+    assert response_b.status_code == 206
+    assert response_b.content == content[1000:2000]
+    assert response_b.headers["content-range"] == \
+        f"bytes 1000-1999/{len(content)}"
+    assert response_c.status_code == 200
+    assert response_d.status_code == 304
+    assert response_e.status_code == 416
+    assert response_f.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
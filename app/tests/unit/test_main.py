@@ -0,0 +1,40 @@
+import os
+import socket
+import urllib.request
+
+import pytest
+import pytest_mock
+from config.settings import settings
+from main import start_metrics_server
+from prometheus_client.values import MultiProcessValue
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.unit
+def test_start_metrics_server(tmp_path, mocker: pytest_mock):
+    port = get_free_port()
+    mocker.patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": str(tmp_path)})
+    mocker.patch.object(settings, "PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    mocker.patch.object(settings, "METRICS_PORT", port)
+    logger = mocker.patch("main.logger")
+
+    # A counter of another worker process
+    value = MultiProcessValue(lambda: 4321)(
+        "counter", "meetups_test", "meetups_test", (), (), "test"
+    )
+    value.inc(3)
+
+    start_metrics_server()
+    # The port is bound already, as by the first of several workers
+    start_metrics_server()
+
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as file:
+        metrics = file.read().decode()
+
+    assert "meetups_test 3.0" in metrics
+    assert logger.info.call_count == 1
@@ -1,14 +1,19 @@
+import asyncio
 import datetime as dt
 
 import pytest
 from config.database import database
 from meetups.models import Meetups, MeetupsUsers
 from meetups.schemas import MeetupsBase, MeetupsUpdate
-from meetups.utils.crud import (create_meetup_subscription, create_new_meetup,
+from meetups.utils.crud import (create_meetup_subscription,
+                                create_meetup_subscriptions, create_new_meetup,
                                 delete_meetup_by_id, get_all_actual_meetups,
                                 get_all_meetups, get_all_user_meetups,
-                                remove_meetup_subscription, update_meetup_data)
-from sqlalchemy import and_, select
+                                remove_meetup_subscription,
+                                remove_meetup_subscriptions,
+                                update_meetup_data)
+from pydantic import ValidationError
+from sqlalchemy import and_, select, update
 
 
 @pytest.mark.unit
@@ -86,9 +91,14 @@ async def test_get_all_meetups(test_data):
 
 @pytest.mark.unit
 async def test_get_all_actual_meetups(test_data):
-    meetups = await get_all_actual_meetups()
+    meetups_a = await get_all_actual_meetups()
+    await create_meetup_subscription(1, 1)
+    meetups_b = await get_all_actual_meetups()
 
-    assert len(meetups) == 2
+    assert len(meetups_a) == 2
+    assert [meetup.id for meetup in meetups_b] == [1, 2]
+    assert [tuple(meetup.values()) for meetup in meetups_a] == \
+        [tuple(meetup.values()) for meetup in meetups_b]
 
 
 @pytest.mark.unit
@@ -198,6 +208,23 @@ async def test_create_meetup_subscription(test_data):
     assert response_b == expected_response_b
 
 
+@pytest.mark.unit
+async def test_create_meetup_subscription_concurrent(test_data):
+    responses = await asyncio.gather(
+        *[create_meetup_subscription(1, 1) for _ in range(5)]
+    )
+
+    query = (
+        select(MeetupsUsers.id)
+        .where(and_(MeetupsUsers.user_id == 1,
+                    MeetupsUsers.meetup_id == 1))
+    )
+    meetups_users = await database.fetch_all(query)
+
+    assert len(meetups_users) == 1
+    assert [response['success'] for response in responses].count(True) == 1
+
+
 @pytest.mark.unit
 async def test_get_all_user_meetups(test_data):
     response = await get_all_user_meetups(1)
@@ -232,3 +259,135 @@ async def test_remove_meetup_subscription(test_data):
     assert meetup_user is None
     assert response_a == expected_response_a
     assert response_b == expected_response_b
+
+
+@pytest.mark.unit
+async def test_create_meetup_subscriptions(test_data):
+    response = await create_meetup_subscriptions(1, [1, 2, 4, 1])
+
+    expected_response = [
+        {'meetup_id': 1, 'success': True,
+         'message': 'Subscription was successfully completed'},
+        {'meetup_id': 2, 'success': False,
+         'message': 'The user is already subscribed to this meetup'},
+        {'meetup_id': 4, 'success': False,
+         'message': 'Meetup (meetup_id=4) not found'},
+    ]
+
+    query = (
+        select(MeetupsUsers.meetup_id)
+        .where(MeetupsUsers.user_id == 1)
+        .order_by(MeetupsUsers.meetup_id)
+    )
+    meetups_users = await database.fetch_all(query)
+
+    assert response == expected_response
+    assert [record.meetup_id for record in meetups_users] == [1, 2]
+
+
+@pytest.mark.unit
+async def test_remove_meetup_subscriptions(test_data):
+    response = await remove_meetup_subscriptions(1, [2, 3])
+
+    expected_response = [
+        {'meetup_id': 2, 'success': True,
+         'message': 'Meetup subscription has been deleted (uid=1, mid=2)'},
+        {'meetup_id': 3, 'success': False,
+         'message': 'Meetup subscription does not exist (uid=1, mid=3)'},
+    ]
+
+    query = (
+        select(MeetupsUsers.id)
+        .where(MeetupsUsers.user_id == 1)
+    )
+    meetups_users = await database.fetch_all(query)
+
+    assert response == expected_response
+    assert meetups_users == []
+
+
+@pytest.mark.unit
+async def test_meetup_subscribers_count(test_data):
+    await create_meetup_subscription(1, 1)
+    await create_meetup_subscription(2, 1)
+    await create_meetup_subscription(2, 1)
+    await remove_meetup_subscription(1, 1)
+    await create_meetup_subscriptions(1, [1, 2, 3])
+    await remove_meetup_subscriptions(1, [2])
+
+    query = (
+        select(Meetups.id, Meetups.subscribers_count)
+        .order_by(Meetups.id)
+    )
+    meetups = await database.fetch_all(query)
+
+    assert [meetup.subscribers_count for meetup in meetups] == [2, 0, 1]
+
+
+@pytest.mark.unit
+async def test_meetup_subscription_capacity(test_data):
+    query = (
+        update(Meetups)
+        .where(Meetups.id.in_([1, 2]))
+        .values(capacity=1)
+    )
+    await database.execute(query)
+
+    response_a = await create_meetup_subscription(1, 1)
+    response_b = await create_meetup_subscription(2, 1)
+    response_c = await create_meetup_subscriptions(2, [1, 2, 3])
+
+    expected_response_b = {
+        'success': False, 'message': 'Meetup (meetup_id=1) is full'
+    }
+    expected_response_c = [
+        {'meetup_id': 1, 'success': False,
+         'message': 'Meetup (meetup_id=1) is full'},
+        {'meetup_id': 2, 'success': False,
+         'message': 'Meetup (meetup_id=2) is full'},
+        {'meetup_id': 3, 'success': True,
+         'message': 'Subscription was successfully completed'},
+    ]
+
+    query = (
+        select(MeetupsUsers.meetup_id)
+        .where(MeetupsUsers.user_id == 2)
+    )
+    meetups_users = await database.fetch_all(query)
+
+    assert response_a['success']
+    assert response_b == expected_response_b
+    assert response_c == expected_response_c
+    assert [record.meetup_id for record in meetups_users] == [3]
+
+
+@pytest.mark.unit
+async def test_update_meetup_capacity(test_data):
+    await create_meetup_subscription(1, 1)
+    await create_meetup_subscription(2, 1)
+
+    response_a = await update_meetup_data(1, MeetupsUpdate(capacity=1))
+    response_b = await update_meetup_data(1, MeetupsUpdate(capacity=2))
+    response_c = await update_meetup_data(
+        1, MeetupsUpdate(remove_capacity=True)
+    )
+
+    expected_response_a = {
+        'success': False,
+        'message': 'Capacity can not be less than the number of '
+                   'subscribers (2)'
+    }
+
+    query = (
+        select(Meetups.capacity)
+        .where(Meetups.id == 1)
+    )
+    meetup = await database.fetch_one(query)
+
+    assert response_a == expected_response_a
+    assert response_b['success']
+    assert response_c['success']
+    assert meetup.capacity is None
+
+    with pytest.raises(ValidationError):
+        MeetupsUpdate(capacity=1, remove_capacity=True)
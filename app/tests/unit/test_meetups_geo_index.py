@@ -0,0 +1,113 @@
+import datetime as dt
+import json
+import random
+
+import numpy as np
+import pytest
+import pytest_mock
+from meetups.utils.geo_index import GeoIndex, haversine_distances
+
+
+def get_record(meetup_id: int, place_id: int, lat: float, lon: float,
+               days: int = 1) -> dict:
+    return {
+        "id": meetup_id, "meetup_name": f"test_name_{meetup_id}",
+        "date": dt.datetime.utcnow() + dt.timedelta(days=days),
+        "description": "test desc", "theme": "test theme", "tags": "test tag",
+        "place_name": f"test_{place_id}", "location": f"{lat}, {lon}",
+        "place_id": place_id, "latitude": lat, "longitude": lon,
+    }
+
+
+@pytest.fixture
+def records() -> list[dict]:
+    return [
+        get_record(1, 1, 53.9, 27.5667),
+        get_record(2, 1, 53.9, 27.5667, days=2),
+        get_record(3, 2, 52.4345, 30.9754),
+        get_record(4, 3, 53.9, 27.5667, days=-1),
+        get_record(5, 4, 0.5, 179.9),
+    ]
+
+
+@pytest.mark.unit
+def test_haversine_distances():
+    response = haversine_distances(53.9, 27.5667, np.array([53.9, 52.4345]),
+                                   np.array([27.5667, 30.9754]))
+
+    assert response[0] == pytest.approx(0)
+    assert response[1] == pytest.approx(279.57, abs=0.01)
+
+
+@pytest.mark.unit
+def test_geo_index_search(records: list[dict]):
+    geo_index = GeoIndex(cell_size=1)
+    geo_index.load(records)
+
+    response_a = geo_index.search(53.9, 27.5667, size=10, radius=100)
+    response_b = geo_index.search(53.9, 27.5667, size=3)
+    response_c = geo_index.search(53.9, 27.5667, size=1, radius=100)
+    response_d = geo_index.search(0.5, -179.9, size=1, radius=50)
+
+    assert [meetup["id"] for meetup in response_a] == [1, 2]
+    assert response_a[0]["distance"] == 0
+    assert isinstance(response_a[0]["date"], str)
+    assert "place_id" not in response_a[0]
+    assert [meetup["id"] for meetup in response_b] == [1, 2, 3]
+    assert response_b[2]["distance"] == pytest.approx(279.57, abs=0.01)
+    assert [meetup["id"] for meetup in response_c] == [1]
+    assert [meetup["id"] for meetup in response_d] == [5]
+
+
+@pytest.mark.unit
+def test_geo_index_search_random():
+    rng = random.Random(1)
+    records = [
+        get_record(index, index, rng.uniform(-89, 89), rng.uniform(-180, 180))
+        for index in range(1, 2001)
+    ]
+    geo_index = GeoIndex(cell_size=2)
+    geo_index.load(records)
+    lats = np.array([record["latitude"] for record in records])
+    lons = np.array([record["longitude"] for record in records])
+
+    for _ in range(20):
+        lat, lon = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        distances = haversine_distances(lat, lon, lats, lons)
+        expected = (np.argsort(distances, kind="stable") + 1).tolist()
+
+        response_a = geo_index.search(lat, lon, size=2000, radius=1500)
+        response_b = geo_index.search(lat, lon, size=5)
+
+        assert [meetup["id"] for meetup in response_a] == \
+            expected[:int((distances <= 1500).sum())]
+        assert [meetup["id"] for meetup in response_b] == expected[:5]
+
+
+@pytest.mark.unit
+async def test_geo_index_refresh(records: list[dict], mocker: pytest_mock):
+    get_meetups = mocker.patch("meetups.utils.geo_index.get_geo_meetups",
+                               return_value=records)
+    geo_index = GeoIndex(cell_size=1)
+
+    response_a = await geo_index.nearby(53.9, 27.5667, size=10, radius=100)
+
+    get_meetups.return_value = [get_record(3, 2, 53.91, 27.57)]
+    geo_index.on_catalog_change(None, 1, "fastapi", json.dumps(
+        {"table": "places", "new": {"id": 2}, "old": {"id": 2}}
+    ))
+    geo_index.on_catalog_change(None, 1, "fastapi", json.dumps(
+        {"table": "tokens", "new": {"id": 1}}
+    ))
+    response_b = await geo_index.nearby(53.9, 27.5667, size=10, radius=100)
+
+    assert [meetup["id"] for meetup in response_a] == [1, 2]
+    assert [meetup["id"] for meetup in response_b] == [1, 2, 3]
+    assert get_meetups.call_args_list == [mocker.call(), mocker.call([2])]
+    assert geo_index.rebuild_required is False
+
+    geo_index.on_catalog_change(None, 1, "fastapi", json.dumps(
+        {"table": "themes", "new": {"id": 1}}
+    ))
+
+    assert geo_index.rebuild_required is True
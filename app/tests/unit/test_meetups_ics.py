@@ -0,0 +1,131 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+import pytest_mock
+from fastapi import FastAPI
+from httpx import AsyncClient
+from meetups import meetups_routers
+from meetups.utils.ics import (IcsFeedCache, create_ics_response,
+                               escape_ics_text, fold_ics_line,
+                               get_ics_feed_version, iterate_ics_feed)
+from starlette.datastructures import Headers
+
+
+@pytest.fixture
+def ics_meetups() -> list[dict]:
+    return [
+        {"id": 1, "meetup_name": "test_name_a", "date": datetime(2030, 1, 1),
+         "description": "test desc a; line\nnext", "theme": "test theme",
+         "tags": "test tag", "place_name": "test_a",
+         "location": "52.4345, 30.9754", "subscribers_count": 1,
+         "capacity": 10},
+        {"id": 2, "meetup_name": "test_name_b", "date": datetime(2030, 1, 2),
+         "description": None, "theme": None, "tags": None,
+         "place_name": "test_b", "location": "test location",
+         "subscribers_count": 0, "capacity": None},
+    ]
+
+
+async def read_body(response) -> bytes:
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
+@pytest.mark.unit
+def test_fold_ics_line():
+    line_a = fold_ics_line("SUMMARY:short")
+    line_b = fold_ics_line("DESCRIPTION:" + "ж" * 100)
+
+    parts = line_b.removesuffix("\r\n").split("\r\n ")
+
+    assert line_a == "SUMMARY:short\r\n"
+    assert len(parts) == 3
+    assert all(len(part.encode()) <= 75 for part in parts)
+    assert "".join(parts) == "DESCRIPTION:" + "ж" * 100
+    assert escape_ics_text("a,b;c\\d\r\ne") == "a\\,b\\;c\\\\d\\ne"
+
+
+@pytest.mark.unit
+def test_iterate_ics_feed(ics_meetups: list[dict]):
+    chunks = list(iterate_ics_feed(ics_meetups, datetime(2023, 1, 1)))
+    feed = "".join(chunks)
+
+    assert len(chunks) == 4
+    assert feed.startswith("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n")
+    assert feed.endswith("END:VCALENDAR\r\n")
+    assert "DTSTART:20300101T000000Z\r\n" in chunks[1]
+    assert "DESCRIPTION:test desc a\\; line\\nnext\r\n" in chunks[1]
+    assert "GEO:52.4345;30.9754\r\n" in chunks[1]
+    assert "GEO" not in chunks[2]
+    assert "DESCRIPTION" not in chunks[2]
+
+
+@pytest.mark.unit
+async def test_create_ics_response(ics_meetups: list[dict],
+                                   mocker: pytest_mock):
+    mocker.patch("meetups.utils.ics.ics_feed_cache", IcsFeedCache(1))
+    render = mocker.spy(IcsFeedCache, "stream")
+
+    response_a = create_ics_response(1, ics_meetups, Headers())
+    body_a = await read_body(response_a)
+    etag = response_a.headers["etag"]
+
+    response_b = create_ics_response(1, ics_meetups,
+                                     Headers({"if-none-match": etag}))
+    response_c = create_ics_response(1, ics_meetups, Headers())
+
+    ics_meetups[1]["subscribers_count"] = 5
+    response_d = create_ics_response(1, ics_meetups[::-1], Headers())
+    ics_meetups.pop()
+    response_e = create_ics_response(1, ics_meetups,
+                                     Headers({"if-none-match": etag}))
+    await read_body(response_e)
+
+    assert response_a.media_type == "text/calendar; charset=utf-8"
+    assert body_a.count(b"BEGIN:VEVENT") == 2
+    assert response_b.status_code == 304
+    assert response_c.body == body_a
+    assert response_d.headers["etag"] == etag
+    assert response_e.status_code == 200
+    assert response_e.headers["etag"] != etag
+    assert render.call_count == 2
+
+
+@pytest.mark.unit
+def test_ics_feed_cache(ics_meetups: list[dict]):
+    cache = IcsFeedCache(max_size=2)
+    version = get_ics_feed_version(ics_meetups)
+
+    cache.put(1, version, b"feed_1")
+    cache.put(2, version, b"feed_2")
+    cache.get(1, version)
+    cache.put(3, version, b"feed_3")
+
+    assert cache.get(1, version) == b"feed_1"
+    assert cache.get(1, "other version") is None
+    assert cache.get(2, version) is None
+    assert cache.get(3, version) == b"feed_3"
+
+
+@pytest.mark.unit
+async def test_get_user_calendar(ics_meetups: list[dict],
+                                 mocker: pytest_mock):
+    async def get_user_by_calendar_token(token: str):
+        return SimpleNamespace(id=1) if token == "user_token" else None
+
+    mocker.patch("meetups.meetups_routers.get_user_by_calendar_token",
+                 side_effect=get_user_by_calendar_token)
+    get_meetups = mocker.patch("meetups.meetups_routers.get_all_user_meetups",
+                               return_value=ics_meetups)
+    mocker.patch("meetups.utils.ics.ics_feed_cache", IcsFeedCache(1))
+    app = FastAPI()
+    app.include_router(meetups_routers.router, prefix="/meetups")
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response_a = await client.get("/meetups/calendar/user_token.ics")
+        response_b = await client.get("/meetups/calendar/other_token.ics")
+
+    assert response_a.status_code == 200
+    assert response_a.text.count("BEGIN:VEVENT") == 2
+    assert response_b.status_code == 404
+    get_meetups.assert_called_once_with(1)
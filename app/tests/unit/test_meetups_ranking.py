@@ -0,0 +1,52 @@
+import datetime as dt
+
+import pytest
+import pytest_mock
+from config.settings import settings
+from meetups.utils.ranking import rank_meetups
+
+
+def get_meetup(meetup_id: int, location: str, days: float,
+               score: float | None) -> dict:
+    date = dt.datetime.utcnow() + dt.timedelta(days=days)
+    return {"id": meetup_id, "location": location, "date": date.isoformat(),
+            "score": score}
+
+
+@pytest.mark.unit
+def test_rank_meetups(mocker: pytest_mock):
+    mocker.patch.object(settings, "RANK_DISTANCE_SCALE", 50)
+    mocker.patch.object(settings, "RANK_RECENCY_SCALE", 7)
+    meetups = [
+        get_meetup(1, "52.4345, 30.9754", 1, 2.0),
+        get_meetup(2, "53.9, 27.5667", 7, 2.0),
+        get_meetup(3, "53.9, 27.5667", 1, 1.0),
+        get_meetup(4, "test location", 1, 4.0),
+    ]
+
+    response_a = rank_meetups(meetups, (53.9, 27.5667))
+    response_b = rank_meetups(meetups, (53.9, 27.5667), composite=True)
+    response_c = rank_meetups(meetups, None)
+
+    assert [meetup["distance"] for meetup in response_a] == \
+        [pytest.approx(279.57, abs=0.01), 0, 0, None]
+    assert [meetup["id"] for meetup in response_b] == [2, 3, 1, 4]
+    assert response_b[0]["rank"] == pytest.approx(0.25, abs=0.001)
+    assert response_b[1]["rank"] == pytest.approx(0.25 * 2 ** (-1 / 7),
+                                                  abs=0.001)
+    assert response_b[3]["rank"] == 0
+    assert [meetup["distance"] for meetup in response_c] == [None] * 4
+    assert "distance" not in meetups[0]
+
+
+@pytest.mark.unit
+def test_rank_meetups_without_scores():
+    meetups = [
+        get_meetup(1, "53.9, 27.5667", 30, None),
+        get_meetup(2, "53.9, 27.5667", 1, None),
+    ]
+
+    response = rank_meetups(meetups, (53.9, 27.5667), composite=True)
+
+    assert [meetup["id"] for meetup in response] == [2, 1]
+    assert response[0]["rank"] > response[1]["rank"] > 0
@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+import pytest
+import pytest_mock
+from config.settings import settings
+from elasticsearch.exceptions import ConnectionError
+from meetups.utils.elastic import (filter_date, filter_distance, match_fields,
+                                   query_builder, sort_by)
+from meetups.utils.search import (MeetupsSearch, SearchParams, get_tsquery,
+                                  parse_distance, parse_search_body,
+                                  search_meetups_fallback)
+
+
+def get_search_body(search_string: str | None = None,
+                    distance: int | None = None, size: int = 10) -> dict:
+    matchers = [match_fields(search_string)] if search_string else []
+    filters = [filter_date()]
+    if distance is not None:
+        filters.insert(0, filter_distance("53.9, 27.5667", distance))
+    return query_builder.build_search_body(size=size, matchers=matchers,
+                                           filters=filters,
+                                           sorters=["_score", sort_by()])
+
+
+@pytest.mark.unit
+def test_parse_distance():
+    assert parse_distance("100km") == 100000
+    assert parse_distance("1.5 mi") == pytest.approx(2414.016)
+    assert parse_distance("250") == 250
+
+    with pytest.raises(ValueError):
+        parse_distance("10 parsecs")
+
+
+@pytest.mark.unit
+def test_parse_search_body():
+    response_a = parse_search_body(get_search_body("python night", 10, 5))
+    response_b = parse_search_body(get_search_body())
+
+    assert response_a == SearchParams(search_string="python night",
+                                      point=(53.9, 27.5667), distance=10000,
+                                      size=5, start_from=0)
+    assert response_b == SearchParams()
+
+
+@pytest.mark.unit
+def test_get_tsquery():
+    assert get_tsquery("Python, nigh") == "python:* | nigh:*"
+    assert get_tsquery("it's test_b") == "it:* | s:* | test:* | b:*"
+    assert get_tsquery(" & | ! ") is None
+
+
+@pytest.mark.unit
+async def test_search_meetups_fallback(test_data):
+    response_a = await search_meetups_fallback(get_search_body("test_b"))
+    response_b = await search_meetups_fallback(get_search_body("TEST the"))
+    response_c = await search_meetups_fallback(get_search_body(distance=10))
+    response_d = await search_meetups_fallback(get_search_body("unknown"))
+
+    assert [meetup["id"] for meetup in response_a] == [2, 1]
+    assert response_a[0]["place_name"] == "test_b"
+    assert response_a[0]["theme"] == "test theme"
+    assert isinstance(response_a[0]["date"], str)
+    assert sorted(meetup["id"] for meetup in response_b) == [1, 2]
+    assert [meetup["id"] for meetup in response_c] == [2]
+    assert response_d == []
+
+
+@pytest.mark.unit
+async def test_meetups_search(mocker: pytest_mock):
+    es = mocker.Mock()
+    es.search.return_value = {"hits": {"hits": [{"_score": 1.5, "_source": {
+        "id": 1, "places": {"place_name": "test_a"},
+        "themes": {"theme": "test theme"}
+    }}]}}
+    fallback = mocker.patch("meetups.utils.search.search_meetups_fallback",
+                            return_value=[{"id": 2}])
+    meetups_search = MeetupsSearch(es)
+
+    response_a = await meetups_search.search(get_search_body("test"))
+
+    es.search.side_effect = ConnectionError("N/A", "unavailable", None)
+    response_b = await meetups_search.search(get_search_body("test"))
+    response_c = await meetups_search.search(get_search_body("test"))
+
+    assert response_a == [{"id": 1, "place_name": "test_a",
+                           "theme": "test theme", "score": 1.5}]
+    assert response_b == response_c == [{"id": 2}]
+    assert es.search.call_count == 2
+    assert fallback.call_count == 2
+
+
+@pytest.mark.unit
+async def test_meetups_search_timeout(mocker: pytest_mock):
+    es = mocker.Mock()
+    es.search.side_effect = lambda **kwargs: time.sleep(1)
+    mocker.patch.object(settings, "SEARCH_ES_TIMEOUT", 0.1)
+    mocker.patch("meetups.utils.search.search_meetups_fallback",
+                 return_value=[{"id": 2}])
+    meetups_search = MeetupsSearch(es)
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    ticker = asyncio.create_task(tick())
+    started = time.monotonic()
+    response = await meetups_search.search(get_search_body("test"))
+    elapsed = time.monotonic() - started
+    ticker.cancel()
+
+    assert response == [{"id": 2}]
+    assert elapsed < 0.5
+    assert len(ticks) > 2
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+import pytest_mock
+from meetups.utils.search_cache import SearchCache, on_catalog_change
+
+
+@pytest.fixture
+def search_query() -> dict:
+    return {
+        "query": {
+            "bool": {
+                "filter": [
+                    {"geo_distance": {
+                        "distance": "100km",
+                        "places.location": {"lat": "53.90123", "lon": "27.5"}
+                    }},
+                    {"range": {"date": {"gte": "now"}}}
+                ]
+            }
+        },
+        "sort": [{"date": "desc"}]
+    }
+
+
+@pytest.mark.unit
+def test_search_cache_normalize(search_query: dict):
+    cache = SearchCache(max_size=10, ttl=30, geo_precision=2)
+
+    nearby_query = json.loads(json.dumps(search_query))
+    nearby_query["query"]["bool"]["filter"][0]["geo_distance"][
+        "places.location"] = {"lon": "27.501", "lat": "53.9049"}
+    distant_query = json.loads(json.dumps(search_query))
+    distant_query["query"]["bool"]["filter"][0]["geo_distance"][
+        "places.location"] = {"lat": "53.95", "lon": "27.5"}
+
+    normalized = cache.normalize(search_query)
+    key = cache.get_key(normalized)
+
+    assert normalized["query"]["bool"]["filter"][0]["geo_distance"] == {
+        "distance": "100km", "places.location": {"lat": 53.9, "lon": 27.5}
+    }
+    assert normalized["sort"] == search_query["sort"]
+    assert cache.get_key(cache.normalize(nearby_query)) == key
+    assert cache.get_key(cache.normalize(distant_query)) != key
+
+
+@pytest.mark.unit
+def test_search_cache(mocker: pytest_mock):
+    monotonic = mocker.patch("meetups.utils.search_cache.time.monotonic",
+                             return_value=100)
+    cache = SearchCache(max_size=2, ttl=30, geo_precision=2)
+
+    response_a = cache.get("a")
+    cache.put("a", [{"id": 1}], cache.version)
+    response_b = cache.get("a")
+
+    cache.put("b", [], cache.version)
+    cache.get("a")
+    cache.put("c", [{"id": 3}], cache.version)
+
+    assert response_a is None
+    assert response_b == [{"id": 1}]
+    assert cache.get("b") is None
+    assert cache.get("c") == [{"id": 3}]
+
+    version = cache.version
+    cache.invalidate()
+    cache.put("d", [{"id": 4}], version)
+
+    assert cache.get("a") is None
+    assert cache.get("d") is None
+
+    cache.put("a", [], cache.version)
+    monotonic.return_value = 131
+
+    assert cache.get("a") is None
+    assert cache.hits == 3
+    assert cache.misses == 5
+    assert cache.hit_ratio == 0.375
+
+
+@pytest.mark.unit
+def test_on_catalog_change(mocker: pytest_mock):
+    cache = SearchCache(max_size=10, ttl=30, geo_precision=2)
+    mocker.patch("meetups.utils.search_cache.search_cache", cache)
+
+    on_catalog_change(None, 1, "fastapi", json.dumps({"table": "tokens"}))
+    version_a = cache.version
+    on_catalog_change(None, 1, "fastapi", json.dumps({"table": "places"}))
+    version_b = cache.version
+    on_catalog_change(None, 1, "fastapi", "not a json")
+
+    assert version_a == 0
+    assert version_b == 1
+    assert cache.version == 2
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+import pytest_mock
+from config.settings import settings
+from elasticsearch.exceptions import ConnectionError
+from meetups.utils.suggest import PrefixTrie, Suggester
+
+
+@pytest.fixture
+def suggestions_names() -> dict[str, list[str]]:
+    return {
+        "meetups": ["Python night #2", "Python night", "PyData talks",
+                    "Django workshop"],
+        "themes": ["Python", "Django"],
+        "places": ["Minsk", "Mogilev"],
+    }
+
+
+@pytest.mark.unit
+def test_prefix_trie(suggestions_names: dict[str, list[str]]):
+    trie = PrefixTrie(suggestions_names["meetups"], max_size=2)
+
+    response_a = trie.search("py", 5)
+    response_b = trie.search("PYTHON", 5)
+    response_c = trie.search("py", 1)
+    response_d = trie.search("go", 5)
+
+    assert response_a == ["PyData talks", "Python night"]
+    assert response_b == ["Python night", "Python night #2"]
+    assert response_c == ["PyData talks"]
+    assert response_d == []
+
+
+@pytest.mark.unit
+def test_prefix_trie_latency():
+    names = [f"Meetup {index} about python" for index in range(10000)]
+    trie = PrefixTrie(names, max_size=10)
+
+    start = time.perf_counter()
+    for index in range(1000):
+        trie.search(f"meetup {index}", 10)
+    duration = (time.perf_counter() - start) / 1000
+
+    assert trie.search("meetup 999", 10)[0] == "Meetup 999 about python"
+    assert duration < 0.001
+
+
+@pytest.mark.unit
+async def test_suggester(suggestions_names: dict[str, list[str]],
+                         mocker: pytest_mock):
+    es = mocker.Mock()
+    es.search.return_value = {"suggest": {
+        category: [{"options": [{"text": "es suggestion"}]}]
+        for category in ("meetups", "themes", "places")
+    }}
+    get_names = mocker.patch("meetups.utils.suggest.get_suggestions_names",
+                             return_value=suggestions_names)
+    suggester = Suggester(es)
+
+    response_a = await suggester.suggest("p", 5)
+
+    es.search.side_effect = ConnectionError("N/A", "unavailable", None)
+    response_b = await suggester.suggest("m", 5)
+    response_c = await suggester.suggest("py", 1)
+
+    assert response_a["themes"] == ["es suggestion"]
+    assert response_b == {"meetups": [], "themes": [],
+                          "places": ["Minsk", "Mogilev"]}
+    assert response_c == {"meetups": ["PyData talks"], "themes": ["Python"],
+                          "places": []}
+    assert es.search.call_count == 2
+    assert get_names.call_count == 1
+
+
+@pytest.mark.unit
+async def test_suggester_timeout(suggestions_names: dict[str, list[str]],
+                                 mocker: pytest_mock):
+    es = mocker.Mock()
+    es.search.side_effect = lambda **kwargs: time.sleep(1)
+    mocker.patch.object(settings, "SUGGEST_ES_TIMEOUT", 0.05)
+    mocker.patch("meetups.utils.suggest.get_suggestions_names",
+                 return_value=suggestions_names)
+    suggester = Suggester(es)
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    ticker = asyncio.create_task(tick())
+    started = time.monotonic()
+    response = await suggester.suggest("mi", 5)
+    elapsed = time.monotonic() - started
+    ticker.cancel()
+
+    assert response["places"] == ["Minsk"]
+    assert elapsed < 0.5
+    assert len(ticks) > 2
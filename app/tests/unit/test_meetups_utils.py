@@ -1,23 +1,38 @@
+import io
+import json
 import os
 import re
+import time
+from datetime import datetime, timedelta
 
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
 import pytest
+import pytest_mock
+from config.settings import settings
 from fastapi import HTTPException
+from files.utils.storage import LocalStorage, StorageObject
 from meetups.utils.crud import get_all_actual_meetups
-from meetups.utils.meetups_utils import (convert_database_records_to_list,
+from meetups.utils.meetups_utils import (cleanup_reports,
+                                         convert_database_records_to_list,
                                          create_new_place, create_new_theme,
-                                         create_report_csv, create_report_pdf,
-                                         delete_place_by_id,
+                                         create_report, delete_place_by_id,
                                          delete_theme_by_id,
-                                         get_coordinates_by_ip, get_ip,
+                                         get_catalog_version,
+                                         get_coordinates_by_ip,
+                                         get_expired_reports, get_ip,
                                          get_meetup_by_date_name_place,
                                          get_meetup_by_id,
                                          get_meetup_users_by_userid_meetup_id,
                                          get_meetups_by_place_id,
                                          get_meetups_by_theme_id,
                                          get_place_by_name_location,
+                                         get_report_key,
                                          get_theme_by_name_tags, get_token,
-                                         is_valid_coordinates)
+                                         get_user_meetups_ids,
+                                         is_valid_coordinates,
+                                         parse_coordinates)
 
 
 @pytest.mark.unit
@@ -120,6 +135,15 @@ async def test_get_meetup_users_by_userid_meetup_id(test_data):
     assert response_b.meetup_id == 2
 
 
+@pytest.mark.unit
+async def test_get_user_meetups_ids(test_data):
+    response_a = await get_user_meetups_ids(1)
+    response_b = await get_user_meetups_ids(2)
+
+    assert response_a == [2]
+    assert response_b == []
+
+
 @pytest.mark.unit
 async def test_convert_database_records_to_list(test_data):
     records_list = await get_all_actual_meetups()
@@ -145,15 +169,19 @@ def test_create_report_csv():
          'test tag', 'test_b', '53.9, 27.5667'),
     ]
 
-    response = create_report_csv(1, meetups_list)
+    tittles = ('id', 'meetup_name', 'date', 'description', 'theme', 'tags',
+               'place_name', 'location')
 
-    pattern = r'storage/1/reports/csv/report_\d{4}-\d{2}-\d{2}\s\d{2}:\d{2}:' \
-              r'\d{2}.\d{6}.csv'
+    key = get_report_key('csv', get_catalog_version(meetups_list))
+    response = create_report('csv', key, tittles, meetups_list)
 
     local_path = './' + response['path']
+    modified = os.path.getmtime(local_path)
+    response_cached = create_report('csv', key, tittles, meetups_list)
 
-    assert re.match(pattern, response['path'])
-    assert os.path.exists(local_path)
+    assert re.match(r'storage/reports/csv/[0-9a-f]{64}.csv', response['path'])
+    assert response_cached == response
+    assert os.path.getmtime(local_path) == modified
 
     os.remove(local_path)
 
@@ -170,19 +198,91 @@ def test_create_report_pdf():
          'test tag', 'test_b', '53.9, 27.5667'),
     ]
 
-    response = create_report_pdf(1, tittles, meetups_list)
-
-    pattern = r'storage/1/reports/pdf/report_\d{4}-\d{2}-\d{2}\s\d{2}:\d{2}:' \
-              r'\d{2}.\d{6}.pdf'
+    key = get_report_key('pdf', get_catalog_version(meetups_list))
+    response = create_report('pdf', key, tittles, meetups_list)
 
     local_path = './' + response['path']
 
-    assert re.match(pattern, response['path'])
+    assert re.match(r'storage/reports/pdf/[0-9a-f]{64}.pdf', response['path'])
     assert os.path.exists(local_path)
 
     os.remove(local_path)
 
 
+@pytest.mark.unit
+def test_create_report_formats(tmp_path, mocker: pytest_mock):
+    storage = LocalStorage(str(tmp_path))
+    mocker.patch("meetups.utils.meetups_utils.storage", storage)
+    mocker.patch("meetups.utils.meetups_utils.REPORT_BATCH_SIZE", 2)
+
+    tittles = ('id', 'meetup_name', 'date', 'tags')
+    # Dates of the later rows come as ISO strings, as from Celery, and the
+    # tags are empty in the first batch
+    meetups_list = [
+        (index, f'test_name_{index}', datetime(2020, 1, index),
+         None if index < 3 else index)
+        for index in range(1, 6)
+    ]
+    meetups_list[4] = (5, 'test_name_5', '2020-01-05T00:00:00', 5)
+
+    paths = {
+        mode: create_report(mode, f"reports/{mode}/test", tittles,
+                            meetups_list)["path"]
+        for mode in ('ndjson', 'parquet', 'arrow')
+    }
+
+    with storage.open("reports/ndjson/test") as file:
+        ndjson_rows = [json.loads(line) for line in file]
+    with storage.open("reports/parquet/test") as file:
+        parquet_file = pq.ParquetFile(file)
+        parquet_table = parquet_file.read()
+        row_groups = parquet_file.num_row_groups
+    with storage.open("reports/arrow/test") as file:
+        arrow_table = ipc.open_file(file).read_all()
+
+    empty_response = create_report('parquet', "reports/parquet/empty",
+                                   tittles, [])
+    with storage.open("reports/parquet/empty") as file:
+        empty_table = pq.read_table(file)
+
+    assert paths["parquet"] == "storage/reports/parquet/test"
+    assert ndjson_rows[0] == {"id": 1, "meetup_name": "test_name_1",
+                              "date": "2020-01-01 00:00:00", "tags": None}
+    assert len(ndjson_rows) == 5
+    assert row_groups == 3
+    assert parquet_table.column_names == list(tittles)
+    assert parquet_table.column('id').to_pylist() == [1, 2, 3, 4, 5]
+    assert parquet_table.schema.field('tags').type == pa.string()
+    assert parquet_table.column('tags').to_pylist() == [None, None, '3',
+                                                        '4', '5']
+    assert parquet_table.schema.field('date').type == pa.timestamp('us')
+    assert parquet_table.column('date').to_pylist() == [
+        datetime(2020, 1, index) for index in range(1, 6)
+    ]
+    assert arrow_table.equals(parquet_table)
+    assert empty_response == {"path": "storage/reports/parquet/empty"}
+    assert empty_table.num_rows == 0
+    assert empty_table.schema.field('id').type == pa.int64()
+
+
+@pytest.mark.unit
+def test_get_report_key():
+    meetups_list = [(1, 'test_name_a', datetime(2020, 1, 1), 'test desc a')]
+    version = get_catalog_version(meetups_list)
+
+    key_a = get_report_key('csv', version)
+    key_b = get_report_key('csv', version, {})
+    key_c = get_report_key('pdf', version)
+    key_d = get_report_key('csv', version, {"theme": "test theme"})
+    key_e = get_report_key(
+        'csv', get_catalog_version(meetups_list + [(2, 'test_name_b')])
+    )
+
+    assert key_a == key_b
+    assert len({key_a, key_c, key_d, key_e}) == 4
+    assert key_a.startswith('reports/csv/')
+
+
 @pytest.mark.unit
 def test_get_ip():
     ip = get_ip()
@@ -229,6 +329,17 @@ def test_is_valid_coordinates():
     assert response_f is False
 
 
+@pytest.mark.unit
+def test_parse_coordinates():
+    response_a = parse_coordinates('28.8801, 52.6440')
+    response_b = parse_coordinates('-91, 52.6440')
+    response_c = parse_coordinates('28.8801')
+
+    assert response_a == (28.8801, 52.644)
+    assert response_b is None
+    assert response_c is None
+
+
 @pytest.mark.unit
 def test_get_token():
     header_a = 'Test'
@@ -239,3 +350,69 @@ def test_get_token():
 
     assert token_a is None
     assert token_b == 'token'
+
+
+@pytest.mark.unit
+def test_get_expired_reports():
+    now = datetime(2023, 1, 10)
+    reports = [
+        StorageObject(f"{user_id}/reports/csv/report_{day}.csv", 10,
+                      datetime(2023, 1, day))
+        for user_id, day in ((1, 9), (1, 8), (1, 7), (2, 9), (2, 1), (3, 6))
+    ]
+
+    response = get_expired_reports(reports, max_age=timedelta(days=5),
+                                   max_per_user=2, max_total=3, now=now)
+
+    expected_keys = ["2/reports/csv/report_1.csv",
+                     "3/reports/csv/report_6.csv",
+                     "1/reports/csv/report_7.csv"]
+
+    assert [report.key for report in response] == expected_keys
+
+
+@pytest.mark.unit
+def test_get_expired_reports_shared():
+    now = datetime(2023, 1, 10)
+    reports = [
+        StorageObject(f"reports/csv/report_{day}.csv", 10,
+                      datetime(2023, 1, day))
+        for day in range(1, 10)
+    ] + [StorageObject("1/reports/csv/report.csv", 10, datetime(2023, 1, 9))]
+
+    response = get_expired_reports(reports, max_age=timedelta(days=5),
+                                   max_per_user=2, max_total=4, now=now)
+
+    expected_keys = ["reports/csv/report_1.csv", "reports/csv/report_2.csv",
+                     "reports/csv/report_3.csv", "reports/csv/report_4.csv",
+                     "reports/csv/report_5.csv", "reports/csv/report_6.csv"]
+
+    assert [report.key for report in response] == expected_keys
+
+
+@pytest.mark.unit
+def test_cleanup_reports(tmp_path, mocker: pytest_mock):
+    storage = LocalStorage(str(tmp_path))
+    mocker.patch("meetups.utils.meetups_utils.storage", storage)
+    mocker.patch.object(settings, 'REPORTS_MAX_PER_USER', 1)
+
+    for index in range(3):
+        key = f"1/reports/csv/report_{index}.csv"
+        storage.put(key, io.BytesIO(b"x" * 100))
+        os.utime(storage.get_path(key), (time.time() - index * 60,) * 2)
+    storage.put("avatars/ab/abc/64.jpg", io.BytesIO(b"x"))
+    storage_list = mocker.spy(storage, "list")
+
+    response_a = cleanup_reports(batch_size=1)
+    response_b = cleanup_reports(batch_size=1)
+
+    prefixes = [call.args[0] for call in storage_list.call_args_list]
+    keys = [item.key for item in storage.list()]
+
+    assert response_a["removed"] == 1
+    assert response_a["remaining"] == 1
+    assert response_a["reclaimed"] == 100
+    assert response_b["remaining"] == 0
+    assert prefixes == ["reports/", "1/reports/"] * 2
+    assert sorted(keys) == ["1/reports/csv/report_0.csv",
+                            "avatars/ab/abc/64.jpg"]
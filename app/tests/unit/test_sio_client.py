@@ -0,0 +1,23 @@
+import asyncio
+
+import pytest
+import pytest_mock
+from auth.utils.security import decode_service_token
+from sio_client import connect_sio_client, get_service_auth, sio
+
+
+@pytest.mark.unit
+async def test_connect_sio_client(mocker: pytest_mock):
+    async def connect(url, auth):
+        await asyncio.sleep(0.1)
+        mocker.patch.object(sio, "connected", True)
+
+    sio_connect = mocker.patch.object(sio, "connect", side_effect=connect)
+
+    await asyncio.gather(*(connect_sio_client() for _ in range(5)))
+
+    assert sio_connect.call_count == 1
+    assert sio_connect.call_args.kwargs["auth"] is get_service_auth
+    assert decode_service_token(
+        get_service_auth()["service_token"]
+    ) == "rest_api"
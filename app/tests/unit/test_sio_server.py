@@ -0,0 +1,91 @@
+import asyncio
+import time
+from copy import deepcopy
+from types import SimpleNamespace
+
+import pytest
+import pytest_mock
+import socketio
+from config.settings import settings
+from meetups.utils.search_cache import SearchCache
+from sio_server import (create_client_manager, create_report, report_jobs,
+                        search)
+
+
+@pytest.mark.unit
+def test_create_client_manager(mocker: pytest_mock):
+    mocker.patch.object(settings, 'SIO_MESSAGE_QUEUE', None)
+    response_a = create_client_manager()
+
+    mocker.patch.object(settings, 'SIO_MESSAGE_QUEUE', 'redis://test:6379/1')
+    response_b = create_client_manager()
+
+    mocker.patch.object(settings, 'SIO_MESSAGE_QUEUE', 'amqp://test:5672//')
+    response_c = create_client_manager()
+
+    mocker.patch.object(settings, 'SIO_MESSAGE_QUEUE', 'kafka://test:9092')
+
+    assert response_a is None
+    assert isinstance(response_b, socketio.AsyncRedisManager)
+    assert isinstance(response_c, socketio.AsyncAioPikaManager)
+    assert response_b.channel == settings.SIO_CHANNEL
+
+    with pytest.raises(ValueError):
+        create_client_manager()
+
+
+@pytest.mark.unit
+async def test_create_report():
+    calls = []
+
+    class Task:
+        def apply_async(self, args):
+            calls.append(args)
+            time.sleep(0.1)
+            return SimpleNamespace(get=lambda: {"path": f"storage/{args[0]}"})
+
+    response = await asyncio.gather(
+        *(create_report("reports/csv/a.csv", Task(), ["reports/csv/a.csv"])
+          for _ in range(5)),
+        create_report("reports/csv/b.csv", Task(), ["reports/csv/b.csv"])
+    )
+
+    assert calls == [["reports/csv/a.csv"], ["reports/csv/b.csv"]]
+    assert response[:5] == [{"path": "storage/reports/csv/a.csv"}] * 5
+    assert response[5] == {"path": "storage/reports/csv/b.csv"}
+    assert report_jobs == {}
+
+
+@pytest.mark.unit
+async def test_search(mocker: pytest_mock):
+    hit = {"_score": 1.5,
+           "_source": {"id": 1, "meetup_name": "test_name_a",
+                       "places": {"place_name": "test_a",
+                                  "location": "53.9, 27.5"},
+                       "themes": {"theme": "test theme"}}}
+    es_search = mocker.patch(
+        "sio_server.es.search",
+        side_effect=lambda **kwargs: {"hits": {"hits": [deepcopy(hit)]}}
+    )
+    mocker.patch("sio_server.search_cache",
+                 SearchCache(max_size=10, ttl=30, geo_precision=2))
+    mocker.patch("sio_server.sio.emit")
+
+    query_a = {"query": {"bool": {"filter": [{"geo_distance": {
+        "distance": "10km", "places.location": {"lat": 53.9, "lon": 27.5}
+    }}]}}}
+    query_b = {"query": {"bool": {"filter": [{"geo_distance": {
+        "distance": "10km", "places.location": {"lat": 53.9012,
+                                                "lon": 27.4998}
+    }}]}}}
+
+    response_a = await search("sid", {"query_body": query_a})
+    response_b = await search("sid", {"query_body": query_b})
+
+    expected_response = [{"place_name": "test_a", "theme": "test theme",
+                          "id": 1, "meetup_name": "test_name_a",
+                          "location": "53.9, 27.5", "score": 1.5}]
+
+    assert response_a == [{**expected_response[0], "distance": 0}]
+    assert response_b == [{**expected_response[0], "distance": 0.134}]
+    assert es_search.call_count == 1
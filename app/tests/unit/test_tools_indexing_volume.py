@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+import pytest_mock
+from tools.indexing_volume import (get_schema_columns, get_schema_volume,
+                                   get_stats_delta, load_schema, main)
+
+SCHEMA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..",
+                          "configs", "pgsync")
+SCHEMA_PATH = os.path.join(SCHEMA_DIR, "schema.json")
+USERS_SCHEMA_PATH = os.path.join(SCHEMA_DIR, "users.json")
+OLD_USERS_SCHEMA_PATH = os.path.join(SCHEMA_DIR, "old_users.json")
+
+
+@pytest.fixture
+def full_users_schema() -> list[dict]:
+    return [{"index": "users", "nodes": {
+        "table": "users",
+        "columns": ["id", "email", "username", "password_hash"],
+        "children": [{"table": "tokens", "columns": ["id", "token"]}]
+    }}]
+
+
+@pytest.mark.unit
+def test_get_schema_columns():
+    response_a = get_schema_columns(load_schema(SCHEMA_PATH))
+    response_b = get_schema_columns(load_schema(USERS_SCHEMA_PATH))
+
+    assert set(response_a) == {"meetups", "places", "themes"}
+    assert response_b == {"users": {"id", "username", "first_name",
+                                    "last_name", "avatar_url"}}
+
+
+@pytest.mark.unit
+def test_get_schema_volume(full_users_schema: list[dict]):
+    writes = {"users": 10, "tokens": 100, "meetups": 5, "places": 1}
+
+    response_a = get_schema_volume(full_users_schema, writes)
+    response_b = get_schema_volume(load_schema(USERS_SCHEMA_PATH), writes)
+    response_c = get_schema_volume(load_schema(OLD_USERS_SCHEMA_PATH), writes)
+
+    assert response_a == {
+        "indexes": ["users"], "tables": 2, "columns": 6, "writes": 110,
+        "sensitive": ["tokens.token", "users.email", "users.password_hash"]
+    }
+    assert response_b["writes"] == 10
+    assert response_b["sensitive"] == []
+    assert response_c["indexes"] == ["users"]
+    assert response_c["sensitive"] == ["tokens.token", "users.email",
+                                       "users.password_hash"]
+
+
+@pytest.mark.unit
+def test_get_stats_delta():
+    before = {"meetups": {"docs": 10, "index_total": 20}}
+    after = {"meetups": {"docs": 12, "index_total": 25},
+             "users": {"docs": 3, "index_total": 3}}
+
+    response = get_stats_delta(before, after)
+
+    assert response == {"meetups": {"docs": 2, "index_total": 5},
+                        "users": {"docs": 3, "index_total": 3}}
+
+
+@pytest.mark.unit
+def test_main(full_users_schema: list[dict], tmp_path, capsys,
+              mocker: pytest_mock):
+    old_schema_path = tmp_path / "old.json"
+    old_schema_path.write_text(json.dumps(
+        load_schema(SCHEMA_PATH) + full_users_schema
+    ))
+    get_writes = mocker.patch(
+        "tools.indexing_volume.get_table_writes",
+        return_value={"meetups": 5, "users": 10, "tokens": 100}
+    )
+
+    main(["--schema", str(old_schema_path), "--schema", SCHEMA_PATH])
+
+    lines = capsys.readouterr().out.splitlines()
+    assert json.loads(lines[0].split(": ", 1)[1])["writes"] == 115
+    assert json.loads(lines[1].split(": ", 1)[1])["writes"] == 5
+    assert get_writes.call_args.args[0] == {"meetups", "places", "themes",
+                                            "users", "tokens"}
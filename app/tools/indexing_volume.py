@@ -0,0 +1,163 @@
+"""
+Tool for measuring the Elasticsearch indexing volume caused by pgsync.
+Schemas are compared by the synced columns and by the database writes which
+trigger pgsync, and the indexes are measured by the indexing operations and
+stored bytes over a period. Run from the app directory:
+
+    python -m tools.indexing_volume --schema old.json --schema new.json
+    python -m tools.indexing_volume --interval 60
+"""
+import argparse
+import json
+import time
+
+from config.database import SQLALCHEMY_DATABASE_URL
+from config.settings import settings
+from elasticsearch import Elasticsearch
+from sqlalchemy import create_engine, text
+
+# Columns which must not leave the database
+SENSITIVE_COLUMNS = {"users.password_hash", "users.email",
+                     "users.calendar_token", "tokens.token"}
+
+
+def load_schema(path: str) -> list[dict]:
+    """
+    Function for loading a pgsync schema
+    :param path: schema file path
+    :return: list of the indexes configurations
+    """
+    with open(path) as file:
+        return json.load(file)
+
+
+def get_schema_columns(schema: list[dict]) -> dict[str, set[str]]:
+    """
+    Function for getting the tables synced by a pgsync schema
+    :param schema: list of the indexes configurations
+    :return: dict with the synced columns by the table
+    """
+    columns = {}
+    nodes = [index["nodes"] for index in schema]
+    while nodes:
+        node = nodes.pop()
+        columns.setdefault(node["table"], set()).update(node["columns"])
+        nodes.extend(node.get("children", []))
+    return columns
+
+
+def get_table_writes(tables: set[str]) -> dict[str, int]:
+    """
+    Function for getting the number of rows written to tables since the
+    statistics reset. Every write to a synced table triggers pgsync
+    :param tables: table names
+    :return: dict with the number of inserted, updated and deleted rows by
+    the table
+    """
+    query = text("""
+        SELECT relname, n_tup_ins + n_tup_upd + n_tup_del AS writes
+        FROM pg_stat_user_tables
+        WHERE relname = ANY(:tables)
+    """)
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    with engine.connect() as connection:
+        records = connection.execute(query, {"tables": list(tables)})
+        return {record.relname: record.writes for record in records}
+
+
+def get_schema_volume(schema: list[dict], writes: dict[str, int]) -> dict:
+    """
+    Function for estimating the indexing volume of a pgsync schema
+    :param schema: list of the indexes configurations
+    :param writes: dict with the number of written rows by the table
+    :return: dict with the indexes, synced tables and columns, triggering
+    writes and synced sensitive columns
+    """
+    columns = get_schema_columns(schema)
+    return {
+        "indexes": sorted(index["index"] for index in schema),
+        "tables": len(columns),
+        "columns": sum(len(table_columns) for table_columns in
+                       columns.values()),
+        "writes": sum(writes.get(table, 0) for table in columns),
+        "sensitive": sorted(
+            f"{table}.{column}" for table, table_columns in columns.items()
+            for column in table_columns
+            if f"{table}.{column}" in SENSITIVE_COLUMNS
+        ),
+    }
+
+
+def get_index_stats(es: Elasticsearch, index: str = "_all") -> dict:
+    """
+    Function for getting the indexing statistics of the indexes
+    :param es: Elasticsearch client
+    :param index: comma separated index names
+    :return: dict with the documents, indexing operations, indexing time and
+    stored bytes by the index
+    """
+    stats = es.indices.stats(index=index, metric="docs,indexing,store")
+    return {
+        name: {
+            "docs": data["primaries"]["docs"]["count"],
+            "index_total": data["primaries"]["indexing"]["index_total"],
+            "index_time_ms":
+                data["primaries"]["indexing"]["index_time_in_millis"],
+            "store_bytes": data["primaries"]["store"]["size_in_bytes"],
+        }
+        for name, data in stats["indices"].items()
+        if not name.startswith(".")
+    }
+
+
+def get_stats_delta(before: dict, after: dict) -> dict:
+    """
+    Function for getting the change of the indexing statistics
+    :param before: statistics at the period start
+    :param after: statistics at the period end
+    :return: dict with the statistics changes by the index
+    """
+    return {
+        name: {metric: value - before.get(name, {}).get(metric, 0)
+               for metric, value in stats.items()}
+        for name, stats in after.items()
+    }
+
+
+def main(args: list[str] | None = None) -> None:
+    """
+    Function for printing the indexing volume of the schemas and indexes
+    :param args: command line arguments
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--schema", action="append", default=[],
+                        help="pgsync schema file, may be repeated")
+    parser.add_argument("--interval", type=float, default=0,
+                        help="seconds of measuring the indexes")
+    parser.add_argument("--index", default="_all",
+                        help="comma separated measured indexes")
+    options = parser.parse_args(args)
+
+    if options.schema:
+        schemas = {path: load_schema(path) for path in options.schema}
+        writes = get_table_writes(set().union(
+            *(get_schema_columns(schema) for schema in schemas.values())
+        ))
+        for path, schema in schemas.items():
+            print(f"{path}: {json.dumps(get_schema_volume(schema, writes))}")
+
+    if options.interval > 0:
+        es = Elasticsearch(
+            hosts=[f"{settings.ELASTIC_HOST}:{settings.ELASTIC_PORT}"]
+        )
+        before = get_index_stats(es, options.index)
+        time.sleep(options.interval)
+        delta = get_stats_delta(before, get_index_stats(es, options.index))
+        for name, stats in sorted(delta.items()):
+            rate = stats["index_total"] / options.interval
+            print(f"{name}: {json.dumps(stats)}, "
+                  f"index_per_second={rate:.2f}")
+
+
+if __name__ == "__main__":
+    main()
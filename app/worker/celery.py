@@ -15,6 +15,12 @@ def create_celery() -> current_celery_app:
     celery_app.conf.update(result_serializer='json')
     celery_app.conf.update(worker_prefetch_multiplier=1)
     celery_app.conf.update(worker_send_task_events=False)
+    celery_app.conf.update(beat_schedule={
+        "cleanup-reports": {
+            "task": "reports:cleanup_reports_celery",
+            "schedule": settings.REPORTS_CLEANUP_INTERVAL,
+        },
+    })
     celery_app.config_from_object(settings, namespace='CELERY')
 
     return celery_app